@@ -20,4 +20,5 @@
 
 
 from .iodata import IOData
+from .batch import IODataBatch
 from .api import *
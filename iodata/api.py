@@ -78,7 +78,21 @@ def _select_format_module(filename: str, attrname: str, fmt: str = None) -> Modu
         attrname, filename))
 
 
-def load_one(filename: str, fmt: str = None) -> IOData:
+def _is_binary(format_module: ModuleType) -> bool:
+    """Return True if the file-format module reads and writes binary files.
+
+    The loaders of binary formats receive a filename instead of a
+    LineIterator. Their dumpers receive a file opened in binary mode.
+    """
+    return getattr(format_module, 'BINARY', False)
+
+
+def _get_dump_mode(format_module: ModuleType) -> str:
+    """Return the mode for opening files to be written by a file-format module."""
+    return 'wb' if _is_binary(format_module) else 'w'
+
+
+def load_one(filename: str, fmt: str = None, **kwargs) -> IOData:
     """Load data from a file.
 
     This function uses the extension or prefix of the filename to determine the
@@ -92,6 +106,8 @@ def load_one(filename: str, fmt: str = None) -> IOData:
     fmt
         The name of the file format module to use. When not given, it is guessed
         from the filename.
+    **kwargs
+        Keyword arguments are passed on to the format-specific load_one function.
 
     Returns
     -------
@@ -100,14 +116,18 @@ def load_one(filename: str, fmt: str = None) -> IOData:
 
     """
     format_module = _select_format_module(filename, 'load_one', fmt)
+    if _is_binary(format_module):
+        return IOData.from_trusted(**format_module.load_one(filename, **kwargs))
     lit = LineIterator(filename)
     try:
-        return IOData(**format_module.load_one(lit))
+        # Loaders return arrays with the right types and shapes, so the
+        # converters and validators of IOData can be skipped.
+        return IOData.from_trusted(**format_module.load_one(lit, **kwargs))
     except StopIteration:
         raise lit.error("File ended before all data was read.")
 
 
-def load_many(filename: str, fmt: str = None) -> Iterator[IOData]:
+def load_many(filename: str, fmt: str = None, **kwargs) -> Iterator[IOData]:
     """Load multiple IOData instances from a file.
 
     This function uses the extension or prefix of the filename to determine the
@@ -121,6 +141,8 @@ def load_many(filename: str, fmt: str = None) -> Iterator[IOData]:
     fmt
         The name of the file format module to use. When not given, it is guessed
         from the filename.
+    **kwargs
+        Keyword arguments are passed on to the format-specific load_many function.
 
     Yields
     ------
@@ -129,15 +151,15 @@ def load_many(filename: str, fmt: str = None) -> Iterator[IOData]:
 
     """
     format_module = _select_format_module(filename, 'load_many', fmt)
-    lit = LineIterator(filename)
-    for data in format_module.load_many(lit):
+    source = filename if _is_binary(format_module) else LineIterator(filename)
+    for data in format_module.load_many(source, **kwargs):
         try:
-            yield IOData(**data)
+            yield IOData.from_trusted(**data)
         except StopIteration:
             return
 
 
-def dump_one(iodata: IOData, filename: str, fmt: str = None):
+def dump_one(iodata: IOData, filename: str, fmt: str = None, **kwargs):
     """Write data to a file.
 
     This routine uses the extension or prefix of the filename to determine
@@ -153,14 +175,16 @@ def dump_one(iodata: IOData, filename: str, fmt: str = None):
     fmt
         The name of the file format module to use. When not given, it is guessed
         from the filename.
+    **kwargs
+        Keyword arguments are passed on to the format-specific dump_one function.
 
     """
     format_module = _select_format_module(filename, 'dump_one', fmt)
-    with open(filename, 'w') as f:
-        format_module.dump_one(f, iodata)
+    with open(filename, _get_dump_mode(format_module)) as f:
+        format_module.dump_one(f, iodata, **kwargs)
 
 
-def dump_many(iodatas: Iterator[IOData], filename: str, fmt: str = None):
+def dump_many(iodatas: Iterator[IOData], filename: str, fmt: str = None, **kwargs):
     """Write multiple IOData instances to a file.
 
     This routine uses the extension or prefix of the filename to determine
@@ -175,8 +199,10 @@ def dump_many(iodatas: Iterator[IOData], filename: str, fmt: str = None):
         The file to write the data to.
     fmt
         The name of the file format module to use.
+    **kwargs
+        Keyword arguments are passed on to the format-specific dump_many function.
 
     """
     format_module = _select_format_module(filename, 'dump_many', fmt)
-    with open(filename, 'w') as f:
-        format_module.dump_many(f, iodatas)
+    with open(filename, _get_dump_mode(format_module)) as f:
+        format_module.dump_many(f, iodatas, **kwargs)
@@ -18,13 +18,13 @@
 # --
 """Utility functions for working with basis sets."""
 
-from functools import wraps
+from functools import lru_cache, wraps
 from numbers import Integral
 from typing import List, Dict, NamedTuple, Tuple, Union
 
 import numpy as np
 
-__all__ = ['angmom_sti', 'angmom_its', 'Shell', 'MolecularBasis',
+__all__ = ['angmom_sti', 'angmom_its', 'Shell', 'MolecularBasis', 'PackedBasis',
            'convert_convention_shell', 'convert_conventions',
            'iter_cart_alphabet', 'HORTON2_CONVENTIONS', 'PSI4_CONVENTIONS',
            'GBASIS_CONVENTIONS']
@@ -136,7 +136,15 @@ class Shell(NamedTuple):
         return len(self.angmoms)
 
 
-class MolecularBasis(NamedTuple):
+class _MolecularBasisFields(NamedTuple):
+    """The fields of MolecularBasis, see its docstring."""
+
+    shells: tuple
+    conventions: Dict[str, str]
+    primitive_normalization: str
+
+
+class MolecularBasis(_MolecularBasisFields):
     """Describe a complete molecular orbital or density basis set.
 
     Attributes
@@ -164,26 +172,251 @@ class MolecularBasis(NamedTuple):
     primitive_normalization
         Either 'L1' or 'L2'.
 
+    The layout of the basis functions (``shell_offsets``, ``basis_centers``
+    and ``basis_angmoms``), the segmented shells and the setup of the overlap
+    integrals are derived from the shells when first needed and then stored in
+    the instance. They are not
+    updated when the shells are modified in place, e.g. by appending to the
+    list of shells: call :py:meth:`clear_cache` after such a modification. A
+    new instance, e.g. created with ``_replace``, always starts with an empty
+    cache.
+
     """
 
-    shells: tuple
-    conventions: Dict[str, str]
-    primitive_normalization: str
+    def __getstate__(self):
+        """Return no state when pickling, such that the cache is not stored."""
+        return None
+
+    def clear_cache(self):
+        """Discard the cached quantities derived from the shells.
+
+        This must be called after the shells are modified in place.
+        """
+        self.__dict__.clear()
+
+    @property
+    def _layout(self) -> '_BasisLayout':
+        """Return the cached layout of the basis functions."""
+        try:
+            return self._cached_layout
+        except AttributeError:
+            pass
+        # pylint: disable=attribute-defined-outside-init
+        self._cached_layout = _compute_basis_layout(self.shells)
+        return self._cached_layout
 
     @property
     def nbasis(self) -> int:
         """Return the number of basis functions."""
-        return sum(shell.nbasis for shell in self.shells)
+        return int(self.shell_offsets[-1])
+
+    @property
+    def shell_offsets(self) -> np.ndarray:
+        """Return the index of the first basis function of each shell, shape=(nshell + 1,).
+
+        This array and the other per-function arrays below are cached and
+        read-only, see :py:meth:`clear_cache`.
+        """
+        return self._layout.shell_offsets
+
+    @property
+    def basis_centers(self) -> np.ndarray:
+        """Return the center index of each basis function, shape=(nbasis,)."""
+        return self._layout.basis_centers
+
+    @property
+    def basis_angmoms(self) -> np.ndarray:
+        """Return the angular momentum of each basis function, shape=(nbasis,)."""
+        return self._layout.basis_angmoms
 
     def get_segmented(self):
         """Unroll generalized contractions."""
-        shells = []
-        for shell in self.shells:
-            for angmom, kind, coeffs in zip(shell.angmoms, shell.kinds, shell.coeffs.T):
-                shells.append(Shell(shell.icenter, [angmom], [kind],
-                                    shell.exponents, coeffs.reshape(-1, 1)))
+        try:
+            shells = self._cached_segmented_shells
+        except AttributeError:
+            # pylint: disable=attribute-defined-outside-init
+            shells = self._cached_segmented_shells = _compute_segmented_shells(self.shells)
         # pylint: disable=no-member
-        return self._replace(shells=shells)
+        return self._replace(shells=list(shells))
+
+    def to_packed(self) -> 'PackedBasis':
+        """Return the same basis set in a packed, array-based representation."""
+        nshell = len(self.shells)
+        nprims = np.array([shell.nprim for shell in self.shells], dtype=int)
+        ncons = np.array([shell.ncon for shell in self.shells], dtype=int)
+        if nshell == 0:
+            empty_float = np.zeros(0)
+            return PackedBasis(
+                np.zeros(0, dtype=int), np.zeros(1, dtype=int), empty_float,
+                np.zeros(1, dtype=int), np.zeros(0, dtype=int), np.zeros(0, dtype='<U1'),
+                empty_float, self.conventions, self.primitive_normalization)
+        return PackedBasis(
+            icenters=np.array([shell.icenter for shell in self.shells], dtype=int),
+            prim_offsets=_compute_offsets(nprims),
+            exponents=np.concatenate([shell.exponents for shell in self.shells]).astype(float),
+            con_offsets=_compute_offsets(ncons),
+            angmoms=np.concatenate([shell.angmoms for shell in self.shells]).astype(int),
+            kinds=np.concatenate([shell.kinds for shell in self.shells]).astype('<U1'),
+            coeffs=np.concatenate([np.asarray(shell.coeffs, dtype=float).T.ravel()
+                                   for shell in self.shells]),
+            conventions=self.conventions,
+            primitive_normalization=self.primitive_normalization,
+        )
+
+
+class PackedBasis(NamedTuple):
+    """Describe a molecular basis set with flat arrays instead of a list of shells.
+
+    The data of shell ``i`` is found in the ranges defined by ``offsets[i]``
+    and ``offsets[i + 1]`` of the corresponding offsets arrays. Use
+    :py:meth:`MolecularBasis.to_packed` and :py:meth:`PackedBasis.to_basis`
+    to convert between both representations.
+
+    Attributes
+    ----------
+    icenters
+        The index of the center of each shell, shape=(nshell,).
+    prim_offsets
+        Offsets of each shell in exponents, shape=(nshell + 1,).
+    exponents
+        The exponents of the primitives of all shells, shape=(nprim,).
+    con_offsets
+        Offsets of each shell in angmoms and kinds, shape=(nshell + 1,).
+    angmoms
+        The angular momenta of all contractions, shape=(ncon,).
+    kinds
+        The kinds ('c' or 'p') of all contractions, shape=(ncon,).
+    coeffs
+        The contraction coefficients. The coefficients of one contraction are
+        contiguous and contractions are stored in the same order as in angmoms.
+        Each contraction has as many coefficients as its shell has primitives,
+        see ``coeff_offsets``.
+    conventions
+        See :py:class:`MolecularBasis`.
+    primitive_normalization
+        See :py:class:`MolecularBasis`.
+
+    """
+
+    icenters: np.ndarray
+    prim_offsets: np.ndarray
+    exponents: np.ndarray
+    con_offsets: np.ndarray
+    angmoms: np.ndarray
+    kinds: np.ndarray
+    coeffs: np.ndarray
+    conventions: Dict[str, str]
+    primitive_normalization: str
+
+    @property
+    def nshell(self) -> int:
+        """Return the number of shells."""
+        return len(self.icenters)
+
+    @property
+    def nprims(self) -> np.ndarray:
+        """Return the number of primitives in each shell."""
+        return np.diff(self.prim_offsets)
+
+    @property
+    def ncons(self) -> np.ndarray:
+        """Return the number of contractions in each shell."""
+        return np.diff(self.con_offsets)
+
+    @property
+    def coeff_offsets(self) -> np.ndarray:
+        """Return the offsets of each contraction in coeffs, shape=(ncon + 1,)."""
+        return _compute_offsets(np.repeat(self.nprims, self.ncons))
+
+    @property
+    def nbasis(self) -> int:
+        """Return the number of basis functions."""
+        return int(self.get_ncons_basis().sum())
+
+    def get_ncons_basis(self) -> np.ndarray:
+        """Return the number of basis functions in each contraction."""
+        return _compute_ncons_basis(self.angmoms, self.kinds)
+
+    def get_segmented(self) -> 'PackedBasis':
+        """Unroll generalized contractions, such that each shell has one contraction."""
+        ncons = self.ncons
+        shells = np.repeat(np.arange(self.nshell), ncons)
+        nprims = self.nprims[shells]
+        prim_offsets = _compute_offsets(nprims)
+        # Each new shell takes the primitives of the shell it originates from.
+        prim_indexes = (np.repeat(self.prim_offsets[:-1][shells] - prim_offsets[:-1], nprims)
+                        + np.arange(prim_offsets[-1]))
+        return self._replace(
+            icenters=self.icenters[shells],
+            prim_offsets=prim_offsets,
+            exponents=self.exponents[prim_indexes],
+            con_offsets=np.arange(len(self.angmoms) + 1),
+        )
+
+    def to_basis(self) -> MolecularBasis:
+        """Return the same basis set as a MolecularBasis with a list of shells."""
+        shells = []
+        coeff_offsets = self.coeff_offsets
+        for ishell in range(self.nshell):
+            con_begin, con_end = self.con_offsets[ishell:ishell + 2]
+            prim_begin, prim_end = self.prim_offsets[ishell:ishell + 2]
+            coeffs = self.coeffs[coeff_offsets[con_begin]:coeff_offsets[con_end]]
+            shells.append(Shell(
+                int(self.icenters[ishell]),
+                [int(angmom) for angmom in self.angmoms[con_begin:con_end]],
+                [str(kind) for kind in self.kinds[con_begin:con_end]],
+                self.exponents[prim_begin:prim_end].copy(),
+                coeffs.reshape(con_end - con_begin, prim_end - prim_begin).T.copy(),
+            ))
+        return MolecularBasis(shells, self.conventions, self.primitive_normalization)
+
+
+class _BasisLayout(NamedTuple):
+    """Cached per-shell and per-function data of a MolecularBasis."""
+
+    shell_offsets: np.ndarray
+    basis_centers: np.ndarray
+    basis_angmoms: np.ndarray
+
+
+def _compute_basis_layout(shells: List[Shell]) -> _BasisLayout:
+    """Compute the layout of the basis functions of the given shells."""
+    angmoms = np.array([angmom for shell in shells for angmom in shell.angmoms], dtype=int)
+    kinds = np.array([kind for shell in shells for kind in shell.kinds], dtype=str)
+    ncons_basis = _compute_ncons_basis(angmoms, kinds)
+    con_offsets = _compute_offsets([len(shell.angmoms) for shell in shells])
+    shell_offsets = _compute_offsets(ncons_basis)[con_offsets]
+    basis_centers = np.repeat(np.array([shell.icenter for shell in shells], dtype=int),
+                              np.diff(shell_offsets))
+    basis_angmoms = np.repeat(angmoms, ncons_basis)
+    for array in shell_offsets, basis_centers, basis_angmoms:
+        array.flags.writeable = False
+    return _BasisLayout(shell_offsets, basis_centers, basis_angmoms)
+
+
+def _compute_segmented_shells(shells: List[Shell]) -> Tuple[Shell]:
+    """Unroll the generalized contractions of the given shells."""
+    result = []
+    for shell in shells:
+        for angmom, kind, coeffs in zip(shell.angmoms, shell.kinds, shell.coeffs.T):
+            result.append(Shell(shell.icenter, [angmom], [kind],
+                                shell.exponents, coeffs.reshape(-1, 1)))
+    return tuple(result)
+
+
+def _compute_ncons_basis(angmoms: np.ndarray, kinds: np.ndarray) -> np.ndarray:
+    """Return the number of basis functions of contractions with given angmoms and kinds."""
+    pure = kinds == 'p'
+    if (pure & (angmoms < 2)).any() or not (pure | (kinds == 'c')).all():
+        raise TypeError('Unknown contraction kind or pure function with angmom < 2.')
+    return np.where(pure, 2 * angmoms + 1, ((angmoms + 1) * (angmoms + 2)) // 2)
+
+
+def _compute_offsets(sizes: np.ndarray) -> np.ndarray:
+    """Return the offsets of consecutive blocks with the given sizes, starting with zero."""
+    offsets = np.zeros(len(sizes) + 1, dtype=int)
+    np.cumsum(sizes, out=offsets[1:])
+    return offsets
 
 
 def convert_convention_shell(conv1: List[str], conv2: List[str], reverse=False) \
@@ -282,19 +515,38 @@ def convert_conventions(molbasis: MolecularBasis, new_conventions: Dict[str, Lis
         Sign changes when going from 1 to 2, must be applied after permutation
 
     """
-    permutation = []
-    signs = []
+    shell_permutations = []
+    shell_signs = []
+    # Look up each (angmom, kind) only once per call. The permutations
+    # themselves are cached across calls by _get_convention_arrays.
+    arrays = {}
     for shell in molbasis.shells:
-        for angmom, kind in zip(shell.angmoms, shell.kinds):
-            key = (angmom, kind)
-            conv1 = molbasis.conventions[key]
-            conv2 = new_conventions[key]
-            shell_permutation, shell_signs = convert_convention_shell(conv1, conv2, reverse)
-            offset = len(permutation)
-            for i in shell_permutation:
-                permutation.append(i + offset)
-            signs.extend(shell_signs)
-    return np.array(permutation), np.array(signs)
+        for key in zip(shell.angmoms, shell.kinds):
+            shell_arrays = arrays.get(key)
+            if shell_arrays is None:
+                shell_arrays = _get_convention_arrays(
+                    tuple(molbasis.conventions[key]), tuple(new_conventions[key]), reverse)
+                arrays[key] = shell_arrays
+            shell_permutations.append(shell_arrays[0])
+            shell_signs.append(shell_arrays[1])
+    if not shell_permutations:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    sizes = [len(shell_permutation) for shell_permutation in shell_permutations]
+    offsets = _compute_offsets(sizes)
+    permutation = np.concatenate(shell_permutations) + np.repeat(offsets[:-1], sizes)
+    return permutation, np.concatenate(shell_signs)
+
+
+@lru_cache(maxsize=None)
+def _get_convention_arrays(conv1: Tuple[str], conv2: Tuple[str], reverse: bool) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """Return cached, read-only arrays with the result of convert_convention_shell."""
+    permutation, signs = convert_convention_shell(conv1, conv2, reverse)
+    permutation = np.array(permutation, dtype=int)
+    signs = np.array(signs, dtype=int)
+    permutation.flags.writeable = False
+    signs.flags.writeable = False
+    return permutation, signs
 
 
 def iter_cart_alphabet(n: int) -> np.ndarray:
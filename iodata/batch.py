@@ -0,0 +1,239 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Columnar storage of many IOData instances."""
+
+
+from typing import Iterable, Iterator, List
+
+import attr
+import numpy as np
+
+from .iodata import IOData
+
+
+__all__ = ['IODataBatch']
+
+
+# Attributes with one row per atom, stored as concatenated arrays.
+ATOM_ATTRS = ('atcoords', 'atcorenums', 'atfrozen', 'atgradient', 'atmasses', 'atnums')
+# Scalar attributes, stored as float arrays with NaN for missing values.
+FLOAT_ATTRS = ('charge', 'core_energy', 'energy', 'g_rot', 'nelec', 'spinpol')
+# String attributes, stored as object arrays with None for missing values.
+STR_ATTRS = ('lot', 'obasis_name', 'run_type', 'title')
+
+
+@attr.s(auto_attribs=True, slots=True)
+class IODataBatch:
+    """Columnar storage of a sequence of IOData instances, called frames.
+
+    Per-atom arrays of all frames are concatenated and scalar attributes are
+    stored as one vector with one element per frame. This is a lot more
+    compact than a list of IOData instances with many small arrays. Indexing
+    a batch with an integer returns an IOData instance whose per-atom arrays
+    are views of the arrays in the batch.
+
+    Use :py:meth:`from_iodatas` to create a batch, e.g. from the result of
+    :py:func:`iodata.api.load_many`. A batch is also an iterable of IOData
+    instances, which can be passed directly to :py:func:`iodata.api.dump_many`.
+
+    Attributes
+    ----------
+    atom_offsets
+        The index of the first atom of each frame in the per-atom arrays,
+        shape=(nframe + 1,).
+    atoms
+        A dictionary with the concatenated per-atom arrays (atcoords, atnums,
+        ...). An attribute is only stored here when it is present in all
+        frames.
+    atcharges
+        A dictionary with concatenated atomic charges, with the same keys as
+        the atcharges attribute of the frames. These are only stored here when
+        all frames have the same keys.
+    frames
+        A dictionary with per-frame vectors for scalar attributes: energy,
+        charge, title, ... Missing floats are NaN and missing strings are None.
+        For charge, nelec and spinpol, these are the values stored in the
+        frames, not the ones derived from other attributes.
+    bond_offsets
+        The index of the first bond of each frame, shape=(nframe + 1,), or
+        None when not all frames have bonds.
+    bonds
+        Concatenated bonds, with atom indexes relative to the first atom of
+        their frame, or None when not all frames have bonds.
+    others
+        A list with for each frame a dictionary with all remaining attributes
+        that are set, e.g. mo, obasis or extra. This is None when no frame
+        has such attributes.
+
+    """
+
+    atom_offsets: np.ndarray
+    atoms: dict = attr.ib(factory=dict)
+    atcharges: dict = attr.ib(factory=dict)
+    frames: dict = attr.ib(factory=dict)
+    bond_offsets: np.ndarray = None
+    bonds: np.ndarray = None
+    others: List[dict] = None
+
+    @classmethod
+    def from_iodatas(cls, iodatas: Iterable[IOData]) -> 'IODataBatch':
+        """Create a batch from IOData instances.
+
+        Parameters
+        ----------
+        iodatas
+            An iterable over IOData instances, e.g. the result of
+            :py:func:`iodata.api.load_many`. It is iterated only once.
+
+        """
+        fields = {field.name.lstrip('_'): field.name for field in attr.fields(IOData)}
+        columnar = set(ATOM_ATTRS + FLOAT_ATTRS + STR_ATTRS + ('atcharges', 'bonds'))
+        other_names = [name for name in fields if name not in columnar]
+        natoms = []
+        atom_values = {name: [] for name in ATOM_ATTRS}
+        frame_values = {name: [] for name in FLOAT_ATTRS + STR_ATTRS}
+        atcharges_values = []
+        bonds_values = []
+        others = []
+        for iodata in iodatas:
+            natom = iodata.natom
+            natoms.append(0 if natom is None else natom)
+            for name, values in atom_values.items():
+                values.append(getattr(iodata, name))
+            for name, values in frame_values.items():
+                values.append(getattr(iodata, fields[name]))
+            atcharges_values.append(iodata.atcharges)
+            bonds_values.append(iodata.bonds)
+            other = {}
+            for name in other_names:
+                value = getattr(iodata, fields[name])
+                if not _is_unset(value):
+                    other[name] = value
+            others.append(other)
+        result = cls(_compute_offsets(natoms))
+
+        # Attributes that are not present in all frames are stored in others.
+        for name, values in atom_values.items():
+            if _gather(name, values, others):
+                result.atoms[name] = np.concatenate(values)
+        if atcharges_values and all(
+                atcharges.keys() == atcharges_values[0].keys()
+                and all(len(value) == natom for value in atcharges.values())
+                for atcharges, natom in zip(atcharges_values, natoms)):
+            for key in atcharges_values[0]:
+                result.atcharges[key] = np.concatenate(
+                    [atcharges[key] for atcharges in atcharges_values])
+        else:
+            _gather('atcharges', atcharges_values, others)
+        if _gather('bonds', bonds_values, others):
+            result.bond_offsets = _compute_offsets([len(bonds) for bonds in bonds_values])
+            result.bonds = np.concatenate(bonds_values)
+        for name in FLOAT_ATTRS:
+            values = frame_values[name]
+            if any(value is not None for value in values):
+                result.frames[name] = np.array(
+                    [np.nan if value is None else value for value in values], dtype=float)
+        for name in STR_ATTRS:
+            values = frame_values[name]
+            if any(value is not None for value in values):
+                result.frames[name] = np.empty(len(values), dtype=object)
+                result.frames[name][:] = values
+        if any(others):
+            result.others = others
+        return result
+
+    @property
+    def natoms(self) -> np.ndarray:
+        """Return the number of atoms of each frame."""
+        return np.diff(self.atom_offsets)
+
+    def __len__(self) -> int:
+        """Return the number of frames."""
+        return len(self.atom_offsets) - 1
+
+    def __iter__(self) -> Iterator[IOData]:
+        """Iterate over all frames, see __getitem__."""
+        for iframe in range(len(self)):
+            yield self[iframe]
+
+    def __getitem__(self, iframe: int) -> IOData:
+        """Return one frame as an IOData instance.
+
+        The per-atom arrays and bonds of the result are views of the arrays in
+        the batch. Other attributes of the result are shared with the batch.
+        """
+        nframe = len(self)
+        if not -nframe <= iframe < nframe:
+            raise IndexError('Frame index {} out of range for a batch with {} frames.'.format(
+                iframe, nframe))
+        iframe %= nframe
+        begin, end = self.atom_offsets[iframe:iframe + 2]
+        kwargs = {} if self.others is None else dict(self.others[iframe])
+        for name, array in self.atoms.items():
+            kwargs[name] = array[begin:end]
+        if self.atcharges:
+            kwargs['atcharges'] = {key: array[begin:end]
+                                   for key, array in self.atcharges.items()}
+        if self.bonds is not None:
+            kwargs['bonds'] = self.bonds[self.bond_offsets[iframe]:self.bond_offsets[iframe + 1]]
+        for name, vector in self.frames.items():
+            value = vector[iframe]
+            if name in FLOAT_ATTRS:
+                value = None if np.isnan(value) else float(value)
+            if value is not None:
+                kwargs[name] = value
+        return IOData.from_trusted(**kwargs)
+
+
+def _compute_offsets(sizes: List[int]) -> np.ndarray:
+    """Return the offsets of consecutive blocks with the given sizes, with a trailing total."""
+    return np.concatenate([[0], np.cumsum(sizes, dtype=int)])
+
+
+def _is_unset(value) -> bool:
+    """Return True when the value of an IOData attribute is None or an empty dictionary."""
+    return value is None or (isinstance(value, dict) and not value)
+
+
+def _gather(name: str, values: list, others: List[dict]) -> bool:
+    """Check if an attribute can be stored in columnar form.
+
+    Parameters
+    ----------
+    name
+        The name of the attribute.
+    values
+        The values of the attribute for all frames.
+    others
+        The dictionaries with other attributes of each frame. When some
+        frames do not have the attribute, the values that are set are added
+        to these dictionaries.
+
+    Returns
+    -------
+    columnar
+        True when all frames have the attribute.
+
+    """
+    if len(values) > 0 and not any(_is_unset(value) for value in values):
+        return True
+    for value, other in zip(values, others):
+        if not _is_unset(value):
+            other[name] = value
+    return False
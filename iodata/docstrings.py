@@ -25,8 +25,18 @@ from typing import List
 __all__ = ['document_load_one', 'document_load_many', 'document_dump_one', 'document_dump_many']
 
 
+LOAD_SOURCE_TEXT = """\
+lit
+    The line iterator to read the data from."""
+
+
+LOAD_SOURCE_BINARY = """\
+filename
+    The binary file to read the data from."""
+
+
 def _document_load(template: str, fmt: str, guaranteed: List[str], ifpresent: List[str] = None,
-                   notes: str = None):
+                   notes: str = None, binary: bool = False):
     ifpresent = ifpresent or []
 
     def decorator(func):
@@ -38,6 +48,7 @@ def _document_load(template: str, fmt: str, guaranteed: List[str], ifpresent: Li
             ifpresent_sentence = ""
         func.__doc__ = template.format(
             fmt=fmt,
+            source=(LOAD_SOURCE_BINARY if binary else LOAD_SOURCE_TEXT),
             guaranteed=', '.join("``{}``".format(word) for word in guaranteed),
             ifpresent=ifpresent_sentence,
             notes=(notes or ""),
@@ -55,8 +66,7 @@ Load a single frame from a {fmt} file.
 
 Parameters
 ----------
-lit
-    The line iterator to read the data from.
+{source}
 
 Returns
 -------
@@ -73,7 +83,7 @@ Notes
 
 
 def document_load_one(fmt: str, guaranteed: List[str], ifpresent: List[str] = None,
-                      notes: str = None):
+                      notes: str = None, binary: bool = False):
     """Decorate a load_one function to generate a docstring.
 
     Parameters
@@ -84,6 +94,9 @@ def document_load_one(fmt: str, guaranteed: List[str], ifpresent: List[str] = No
         A list of IOData attributes this format can certainly read.
     ifpresent
         A list of IOData attributes this format reads of present in the file.
+    binary
+        Set to True for binary formats, whose loaders receive a filename
+        instead of a line iterator.
 
     Returns
     -------
@@ -91,7 +104,7 @@ def document_load_one(fmt: str, guaranteed: List[str], ifpresent: List[str] = No
         A decorator function.
 
     """
-    return _document_load(LOAD_ONE_DOC_TEMPLATE, fmt, guaranteed, ifpresent, notes)
+    return _document_load(LOAD_ONE_DOC_TEMPLATE, fmt, guaranteed, ifpresent, notes, binary)
 
 
 LOAD_MANY_DOC_TEMPLATE = """\
@@ -99,8 +112,7 @@ Load a multiple frame from a {fmt} file.
 
 Parameters
 ----------
-lit
-    The line iterator to read the data from.
+{source}
 
 Yields
 ------
@@ -117,7 +129,7 @@ Notes
 
 
 def document_load_many(fmt: str, guaranteed: List[str], ifpresent: List[str] = None,
-                       notes: str = None):
+                       notes: str = None, binary: bool = False):
     """Decorate a load_many function to generate a docstring.
 
     Parameters
@@ -128,6 +140,9 @@ def document_load_many(fmt: str, guaranteed: List[str], ifpresent: List[str] = N
         A list of IOData attributes this format can certainly read.
     ifpresent
         A list of IOData attributes this format reads of present in the file.
+    binary
+        Set to True for binary formats, whose loaders receive a filename
+        instead of a line iterator.
 
     Returns
     -------
@@ -135,7 +150,7 @@ def document_load_many(fmt: str, guaranteed: List[str], ifpresent: List[str] = N
         A decorator function.
 
     """
-    return _document_load(LOAD_ONE_DOC_TEMPLATE, fmt, guaranteed, ifpresent, notes)
+    return _document_load(LOAD_ONE_DOC_TEMPLATE, fmt, guaranteed, ifpresent, notes, binary)
 
 
 def _document_dump(template: str, fmt: str, required: List[str], optional: List[str] = None,
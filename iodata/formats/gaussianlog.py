@@ -18,6 +18,17 @@
 # --
 """Gaussian Log file format.
 
+The log file is read in a single pass. The following sections are recognized:
+
+- Orientation tables, SCF energies, forces and harmonic frequencies of
+  optimizations and frequency calculations. Each geometry is a frame in
+  ``load_many``.
+- Overlap, kinetic energy, nuclear attraction and two-electron integrals.
+
+All job steps of a file (separated by ``Link1``) are read. The file must end with
+the normal termination of the last job step, otherwise it is considered to be
+truncated and an error is raised.
+
 To write out the integrals in a Gaussian log file, which can be loaded with this module,
 you need to use the following Gaussian command line:
 
@@ -28,10 +39,15 @@ you need to use the following Gaussian command line:
 """
 
 
+import os
+import re
+from typing import Iterator, List, Tuple
+
 import numpy as np
 
-from ..docstrings import document_load_one
-from ..utils import set_four_index_element, LineIterator
+from ..docstrings import document_load_one, document_load_many
+from ..fourindex import SymmetricFourIndex
+from ..utils import angstrom, get_cache_filename, wavenumber, LineIterator
 
 
 __all__ = []
@@ -40,39 +56,199 @@ __all__ = []
 PATTERNS = ['*.log']
 
 
-@document_load_one("Gaussian Log", [], ['one_ints', 'two_ints'])
-def load_one(lit: LineIterator) -> dict:
+# Number of four-index elements that are parsed at once.
+CHUNK_SIZE = 1000000
+
+
+LOAD_ONE_NOTES = """
+When the log file contains multiple geometries, e.g. from an optimization, the last
+geometry is loaded, together with its energy. All other results are only loaded when
+they were printed for the last geometry, i.e. a missing energy or gradient is not taken
+from an earlier geometry. Harmonic frequencies are stored in
+``extra['frequencies']``, in atomic units. See ``load_many`` for the orientation of the
+coordinates. All job steps in the file are read, also after the normal termination of the
+first one.
+
+The optional argument ``scratch`` can be set to a directory in which the two-electron
+integrals are stored as a memory-mapped NPY file, instead of keeping them in memory. When
+the same log file is loaded again with the same scratch directory, the two-electron
+integrals are taken from the cache and the integral dump is not parsed.
+"""
+
+
+@document_load_one("Gaussian Log", [], ['atcoords', 'atgradient', 'atnums', 'energy',
+                                        'extra', 'one_ints', 'two_ints'], LOAD_ONE_NOTES)
+def load_one(lit: LineIterator, scratch: str = None) -> dict:
     """Do not edit this docstring. It will be overwritten."""
-    # First get the line with the number of orbital basis functions
+    # All data (energy, gradient, frequencies and integrals) depend on the
+    # geometry, so only the last frame is used. Data printed for earlier
+    # geometries are never mixed in.
+    for frame in _iter_frames(lit, scratch):
+        result = frame
+    return result
+
+
+LOAD_MANY_NOTES = """
+Each geometry starts a new frame. Energies, gradients and harmonic frequencies are
+assigned to the geometry printed before them. Frames without an energy are included as
+well. The coordinates are taken from the standard orientation, except for frames with a
+gradient. Gaussian prints the forces in the input orientation, so the coordinates of such
+frames are taken from the input orientation too. Forces of a geometry without an input
+orientation are discarded with a warning.
+"""
+
+
+@document_load_many("Gaussian Log", ['atcoords', 'atnums'],
+                    ['atgradient', 'energy', 'extra'], LOAD_MANY_NOTES)
+def load_many(lit: LineIterator) -> Iterator[dict]:
+    """Do not edit this docstring. It will be overwritten."""
+    for frame in _iter_frames(lit):
+        if 'atcoords' in frame:
+            yield frame
+
+
+def _iter_frames(lit: LineIterator, scratch: str = None) -> Iterator[dict]:
+    """Parse a Gaussian log file in a single pass, one geometry at a time.
+
+    Parameters
+    ----------
+    lit
+        The line iterator to read the data from.
+    scratch
+        An optional scratch directory for two-electron integrals, see
+        ``_load_fourindex_g09``.
+
+    Yields
+    ------
+    frame
+        A dictionary with IOData attributes for one geometry. The last frame
+        also includes everything after the last geometry. Integrals printed
+        before the first geometry end up in a frame without coordinates.
+
+    """
+    state = {'nbasis': None, 'scratch': scratch}
+    frame = {}
+    orientations = {}
+    terminated = False
     for line in lit:
-        if line.startswith('    NBasis ='):
-            nbasis = int(line[12:18])
+        match = SECTION_PATTERN.match(line)
+        if match is None:
+            continue
+        name = match.lastgroup
+        # Only a normal termination after all other sections marks a complete file.
+        terminated = name == 'termination'
+        if name in ORIENTATIONS:
+            # Input and standard orientations of the same geometry belong to the
+            # same frame. Any other orientation starts a new frame.
+            if 'energy' in frame or name in orientations:
+                yield _finalize_frame(lit, frame, orientations)
+                frame = {}
+                orientations = {}
+            orientations[name] = _load_orientation(lit)
+        elif name != 'termination':
+            SECTION_HANDLERS[name](lit, line, frame, state)
+    if not terminated:
+        lit.error('File ended before the normal termination of Gaussian.')
+    yield _finalize_frame(lit, frame, orientations)
+
+
+def _finalize_frame(lit: LineIterator, frame: dict, orientations: dict) -> dict:
+    """Select the orientation of a frame and convert lists collected while parsing to arrays.
+
+    Parameters
+    ----------
+    lit
+        The line iterator, used for warnings.
+    frame
+        The data collected for one geometry.
+    orientations
+        The atomic numbers and coordinates of each orientation table printed
+        for this geometry.
+
+    Returns
+    -------
+    frame
+        The completed frame.
+
+    """
+    if orientations:
+        # Forces are printed in the input orientation, so the coordinates must
+        # be taken from the same orientation.
+        if 'atgradient' in frame and 'input_orientation' not in orientations:
+            lit.warn('Discarding forces of a geometry without input orientation.')
+            del frame['atgradient']
+        if 'atgradient' in frame or 'standard_orientation' not in orientations:
+            frame['atnums'], frame['atcoords'] = orientations['input_orientation']
+        else:
+            frame['atnums'], frame['atcoords'] = orientations['standard_orientation']
+    frequencies = frame.get('extra', {}).get('frequencies')
+    if frequencies is not None:
+        frame['extra']['frequencies'] = np.array(frequencies) * wavenumber
+    return frame
+
+
+def _load_orientation(lit: LineIterator) -> Tuple[np.ndarray, np.ndarray]:
+    """Load atomic numbers and coordinates from an orientation table."""
+    # Skip the table header: a dashed line, two lines of titles and a dashed line.
+    for _ in range(4):
+        next(lit)
+    rows = []
+    for line in lit:
+        if line.startswith(' ---'):
             break
+        rows.append(line.split())
+    # Old versions of Gaussian do not print the atomic type column.
+    atnums = np.array([row[1] for row in rows], dtype=int)
+    atcoords = np.array([row[-3:] for row in rows], dtype=float).reshape(-1, 3) * angstrom
+    return atnums, atcoords
 
-    # Then load the two- and four-index operators. This part is written such
-    # that it does not make any assumptions about the order in which these
-    # operators are printed.
-    one_ints = {}
-    two_ints = {}
-    while True:
-        line = next(lit)
-        if line.startswith(" Normal termination of Gaussian"):
+
+def _handle_nbasis(lit: LineIterator, line: str, frame: dict, state: dict):
+    """Store the number of basis functions, needed to load integrals."""
+    # pylint: disable=unused-argument
+    state['nbasis'] = int(line[12:18])
+
+
+def _handle_scf_done(lit: LineIterator, line: str, frame: dict, state: dict):
+    """Load the energy from a line like `` SCF Done:  E(RHF) =  -74.9659  A.U. after``."""
+    # pylint: disable=unused-argument
+    frame['energy'] = float(line.split('=')[1].split()[0])
+
+
+def _handle_forces(lit: LineIterator, line: str, frame: dict, state: dict):
+    """Load the forces table and store it as a gradient."""
+    # pylint: disable=unused-argument
+    # Skip the line with column titles and a dashed line.
+    next(lit)
+    next(lit)
+    rows = []
+    for line_row in lit:
+        if line_row.startswith(' ---'):
             break
-        elif line.startswith(' *** Overlap ***'):
-            one_ints['olp'] = _load_twoindex_g09(lit, nbasis)
-        elif line.startswith(' *** Kinetic Energy ***'):
-            one_ints['kin_ao'] = _load_twoindex_g09(lit, nbasis)
-        elif line.startswith(' ***** Potential Energy *****'):
-            one_ints['na_ao'] = _load_twoindex_g09(lit, nbasis)
-        elif line.startswith(' *** Dumping Two-Electron integrals ***'):
-            two_ints['er_ao'] = _load_fourindex_g09(lit, nbasis)
-
-    result = {}
-    if one_ints:
-        result['one_ints'] = one_ints
-    if two_ints:
-        result['two_ints'] = two_ints
-    return result
+        rows.append(line_row.split()[2:5])
+    frame['atgradient'] = -np.array(rows, dtype=float).reshape(-1, 3)
+
+
+def _handle_frequencies(lit: LineIterator, line: str, frame: dict, state: dict):
+    """Collect harmonic frequencies (in cm^-1) from a `` Frequencies --`` line."""
+    # pylint: disable=unused-argument
+    frequencies = frame.setdefault('extra', {}).setdefault('frequencies', [])
+    frequencies.extend(float(word) for word in line[15:].split())
+
+
+def _handle_twoindex(key: str):
+    """Return a handler that loads a two-index operator into ``one_ints[key]``."""
+    def handler(lit: LineIterator, line: str, frame: dict, state: dict):
+        # pylint: disable=unused-argument
+        frame.setdefault('one_ints', {})[key] = _load_twoindex_g09(lit, state['nbasis'])
+    return handler
+
+
+def _handle_fourindex(lit: LineIterator, line: str, frame: dict, state: dict):
+    """Load the two-electron integrals into ``two_ints['er_ao']``."""
+    # pylint: disable=unused-argument
+    frame.setdefault('two_ints', {})['er_ao'] = _load_fourindex_g09(
+        lit, state['nbasis'], state['scratch'])
 
 
 def _load_twoindex_g09(lit: LineIterator, nbasis: int) -> np.ndarray:
@@ -96,19 +272,28 @@ def _load_twoindex_g09(lit: LineIterator, nbasis: int) -> np.ndarray:
     while block_counter < nbasis:
         # skip the header line
         next(lit)
-        # determine the number of rows in this part
+        # determine the number of rows and columns in this part
         nrow = nbasis - block_counter
-        for i in range(nrow):
-            words = next(lit).split()[1:]
-            for j, word in enumerate(words):
-                value = float(word.replace('D', 'E'))
-                result[i + block_counter, j + block_counter] = value
-                result[j + block_counter, i + block_counter] = value
+        ncol = min(5, nrow)
+        # Indexes of the lower-triangular elements, in the order of printing.
+        irows, icols = np.tril_indices(nrow, 0, ncol)
+        # Each line starts with a row label, followed by at most five values.
+        nwords = np.minimum(np.arange(1, nrow + 1), ncol) + 1
+        mask = np.ones(nwords.sum(), dtype=bool)
+        mask[np.cumsum(nwords) - nwords] = False
+        text = ''.join([next(lit) for _ in range(nrow)])
+        words = text.replace('D', 'E').split()
+        if len(words) != len(mask):
+            lit.error('Unexpected number of fields in two-index operator.')
+        values = np.array(words, dtype=float)[mask]
+        result[irows + block_counter, icols + block_counter] = values
+        result[icols + block_counter, irows + block_counter] = values
         block_counter += 5
     return result
 
 
-def _load_fourindex_g09(lit: LineIterator, nbasis: int) -> np.ndarray:
+def _load_fourindex_g09(lit: LineIterator, nbasis: int, scratch: str = None) \
+        -> SymmetricFourIndex:
     """Load a four-index operator from a GAUSSIAN LOG file.
 
     Parameters
@@ -117,29 +302,120 @@ def _load_fourindex_g09(lit: LineIterator, nbasis: int) -> np.ndarray:
         The line iterator to read the data from.
     nbasis
         The number of atomic orbital basis functions.
+    scratch
+        When given, the operator is stored in a memory-mapped NPY file in this
+        directory. When such a file already exists for the same log file, it
+        is reused and the integrals are not parsed. The line number of the
+        dump is part of the filename, such that each dump in a log file has
+        its own cache file.
 
     Returns
     -------
     out
-        The (nbasis, nbasis, nbasis, nbasis) array of operator.
+        The four-index operator, in which only the symmetry-unique elements are
+        stored.
 
     """
-    result = np.zeros((nbasis, nbasis, nbasis, nbasis))
+    if scratch is None:
+        result = SymmetricFourIndex(nbasis)
+    else:
+        fn_cache = get_cache_filename(lit.filename, scratch, 'er_ao_{}.npy'.format(lit.lineno))
+        if os.path.isfile(fn_cache):
+            for line in lit:
+                if line.startswith(' I='):
+                    break
+            for line in lit:
+                if not line.startswith(' I='):
+                    break
+            return SymmetricFourIndex.load_npy(nbasis, fn_cache)
+        # The final name is only used once the cache is complete.
+        fn_part = fn_cache + '.part'
+        result = SymmetricFourIndex.create_npy(nbasis, fn_part)
     # Skip first six lines
     for i in range(6):
         next(lit)
     # Start reading elements until a line is encountered that does not start
-    # with ' I='
-    for line in lit:
-        if not line.startswith(' I='):
+    # with ' I='. The lines are processed in chunks to limit the memory usage.
+    while True:
+        lines = []
+        for line in lit:
+            if not line.startswith(' I='):
+                break
+            lines.append(line)
+            if len(lines) == CHUNK_SIZE:
+                break
+        if lines:
+            indexes, values = _parse_fourindex_lines(lines)
+            i, j, k, l = indexes.T
+            # Gaussian uses the chemists notation for the 4-center indexes. IOdata
+            # uses the physicists notation.
+            result[i, k, j, l] = values
+        if len(lines) < CHUNK_SIZE:
             break
-        # print line[3:7], line[9:13], line[15:19], line[21:25], line[28:].replace('D', 'E')
-        i = int(line[3:7]) - 1
-        j = int(line[9:13]) - 1
-        k = int(line[15:19]) - 1
-        l = int(line[21:25]) - 1
-        value = float(line[29:].replace('D', 'E'))
-        # Gaussian uses the chemists notation for the 4-center indexes. IOdata
-        # uses the physicists notation.
-        set_four_index_element(result, i, k, j, l, value)
+    if scratch is not None:
+        result.data.flush()
+        os.replace(fn_part, fn_cache)
     return result
+
+
+def _parse_fourindex_lines(lines: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse lines with four-index elements from a Gaussian log file.
+
+    Parameters
+    ----------
+    lines
+        Lines of the form `` I=  6 J=  2 K=  5 L=  1 Int=  0.708496640384D-02``.
+
+    Returns
+    -------
+    indexes
+        An integer array with shape (nline, 4) with zero-based indexes.
+    values
+        An array with the values of the elements.
+
+    """
+    width = len(lines[0])
+    if all(len(line) == width for line in lines):
+        # Fast path: decode all fixed-width fields at once from a byte buffer.
+        fields = np.dtype({
+            'names': ['i', 'j', 'k', 'l', 'value'],
+            'formats': ['S4', 'S4', 'S4', 'S4', 'S{}'.format(width - 29)],
+            'offsets': [3, 9, 15, 21, 29],
+            'itemsize': width,
+        })
+        buf = ''.join(lines).replace('D', 'E').encode('ascii')
+        records = np.frombuffer(buf, dtype=fields)
+        indexes = np.array([records[name].astype(int) for name in 'ijkl']).T - 1
+        values = records['value'].astype(float)
+    else:
+        indexes = np.array([[int(line[3:7]), int(line[9:13]), int(line[15:19]),
+                             int(line[21:25])] for line in lines]) - 1
+        values = np.array([float(line[29:].replace('D', 'E')) for line in lines])
+    return indexes, values
+
+
+# Names of sections with orientation tables, which delimit frames.
+ORIENTATIONS = ['standard_orientation', 'input_orientation']
+
+
+# Line prefixes (regular expressions) that start a section of interest, with
+# the functions that process them. Orientations and the normal termination are
+# handled in _iter_frames.
+SECTIONS = [
+    ('standard_orientation', r' +Standard orientation:', None),
+    ('input_orientation', r' +Input orientation:', None),
+    ('nbasis', r'    NBasis =', _handle_nbasis),
+    ('scf_done', r' SCF Done:', _handle_scf_done),
+    ('forces', r' Center +Atomic +Forces \(Hartrees/Bohr\)', _handle_forces),
+    ('frequencies', r' Frequencies --(?!-)', _handle_frequencies),
+    ('overlap', r' \*\*\* Overlap \*\*\*', _handle_twoindex('olp')),
+    ('kinetic', r' \*\*\* Kinetic Energy \*\*\*', _handle_twoindex('kin_ao')),
+    ('potential', r' \*\*\*\*\* Potential Energy \*\*\*\*\*', _handle_twoindex('na_ao')),
+    ('two_electron', r' \*\*\* Dumping Two-Electron integrals \*\*\*', _handle_fourindex),
+    ('termination', r' Normal termination of Gaussian', None),
+]
+SECTION_HANDLERS = {name: handler for name, _, handler in SECTIONS}
+# A single compiled pattern is matched against each line, instead of trying
+# all prefixes one by one.
+SECTION_PATTERN = re.compile('|'.join(
+    '(?P<{}>{})'.format(name, prefix) for name, prefix, _ in SECTIONS))
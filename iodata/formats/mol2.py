@@ -49,78 +49,76 @@ def load_one(lit: LineIterator) -> dict:
             line = next(lit)
         except StopIteration:
             break
-        if len(line) > 1:
-            words = line.split()
-            if words[0] == "@<TRIPOS>MOLECULE":
-                # Found another molecule; go one line back and break
-                if molecule_found:
-                    lit.back(line)
-                    break
-                title = next(lit).strip()
-                words = next(lit).split()
-                natoms = int(words[0])
-                nbonds = int(words[1])
-            if words[0] == "@<TRIPOS>ATOM":
-                atnums, atcoords, atchgs, attypes = _load_helper_atoms(lit, natoms)
-                atcharges = {"mol2charges": atchgs}
-                atffparams = {"attypes": attypes}
-                result = {
-                    'atcoords': atcoords,
-                    'atnums': atnums,
-                    'atcharges': atcharges,
-                    'atffparams': atffparams,
-                    'title': title
-                }
-                molecule_found = True
-            if words[0] == "@<TRIPOS>BOND":
-                bonds = _load_helper_bonds(lit, nbonds)
-                result['bonds'] = bonds
+        if line.startswith("@<TRIPOS>MOLECULE"):
+            # Found another molecule; go one line back and break
+            if molecule_found:
+                lit.back(line)
+                break
+            title = next(lit).strip()
+            words = next(lit).split()
+            natoms = int(words[0])
+            nbonds = int(words[1])
+        elif line.startswith("@<TRIPOS>ATOM"):
+            atnums, atcoords, atchgs, attypes = _load_helper_atoms(lit, natoms)
+            atcharges = {"mol2charges": atchgs}
+            atffparams = {"attypes": attypes}
+            result = {
+                'atcoords': atcoords,
+                'atnums': atnums,
+                'atcharges': atcharges,
+                'atffparams': atffparams,
+                'title': title
+            }
+            molecule_found = True
+        elif line.startswith("@<TRIPOS>BOND"):
+            bonds = _load_helper_bonds(lit, nbonds)
+            result['bonds'] = bonds
     if molecule_found is False:
         raise lit.error("Molecule could not be read")
+    if nbonds > 0 and 'bonds' not in result:
+        raise lit.error(f"Molecule has no bonds, while {nbonds} were expected.")
     return result
 
 
+def _load_block(lit: LineIterator, nline: int) -> list:
+    """Read a block of lines at once and split each of them into words."""
+    return [next(lit).split() for _ in range(nline)]
+
+
+def _symbol_to_atnum(lit: LineIterator, name: str) -> int:
+    """Convert an atom name into an element number."""
+    # Check the first two characters of atom name and try
+    # to convert to an element number both or only the first
+    symbol = name[:2].title()
+    atnum = sym2num.get(symbol, sym2num.get(symbol[0], None))
+    if atnum is None:
+        atnum = 0
+        lit.warn(f'Can not convert {name[:2]} to elements')
+    return atnum
+
+
 def _load_helper_atoms(lit: LineIterator, natoms: int)\
         -> Tuple[np.ndarray, np.ndarray, np.ndarray, tuple]:
     """Load element numbers, coordinates and atomic charges."""
-    atnums = np.empty(natoms)
-    atcoords = np.empty((natoms, 3))
-    atchgs = np.empty(natoms)
-    attypes = []
-    for i in range(natoms):
-        words = next(lit).split()
-        # Check the first two characters of atom name and try
-        # to convert to an element number both or only the first
-        symbol = words[1][:2].title()
-        atnum = sym2num.get(symbol, sym2num.get(symbol[0], None))
-        if atnum is None:
-            atnum = 0
-            lit.warn(f'Can not convert {words[1][:2]} to elements')
-        atnums[i] = atnum
-        attypes.append(words[5])
-        atcoords[i] = [float(words[2]), float(words[3]), float(words[4])]
-        if len(words) == 9:
-            atchgs[i] = float(words[8])
-        else:
-            atchgs[i] = 0.0000
-    atcoords = atcoords * angstrom
-    attypes = tuple(attypes)
+    block = _load_block(lit, natoms)
+    atnums = np.fromiter((_symbol_to_atnum(lit, words[1]) for words in block),
+                         dtype=int, count=natoms)
+    atcoords = np.array([words[2:5] for words in block], dtype=float).reshape(natoms, 3)
+    atcoords *= angstrom
+    atchgs = np.array([words[8] if len(words) == 9 else 0.0 for words in block],
+                      dtype=float)
+    attypes = tuple(words[5] for words in block)
     return atnums, atcoords, atchgs, attypes
 
 
-def _load_helper_bonds(lit: LineIterator, nbonds: int) -> Tuple[np.ndarray]:
+def _load_helper_bonds(lit: LineIterator, nbonds: int) -> np.ndarray:
     """Load bond information."""
-    bonds = np.empty((nbonds, 3))
-    for i in range(nbonds):
-        words = next(lit).split()
-        if words[3] == 'am':
-            words[3] = 4
-        # Substract one because of numbering starting at 0
-        bond = [int(words[1]) - 1, int(words[2]) - 1, int(words[3])]
-        if bond is None:
-            bond = [0, 0, 0]
-            lit.warn(f'Something wrong in the bond section: {bond}')
-        bonds[i] = bond
+    block = _load_block(lit, nbonds)
+    # Amide bonds ('am') are stored as bond type 4.
+    bonds = np.array([words[1:3] + ['4' if words[3] == 'am' else words[3]]
+                      for words in block], dtype=int).reshape(nbonds, 3)
+    # Substract one because of numbering starting at 0
+    bonds[:, :2] -= 1
     return bonds
 
 
@@ -128,12 +126,21 @@ def _load_helper_bonds(lit: LineIterator, nbonds: int) -> Tuple[np.ndarray]:
 def load_many(lit: LineIterator) -> Iterator[dict]:
     """Do not edit this docstring. It will be overwritten."""
     # MOL2 files with more molecules are a simple concatenation of individual MOL2 files,'
-    # making it trivial to load many frames.
+    # making it trivial to load many frames. Everything before the first molecule
+    # header is skipped, such that the file is read in a single pass and only the
+    # end of the file terminates the loop. Genuine format errors are not swallowed.
     while True:
         try:
-            yield load_one(lit)
-        except IOError:
+            line = next(lit)
+        except StopIteration:
             return
+        if line.startswith("@<TRIPOS>MOLECULE"):
+            lit.back(line)
+            try:
+                data = load_one(lit)
+            except StopIteration:
+                raise lit.error("File ended before all data was read.")
+            yield data
 
 
 @document_dump_one("MOL2", ['atcoords', 'atnums'], ['atcharges', 'atffparams', 'title'])
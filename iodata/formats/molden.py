@@ -30,6 +30,7 @@ from typing import Tuple, Union, TextIO
 import copy
 
 import numpy as np
+import scipy.sparse
 
 from ..basis import (angmom_its, angmom_sti, MolecularBasis, Shell,
                      convert_conventions, HORTON2_CONVENTIONS)
@@ -70,11 +71,23 @@ CONVENTIONS = {
 }
 
 
-@document_load_one("Molden", ['atcoords', 'atnums', 'atcorenums', 'mo', 'obasis'], ['title'])
-def load_one(lit: LineIterator) -> dict:
+LOAD_ONE_NOTES = """
+Molden and Molekel files from several programs contain errors in the normalization of
+the basis functions, which are detected by checking the norms of the orbitals. The
+optional argument ``norm_threshold`` sets the allowed deviation of the norms from one.
+By default, all orbitals are checked. When ``norm_nvirtual`` is set, only the occupied
+orbitals and the given number of virtual orbitals with the lowest energies are checked,
+which is faster for large basis sets.
+"""
+
+
+@document_load_one("Molden", ['atcoords', 'atnums', 'atcorenums', 'mo', 'obasis'], ['title'],
+                   LOAD_ONE_NOTES)
+def load_one(lit: LineIterator, norm_threshold: float = 1e-4,
+             norm_nvirtual: int = None) -> dict:
     """Do not edit this docstring. It will be overwritten."""
     result = _load_low(lit)
-    _fix_molden_from_buggy_codes(result, lit)
+    _fix_molden_from_buggy_codes(result, lit, norm_threshold, norm_nvirtual)
     return result
 
 
@@ -154,10 +167,11 @@ def _load_low(lit: LineIterator) -> dict:
 
     # Assign pure and Cartesian correctly. This needs to be done after reading
     # because the tags for pure functions may come after the basis set.
-    for shell in obasis.shells:
-        # Code only has to work for segmented contractions
-        if shell.angmoms[0] in pure_angmoms:
-            shell.kinds[0] = 'p'
+    # Shells are replaced instead of modified in place, see MolecularBasis.clear_cache.
+    # Code only has to work for segmented contractions
+    obasis = obasis._replace(shells=[
+        shell._replace(kinds=['p']) if shell.angmoms[0] in pure_angmoms else shell
+        for shell in obasis.shells])
 
     if coeffsb is None:
         if coeffsa.shape[0] != obasis.nbasis:
@@ -316,19 +330,91 @@ def _load_helper_coeffs(lit: LineIterator) -> Tuple:
     return (occsa, coeffsa, energiesa, irrepsa), (occsb, coeffsb, energiesb, irrepsb)
 
 
-def _is_normalized_properly(obasis: MolecularBasis, atcoords: np.ndarray,
-                            orb_alpha: np.ndarray, orb_beta: np.ndarray,
-                            threshold: float = 1e-4) -> bool:
-    """Test the normalization of the occupied and virtual orbitals.
+def _compute_primitive_overlap(obasis: MolecularBasis, atcoords: np.ndarray) -> np.ndarray:
+    """Compute the overlap matrix of all primitives in a segmented basis.
+
+    Every primitive of every shell is turned into a shell of its own, with a
+    contraction coefficient of one, keeping the conventions of ``obasis``.
 
     Parameters
     ----------
     obasis
-        A dictionary containing the parameters of the GOBasis class.
+        The segmented orbital basis set.
     atcoords
         The atomic Cartesian coordinates, shape = (natom, 3).
+
+    Returns
+    -------
+    olp_prim
+        The overlap matrix of the primitives. Functions of the same primitive
+        are contiguous and primitives are ordered as in ``obasis``.
+
+    """
+    prim_shells = []
+    for shell in obasis.shells:
+        for exponent in shell.exponents:
+            prim_shells.append(shell._replace(exponents=np.array([exponent]),
+                                              coeffs=np.ones((1, 1))))
+    return compute_overlap(obasis._replace(shells=prim_shells), atcoords)
+
+
+def _compute_contraction_matrix(obasis: MolecularBasis, conventions: dict) \
+        -> scipy.sparse.csr_matrix:
+    """Compute the matrix that transforms orbital coefficients to the primitives.
+
+    Parameters
+    ----------
+    obasis
+        The segmented orbital basis set, which may only differ from the one
+        used for the primitive overlap matrix in its contraction coefficients
+        and its conventions.
+    conventions
+        The conventions of the basis used for the primitive overlap matrix.
+
+    Returns
+    -------
+    contraction
+        A sparse matrix, shape=(nprimfn, nbasis), where nprimfn is the size of
+        the primitive overlap matrix.
+
+    """
+    rows = []
+    cols = []
+    values = []
+    iprimfn = 0
+    ibasis = 0
+    for shell in obasis.shells:
+        for coeff in shell.coeffs[:, 0]:
+            rows.append(np.arange(iprimfn, iprimfn + shell.nbasis))
+            cols.append(np.arange(ibasis, ibasis + shell.nbasis))
+            values.append(np.full(shell.nbasis, coeff))
+            iprimfn += shell.nbasis
+        ibasis += shell.nbasis
+    contraction = scipy.sparse.csr_matrix(
+        (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(iprimfn, ibasis))
+    # Also convert from the conventions of obasis to those of the primitives.
+    permutation, signs = convert_conventions(obasis, conventions)
+    convert = scipy.sparse.csr_matrix(
+        (signs.astype(float), (np.arange(ibasis), permutation)), shape=(ibasis, ibasis))
+    return contraction.dot(convert).tocsr()
+
+
+def _is_normalized_properly(obasis: MolecularBasis, olp_prim: np.ndarray,
+                            conventions: dict, orb_alpha: np.ndarray,
+                            orb_beta: np.ndarray, threshold: float = 1e-4) -> bool:
+    """Test the normalization of the occupied and virtual orbitals.
+
+    Parameters
+    ----------
+    obasis
+        The (possibly corrected) segmented orbital basis.
+    olp_prim
+        The overlap matrix of all primitives, see ``_compute_primitive_overlap``.
+    conventions
+        The conventions of the basis used to compute olp_prim.
     orb_alpha
-        The alpha orbitals coefficients
+        The alpha orbitals coefficients, or only the columns to be checked.
     orb_beta
         The beta orbitals (may be None).
     threshold
@@ -336,35 +422,20 @@ def _is_normalized_properly(obasis: MolecularBasis, atcoords: np.ndarray,
         the function returns False. True is returned otherwise.
 
     """
-    # Compute the overlap matrix. Unfortunately, we have to recalculate it at
-    # every attempt because also the primitive normalization may differ in
-    # different cases.
-    olp = compute_overlap(obasis, atcoords)
-
-    # Convenient code for debugging files coming from crappy QC codes.
-    # np.set_printoptions(linewidth=5000, precision=2, suppress=True, threshold=100000)
-    # coeffs = orb_alpha._coeffs
-    # if permutation is not None:
-    #     coeffs = coeffs[permutation].copy()
-    # if signs is not None:
-    #     coeffs = coeffs*signs.reshape(-1, 1)
-    # print np.dot(coeffs.T, np.dot(olp._array, coeffs))
-    # print
-
-    # Convert the orbitals to the conventions of the overlap matrix.
-    # permutation, signs = convert_conventions(obasis, HORTON2_CONVENTIONS)
+    # Different corrections of the basis only differ in contraction
+    # coefficients and conventions. Instead of recomputing the overlap matrix
+    # for each, the orbitals are expanded in the primitives.
+    contraction = _compute_contraction_matrix(obasis, conventions)
     orbs = [orb_alpha]
     if orb_beta is not None:
         orbs.append(orb_beta)
-    # Compute the norm of each occupied and virtual orbital. Keep track of
-    # the largest deviation from unity
+    # Compute the norms of all orbitals at once, without forming the overlap
+    # matrix of the contractions. Keep track of the largest deviation from unity
     error_max = 0.0
     for orb in orbs:
-        for iorb in range(orb.shape[1]):
-            vec = orb[:, iorb].copy()
-            norm = np.dot(vec, np.dot(olp, vec))
-            # print(iorb, norm)
-            error_max = max(error_max, abs(norm - 1))
+        prim_orb = contraction.dot(orb)
+        norms = np.einsum('ij,ij->j', prim_orb, np.dot(olp_prim, prim_orb))
+        error_max = max(error_max, abs(norms - 1).max(initial=0.0))
 
     # final judgement
     return error_max <= threshold
@@ -477,7 +548,8 @@ def _fix_obasis_turbomole(obasis: MolecularBasis) -> Union[MolecularBasis, None]
     return None
 
 
-def _fix_obasis_normalize_contractions(obasis: MolecularBasis) -> MolecularBasis:
+def _fix_obasis_normalize_contractions(obasis: MolecularBasis,
+                                       olp_prim: np.ndarray) -> MolecularBasis:
     """Return a basis with normalized contractions.
 
     Files written by Molden don't need this fix and have properly normalized
@@ -486,16 +558,19 @@ def _fix_obasis_normalize_contractions(obasis: MolecularBasis) -> MolecularBasis
     Molden files with unnormalized contractions. This renormalization is only a
     last resort in IOData. If we would do it up-front, like Molden, we would not
     be able to fix errors in files from ORCA and older PSI4 versions.
+
+    The norms of the contractions are taken from olp_prim, the overlap matrix
+    of the primitives in obasis, see ``_compute_primitive_overlap``.
     """
     fixed_shells = []
+    iprimfn = 0
     for shell in obasis.shells:
-        shell_obasis = MolecularBasis(
-            [shell._replace(icenter=0)],
-            obasis.conventions,
-            obasis.primitive_normalization
-        )
+        # 1) Select the first function of each primitive in the shell
+        indexes = iprimfn + np.arange(shell.nprim) * shell.nbasis
+        iprimfn += shell.nprim * shell.nbasis
         # 2) Get the first diagonal element of the overlap matrix
-        olpdiag = compute_overlap(shell_obasis, np.zeros((3, 1), float))[0, 0]
+        coeffs = shell.coeffs[:, 0]
+        olpdiag = np.dot(coeffs, np.dot(olp_prim[np.ix_(indexes, indexes)], coeffs))
         # 3) Normalize the contraction
         fixed_shell = copy.deepcopy(shell)
         fixed_shell.coeffs[:] /= np.sqrt(olpdiag)
@@ -503,7 +578,35 @@ def _fix_obasis_normalize_contractions(obasis: MolecularBasis) -> MolecularBasis
     return MolecularBasis(fixed_shells, obasis.conventions, obasis.primitive_normalization)
 
 
-def _fix_molden_from_buggy_codes(result: dict, lit: LineIterator):
+def _select_orbitals(occs: np.ndarray, energies: np.ndarray, nvirtual: int = None) \
+        -> np.ndarray:
+    """Select the orbitals whose normalization is checked.
+
+    Parameters
+    ----------
+    occs
+        The occupation numbers of the orbitals.
+    energies
+        The orbital energies.
+    nvirtual
+        The number of virtual orbitals to include, with the lowest energies.
+        When None, all orbitals are selected.
+
+    Returns
+    -------
+    indexes
+        The sorted indexes of the selected orbitals.
+
+    """
+    if nvirtual is None:
+        return np.arange(len(occs))
+    virtual = (occs == 0).nonzero()[0]
+    virtual = virtual[np.argsort(energies[virtual], kind='stable')[:nvirtual]]
+    return np.sort(np.concatenate([(occs != 0).nonzero()[0], virtual]))
+
+
+def _fix_molden_from_buggy_codes(result: dict, lit: LineIterator, norm_threshold: float = 1e-4,
+                                 norm_nvirtual: int = None):
     """Detect errors in the data loaded from a molden or mkl file and correct.
 
     This function can recognize erroneous files created by PSI4, ORCA and
@@ -515,50 +618,62 @@ def _fix_molden_from_buggy_codes(result: dict, lit: LineIterator):
         A dictionary with the data loaded in the ``load_molden`` function.
     lit
         The line iterator to read the data from, used for warnings.
+    norm_threshold
+        The allowed deviation of the orbital norms from one.
+    norm_nvirtual
+        When given, only the occupied and this number of virtual orbitals are
+        used to test the normalization. By default, all orbitals are used.
 
     """
     obasis = result['obasis']
     atcoords = result['atcoords']
-    if result['mo'].kind == 'restricted':
-        coeffsa = result['mo'].coeffs
+    mo = result['mo']
+    if mo.kind == 'restricted':
+        coeffsa = mo.coeffs[:, _select_orbitals(mo.occs, mo.energies, norm_nvirtual)]
         # Skip testing coeffsb if it is the same array as coeffsa.
         coeffsb = None
-    elif result['mo'].kind == 'unrestricted':
-        coeffsa = result['mo'].coeffsa
-        coeffsb = result['mo'].coeffsb
+    elif mo.kind == 'unrestricted':
+        coeffsa = mo.coeffsa[:, _select_orbitals(mo.occsa, mo.energiesa, norm_nvirtual)]
+        coeffsb = mo.coeffsb[:, _select_orbitals(mo.occsb, mo.energiesb, norm_nvirtual)]
     else:
-        raise ValueError('Molecular orbital kind={0} not recognized'.format(result['mo'].kind))
+        raise ValueError('Molecular orbital kind={0} not recognized'.format(mo.kind))
+
+    # All corrections below only change contraction coefficients and
+    # conventions, so the overlap of the primitives is computed only once.
+    olp_prim = _compute_primitive_overlap(obasis, atcoords)
+
+    def is_normalized(candidate):
+        return _is_normalized_properly(candidate, olp_prim, obasis.conventions,
+                                       coeffsa, coeffsb, norm_threshold)
 
-    if _is_normalized_properly(obasis, atcoords, coeffsa, coeffsb):
+    if is_normalized(obasis):
         # The file is good. No need to change obasis.
         return
 
     # --- ORCA
     orca_obasis = _fix_obasis_orca(obasis)
-    if _is_normalized_properly(orca_obasis, atcoords, coeffsa, coeffsb):
+    if is_normalized(orca_obasis):
         lit.warn('Corrected for typical ORCA errors in Molden/MKL file.')
         result['obasis'] = orca_obasis
         return
 
     # --- PSI4
     psi4_obasis = _fix_obasis_psi4(obasis)
-    if psi4_obasis is not None and \
-       _is_normalized_properly(psi4_obasis, atcoords, coeffsa, coeffsb):
+    if psi4_obasis is not None and is_normalized(psi4_obasis):
         lit.warn('Corrected for old PSI4 errors in Molden/MKL file.')
         result['obasis'] = psi4_obasis
         return
 
     # -- Turbomole
     turbom_obasis = _fix_obasis_turbomole(obasis)
-    if turbom_obasis is not None and \
-       _is_normalized_properly(turbom_obasis, atcoords, coeffsa, coeffsb):
+    if turbom_obasis is not None and is_normalized(turbom_obasis):
         lit.warn('Corrected for Turbomole errors in Molden/MKL file.')
         result['obasis'] = turbom_obasis
         return
 
     # --- Renormalized contractions
-    normed_obasis = _fix_obasis_normalize_contractions(obasis)
-    if _is_normalized_properly(normed_obasis, atcoords, coeffsa, coeffsb):
+    normed_obasis = _fix_obasis_normalize_contractions(obasis, olp_prim)
+    if is_normalized(normed_obasis):
         lit.warn('Corrected for unnormalized contractions in Molden/MKL file.')
         result['obasis'] = normed_obasis
         return
@@ -28,7 +28,7 @@ from typing import Tuple, List
 
 import numpy as np
 
-from .molden import CONVENTIONS, _fix_molden_from_buggy_codes
+from .molden import CONVENTIONS, LOAD_ONE_NOTES, _fix_molden_from_buggy_codes
 from ..basis import angmom_sti, MolecularBasis, Shell
 from ..docstrings import document_load_one
 from ..orbitals import MolecularOrbitals
@@ -149,8 +149,9 @@ def _load_helper_occ(lit: LineIterator) -> np.ndarray:
 
 
 # pylint: disable=too-many-branches,too-many-statements
-@document_load_one("Molekel", ['atcoords', 'atnums', 'mo', 'obasis'])
-def load_one(lit: LineIterator) -> dict:
+@document_load_one("Molekel", ['atcoords', 'atnums', 'mo', 'obasis'], [], LOAD_ONE_NOTES)
+def load_one(lit: LineIterator, norm_threshold: float = 1e-4,
+             norm_nvirtual: int = None) -> dict:
     """Do not edit this docstring. It will be overwritten."""
     charge = None
     atnums = None
@@ -231,5 +232,5 @@ def load_one(lit: LineIterator) -> dict:
         'obasis': obasis,
         'mo': mo,
     }
-    _fix_molden_from_buggy_codes(result, lit)
+    _fix_molden_from_buggy_codes(result, lit, norm_threshold, norm_nvirtual)
     return result
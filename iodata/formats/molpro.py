@@ -29,13 +29,17 @@ Notes
 """
 
 
-from typing import TextIO
+from itertools import islice
+import os
+from typing import TextIO, Tuple
+import zipfile
 
 import numpy as np
 
 from ..docstrings import document_load_one, document_dump_one
+from ..fourindex import SymmetricFourIndex, unpack_quartet
 from ..iodata import IOData
-from ..utils import set_four_index_element, LineIterator
+from ..utils import get_cache_filename, LineIterator
 
 
 __all__ = []
@@ -44,9 +48,24 @@ __all__ = []
 PATTERNS = ['*FCIDUMP*']
 
 
+# Number of integral lines that are parsed at once.
+CHUNK_SIZE = 1000000
+# Number of lines that are formatted at once when writing an FCIDUMP file.
+DUMP_CHUNK_SIZE = 10000
+
+
+LOAD_ONE_NOTES = """
+The optional argument ``scratch`` can be set to a directory in which the two-electron
+integrals are stored as a memory-mapped NPY file, instead of keeping them in memory. When
+the same FCIDUMP file is loaded again with the same scratch directory, all integrals are
+taken from the cache and the integral lines are not parsed. An incomplete or inconsistent
+cache is regenerated.
+"""
+
+
 @document_load_one("Molpro 2012 FCIDUMP", ['core_energy', 'one_ints', 'nelec', 'spinpol',
-                                           'two_ints'])
-def load_one(lit: LineIterator) -> dict:
+                                           'two_ints'], [], LOAD_ONE_NOTES)
+def load_one(lit: LineIterator, scratch: str = None) -> dict:
     """Do not edit this docstring. It will be overwritten."""
     # check header
     line = next(lit)
@@ -71,31 +90,28 @@ def load_one(lit: LineIterator) -> dict:
             break
 
     # read the integrals
-    one_mo = np.zeros((nbasis, nbasis))
-    two_mo = np.zeros((nbasis, nbasis, nbasis, nbasis))
-    core_energy = 0.0
-
-    for line in lit:
-        words = line.split()
-        if len(words) != 5:
-            lit.error('Expecting 5 fields on each data line in FCIDUMP')
-        value = float(words[0])
-        if words[3] != '0':
-            ii = int(words[1]) - 1
-            ij = int(words[2]) - 1
-            ik = int(words[3]) - 1
-            il = int(words[4]) - 1
-            # Uncomment the following line if you want to assert that the
-            # FCIDUMP file does not contain duplicate 4-index entries.
-            # assert two_mo.get_element(ii,ik,ij,il) == 0.0
-            set_four_index_element(two_mo, ii, ik, ij, il, value)
-        elif words[1] != '0':
-            ii = int(words[1]) - 1
-            ij = int(words[2]) - 1
-            one_mo[ii, ij] = value
-            one_mo[ij, ii] = value
+    if scratch is None:
+        one_mo, two_mo, core_energy = _load_integrals(lit, SymmetricFourIndex(nbasis))
+    else:
+        fn_two = get_cache_filename(lit.filename, scratch, 'two_mo.npy')
+        fn_one = get_cache_filename(lit.filename, scratch, 'one_mo.npz')
+        cached = _load_cached_integrals(nbasis, fn_one, fn_two)
+        if cached is None:
+            # The final names are only used once each cache file is complete.
+            fn_part = fn_two + '.part'
+            one_mo, two_mo, core_energy = _load_integrals(
+                lit, SymmetricFourIndex.create_npy(nbasis, fn_part))
+            two_mo.data.flush()
+            os.replace(fn_part, fn_two)
+            # The NPZ file is written last and refers to the NPY file it belongs to.
+            stat = os.stat(fn_two)
+            fn_part = fn_one + '.part'
+            with open(fn_part, 'wb') as f:
+                np.savez(f, core_mo=one_mo, core_energy=core_energy,
+                         two_mo_stat=[stat.st_ino, stat.st_size, stat.st_mtime_ns])
+            os.replace(fn_part, fn_one)
         else:
-            core_energy = value
+            one_mo, two_mo, core_energy = cached
 
     return {
         'nelec': nelec,
@@ -106,14 +122,132 @@ def load_one(lit: LineIterator) -> dict:
     }
 
 
-LOAD_ONE_NOTES = """
+def _load_cached_integrals(nbasis: int, fn_one: str, fn_two: str) \
+        -> Tuple[np.ndarray, SymmetricFourIndex, float]:
+    """Load all integrals from the cache files of an FCIDUMP file.
+
+    Parameters
+    ----------
+    nbasis
+        The number of orbitals.
+    fn_one
+        The NPZ file with the one-electron integrals and the core energy.
+    fn_two
+        The NPY file with the two-electron integrals.
+
+    Returns
+    -------
+    one_mo, two_mo, core_energy
+        The same results as ``_load_integrals``, or None when one of the
+        cache files is missing or unreadable, or when they do not belong
+        together. The cache must then be regenerated.
+
+    """
+    if not (os.path.isfile(fn_one) and os.path.isfile(fn_two)):
+        return None
+    stat = os.stat(fn_two)
+    try:
+        with np.load(fn_one) as cached:
+            if cached['two_mo_stat'].tolist() != [stat.st_ino, stat.st_size, stat.st_mtime_ns]:
+                return None
+            one_mo = cached['core_mo']
+            core_energy = cached['core_energy'][()]
+        two_mo = SymmetricFourIndex.load_npy(nbasis, fn_two)
+    except (OSError, KeyError, TypeError, ValueError, zipfile.BadZipFile):
+        return None
+    if one_mo.shape != (nbasis, nbasis):
+        return None
+    return one_mo, two_mo, core_energy
+
+
+def _load_integrals(lit: LineIterator, two_mo: SymmetricFourIndex) \
+        -> Tuple[np.ndarray, SymmetricFourIndex, float]:
+    """Load all integrals from the data lines of an FCIDUMP file.
+
+    Parameters
+    ----------
+    lit
+        The line iterator to read the data from, positioned after the header.
+    two_mo
+        An operator filled with zeros, in which the two-electron integrals are
+        stored.
+
+    Returns
+    -------
+    one_mo
+        The one-electron integrals.
+    two_mo
+        The same object as the argument, now containing the two-electron
+        integrals.
+    core_energy
+        The core energy.
+
+    """
+    nbasis = two_mo.nbasis
+    one_mo = np.zeros((nbasis, nbasis))
+    core_energy = 0.0
+    while True:
+        columns = _load_integral_columns(lit)
+        if columns is None:
+            break
+        values = columns[:, 0]
+        indexes = columns[:, 1:].astype(int) - 1
+        # Classify the rows: two-electron integrals have four non-zero indexes,
+        # one-electron integrals two and the core energy none. Rows with only one
+        # non-zero index (orbital energies) are not loaded.
+        mask_two = indexes[:, 2] >= 0
+        mask_one = ~mask_two & (indexes[:, 1] >= 0)
+        mask_core = ~mask_two & (indexes[:, 0] < 0)
+        ii, ij, ik, il = indexes[mask_two].T
+        two_mo[ii, ik, ij, il] = values[mask_two]
+        ii, ij = indexes[mask_one, :2].T
+        one_mo[ii, ij] = values[mask_one]
+        one_mo[ij, ii] = values[mask_one]
+        if mask_core.any():
+            core_energy = values[mask_core][-1]
+    return one_mo, two_mo, core_energy
+
+
+def _load_integral_columns(lit: LineIterator) -> np.ndarray:
+    """Load a chunk of integral lines from an FCIDUMP file in one go.
+
+    Parameters
+    ----------
+    lit
+        The line iterator to read the data from.
+
+    Returns
+    -------
+    columns
+        An array with shape (nline, 5), in which each row contains the value and
+        the four (one-based) indexes of an integral. None is returned at the end
+        of the file.
+
+    """
+    lines = list(islice(lit, CHUNK_SIZE))
+    if not lines:
+        return None
+    words = ''.join(lines).split()
+    if len(words) != 5 * len(lines):
+        lit.error('Expecting 5 fields on each data line in FCIDUMP')
+    try:
+        return np.array(words, dtype=float).reshape(-1, 5)
+    except ValueError:
+        lit.error('Could not convert all fields in FCIDUMP data lines to numbers')
+
+
+DUMP_ONE_NOTES = """
 The dictionary ``one_ints`` must contain a field ``core_mo``. Similarly, ``two_ints`` must
-contain ``two_mo``.
+contain ``two_mo``, which can be a dense array or a ``SymmetricFourIndex`` instance.
+
+The optional argument ``threshold`` (default 0.0) can be used to skip integrals whose
+absolute value is not larger than the threshold. Non-finite values are always written.
 """
 
+
 @document_dump_one("Molpro 2012 FCIDUMP", ['one_ints', 'two_ints'],
-                   ['core_energy', 'nelec', 'spinpol'], LOAD_ONE_NOTES)
-def dump_one(f: TextIO, data: IOData):
+                   ['core_energy', 'nelec', 'spinpol'], DUMP_ONE_NOTES)
+def dump_one(f: TextIO, data: IOData, threshold: float = 0.0):
     """Do not edit this docstring. It will be overwritten."""
     one_mo = data.one_ints['core_mo']
 
@@ -126,20 +260,39 @@ def dump_one(f: TextIO, data: IOData):
     print('  ISYM=1', file=f)
     print(' &END', file=f)
 
-    # Write integrals and core energy
+    # Write integrals and core energy. The unique elements of SymmetricFourIndex
+    # are stored in the canonical order of the FCIDUMP format, such that the
+    # compact indexes can be processed in chunks of increasing value.
     two_mo = data.two_ints['two_mo']
-    for i in range(nactive):  # pylint: disable=too-many-nested-blocks
-        for j in range(i + 1):
-            for k in range(nactive):
-                for l in range(k + 1):
-                    if (i * (i + 1)) / 2 + j >= (k * (k + 1)) / 2 + l:
-                        value = two_mo[i, k, j, l]
-                        if value != 0.0:
-                            print(f'{value:23.16e} {i+1:4d} {j+1:4d} {k+1:4d} {l+1:4d}', file=f)
-    for i in range(nactive):
-        for j in range(i + 1):
-            value = one_mo[i, j]
-            if value != 0.0:
-                print(f'{value:23.16e} {i+1:4d} {j+1:4d} {0:4d} {0:4d}', file=f)
+    npair = (nactive * (nactive + 1)) // 2
+    nunique = (npair * (npair + 1)) // 2
+    for begin in range(0, nunique, CHUNK_SIZE):
+        index = np.arange(begin, min(begin + CHUNK_SIZE, nunique))
+        if isinstance(two_mo, SymmetricFourIndex):
+            values = two_mo.data[index]
+        else:
+            values = two_mo[unpack_quartet(index)]
+        mask = _select_integrals(values, threshold)
+        i, k, j, l = unpack_quartet(index[mask])
+        # Physicists' indexes (i, k, j, l) correspond to (ij|kl) in chemists' notation.
+        _dump_integral_lines(f, values[mask], i + 1, j + 1, k + 1, l + 1)
+    i, j = np.tril_indices(nactive)
+    values = one_mo[i, j]
+    mask = _select_integrals(values, threshold)
+    zeros = np.zeros(mask.sum(), dtype=int)
+    _dump_integral_lines(f, values[mask], i[mask] + 1, j[mask] + 1, zeros, zeros)
     if data.core_energy is not None:
         print(f'{data.core_energy:23.16e} {0:4d} {0:4d} {0:4d} {0:4d}', file=f)
+
+
+def _select_integrals(values: np.ndarray, threshold: float) -> np.ndarray:
+    """Return a mask for the integrals to be written, including non-finite values."""
+    return ~(abs(values) <= threshold)
+
+
+def _dump_integral_lines(f: TextIO, values: np.ndarray, *indexes: np.ndarray):
+    """Write lines with an integral and four indexes, one chunk of lines at a time."""
+    for begin in range(0, len(values), DUMP_CHUNK_SIZE):
+        end = begin + DUMP_CHUNK_SIZE
+        chunk = np.column_stack([values[begin:end]] + [index[begin:end] for index in indexes])
+        np.savetxt(f, chunk, fmt='%23.16e %4d %4d %4d %4d')
@@ -0,0 +1,249 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""IOData NPZ file format.
+
+This is a binary format to store IOData instances without loss of information,
+e.g. to cache results between different steps of a workflow. It is a NumPy
+NPZ (zip) file, in which all arrays are stored as separate members. The
+structure of the remaining data (dictionaries, orbitals, scalars, ...) is
+stored as a JSON string. No objects are pickled. The orbital basis is stored
+in the packed representation, see :py:class:`iodata.basis.PackedBasis`.
+
+A file may contain multiple frames, written with ``dump_many``. The loaders
+accept an optional ``attrs`` argument with a list of attributes to load.
+Only the arrays needed for these attributes are read from the file.
+
+Files must have the extension ``.iodata.npz`` to be recognized, such that plain
+NumPy NPZ files are not mistaken for this format. Being a binary format, the
+loaders receive a filename instead of a line iterator.
+"""
+
+
+import json
+import zipfile
+from typing import BinaryIO, Iterator, List
+
+import attr
+import numpy as np
+
+from ..basis import MolecularBasis, PackedBasis, Shell
+from ..docstrings import (document_load_one, document_load_many, document_dump_one,
+                          document_dump_many)
+from ..fourindex import SymmetricFourIndex
+from ..iodata import IOData
+from ..orbitals import MolecularOrbitals
+from ..utils import Cube, FileFormatError
+
+
+__all__ = []
+
+
+PATTERNS = ['*.iodata.npz']
+# The loaders receive a filename and the dumpers a file opened in binary mode.
+BINARY = True
+
+
+VERSION = 1
+# Mapping of the names of IOData attributes to the corresponding attrs fields.
+FIELDS = {field.name.lstrip('_'): field.name for field in attr.fields(IOData)}
+NAMEDTUPLES = {cls.__name__: cls for cls in [Cube, MolecularOrbitals, PackedBasis, Shell]}
+
+
+LOAD_NOTES = """\
+Only the attributes present in the file are loaded. With the optional argument
+``attrs``, a list of attribute names, only a subset of the attributes is loaded.
+The other ones are not read from the file.
+"""
+
+
+@document_load_one("IOData NPZ", [], sorted(FIELDS), LOAD_NOTES, binary=True)
+def load_one(filename: str, attrs: List[str] = None) -> dict:
+    """Do not edit this docstring. It will be overwritten."""
+    with _NPZReader(filename) as npz:
+        if '0/meta' not in npz:
+            npz.error('No frames found in file.')
+        return _load_frame(npz, 0, attrs)
+
+
+@document_load_many("IOData NPZ", [], sorted(FIELDS), LOAD_NOTES, binary=True)
+def load_many(filename: str, attrs: List[str] = None) -> Iterator[dict]:
+    """Do not edit this docstring. It will be overwritten."""
+    with _NPZReader(filename) as npz:
+        iframe = 0
+        while '{}/meta'.format(iframe) in npz:
+            yield _load_frame(npz, iframe, attrs)
+            iframe += 1
+
+
+DUMP_NOTES = """\
+Use ``compress=True`` to compress the arrays in the file. This saves disk space
+at the expense of slower reading and writing.
+"""
+
+
+@document_dump_one("IOData NPZ", [], sorted(FIELDS), DUMP_NOTES)
+def dump_one(f: BinaryIO, data: IOData, compress: bool = False):
+    """Do not edit this docstring. It will be overwritten."""
+    dump_many(f, [data], compress)
+
+
+@document_dump_many("IOData NPZ", [], sorted(FIELDS), DUMP_NOTES)
+def dump_many(f: BinaryIO, datas: Iterator[IOData], compress: bool = False):
+    """Do not edit this docstring. It will be overwritten."""
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zipfile.ZipFile(f, 'w', compression=compression, allowZip64=True) as fzip:
+        # Frames are written one by one, such that only one frame is kept in
+        # memory at the same time.
+        for iframe, data in enumerate(datas):
+            prefix = '{}/'.format(iframe)
+            arrays = {}
+            meta = {'version': VERSION, 'attrs': {}}
+            for name, field_name in FIELDS.items():
+                value = getattr(data, field_name)
+                if value is None or (isinstance(value, dict) and not value):
+                    continue
+                meta['attrs'][name] = _encode(value, prefix + name, arrays)
+            arrays[prefix + 'meta'] = np.array(json.dumps(meta))
+            for key, array in arrays.items():
+                with fzip.open(key + '.npy', 'w', force_zip64=True) as fmember:
+                    np.lib.format.write_array(fmember, np.asarray(array), allow_pickle=False)
+
+
+class _NPZReader:
+    """Read arrays from an NPZ file, with a constant-time lookup of its members.
+
+    Parameters
+    ----------
+    filename
+        The NPZ file to read.
+
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        try:
+            self._fzip = zipfile.ZipFile(filename)
+        except (OSError, zipfile.BadZipFile) as exc:
+            self.error('Could not open as NPZ file: {}'.format(exc))
+        self._members = {info.filename[:-4]: info for info in self._fzip.infolist()
+                         if info.filename.endswith('.npy')}
+
+    def __enter__(self) -> '_NPZReader':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._fzip.close()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._members
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        info = self._members.get(key)
+        if info is None:
+            self.error('Missing array in NPZ file: {}'.format(key))
+        with self._fzip.open(info) as fmember:
+            return np.lib.format.read_array(fmember, allow_pickle=False)
+
+    def error(self, msg: str):
+        """Raise an error while reading the file."""
+        raise FileFormatError('{}: {}'.format(self.filename, msg))
+
+
+def _load_frame(npz: _NPZReader, iframe: int, attrs: List[str] = None) -> dict:
+    """Load the attributes of one frame from an open NPZ file."""
+    if attrs is not None:
+        unknown = set(attrs) - set(FIELDS)
+        if unknown:
+            raise ValueError('Unknown IOData attribute(s): {}'.format(', '.join(sorted(unknown))))
+    meta = json.loads(str(npz['{}/meta'.format(iframe)]))
+    if meta.get('version') != VERSION:
+        npz.error('Unsupported IOData NPZ version: {}'.format(meta.get('version')))
+    return {name: _decode(desc, npz) for name, desc in meta['attrs'].items()
+            if attrs is None or name in attrs}
+
+
+def _encode(value, key: str, arrays: dict):
+    """Convert a value into a JSON-serializable description.
+
+    Parameters
+    ----------
+    value
+        The value to encode.
+    key
+        The name of the NPZ member to use if value is an array. Nested values
+        use keys derived from this one.
+    arrays
+        A dictionary to which arrays are added, with NPZ member names as keys.
+
+    Returns
+    -------
+    desc
+        Plain scalars are returned as such. All other values are described
+        by a dictionary with a ``type`` item.
+
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise TypeError('Cannot store arrays of Python objects: {}'.format(key))
+        arrays[key] = value
+        return {'type': 'array', 'key': key}
+    if isinstance(value, MolecularBasis):
+        return {'type': 'basis', 'packed': _encode(value.to_packed(), key, arrays)}
+    if isinstance(value, SymmetricFourIndex):
+        return {'type': 'fourindex', 'nbasis': value.nbasis,
+                'data': _encode(value.data, key, arrays)}
+    if NAMEDTUPLES.get(type(value).__name__) is type(value):
+        return {'type': 'namedtuple', 'name': type(value).__name__,
+                'fields': [_encode(item, '{}/{}'.format(key, name), arrays)
+                           for name, item in zip(value._fields, value)]}
+    if isinstance(value, dict):
+        return {'type': 'dict', 'items': [
+            [_encode(item_key, None, arrays), _encode(item, '{}/{}'.format(key, i), arrays)]
+            for i, (item_key, item) in enumerate(value.items())]}
+    if isinstance(value, (list, tuple)):
+        return {'type': type(value).__name__,
+                'items': [_encode(item, '{}/{}'.format(key, i), arrays)
+                          for i, item in enumerate(value)]}
+    raise TypeError('Cannot store value of type {}: {}'.format(type(value).__name__, key))
+
+
+def _decode(desc, npz: _NPZReader):
+    """Convert a description made by _encode back into a value, reading arrays from npz."""
+    if not isinstance(desc, dict):
+        return desc
+    kind = desc['type']
+    if kind == 'array':
+        return npz[desc['key']]
+    if kind == 'basis':
+        return _decode(desc['packed'], npz).to_basis()
+    if kind == 'fourindex':
+        return SymmetricFourIndex(desc['nbasis'], _decode(desc['data'], npz))
+    if kind == 'namedtuple':
+        return NAMEDTUPLES[desc['name']](*[_decode(item, npz) for item in desc['fields']])
+    if kind == 'dict':
+        return {_decode(item_key, npz): _decode(item, npz) for item_key, item in desc['items']}
+    if kind == 'list':
+        return [_decode(item, npz) for item in desc['items']]
+    if kind == 'tuple':
+        return tuple(_decode(item, npz) for item in desc['items'])
+    raise ValueError('Unknown type in IOData NPZ file: {}'.format(kind))
@@ -102,7 +102,7 @@ def _helper_geometry(lit: TextIO, natom: int) -> Tuple[np.ndarray, np.ndarray]:
 
     """
     atcoords = np.zeros((natom, 3))
-    atnums = np.zeros(natom)
+    atnums = np.zeros(natom, int)
     # skip the dashed line
     next(lit)
     # skip the titles in table
@@ -0,0 +1,283 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Compact storage of four-index operators with 8-fold permutational symmetry."""
+
+
+from typing import Tuple
+
+import numpy as np
+
+
+__all__ = ['SymmetricFourIndex', 'pack_pair', 'unpack_pair', 'pack_quartet', 'unpack_quartet']
+
+
+def pack_pair(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Return the index of a symmetric pair in lower-triangular (row-major) order.
+
+    Parameters
+    ----------
+    i, j
+        Integers or integer arrays with the two indexes of the pair. The order
+        of the two is irrelevant.
+
+    Returns
+    -------
+    index
+        ``i*(i+1)//2 + j`` when ``i >= j``, otherwise ``j*(j+1)//2 + i``.
+
+    """
+    big = np.maximum(i, j)
+    return big * (big + 1) // 2 + np.minimum(i, j)
+
+
+def unpack_pair(index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the indexes ``(i, j)``, with ``i >= j``, of a packed pair.
+
+    This is the inverse of :py:func:`pack_pair`.
+    """
+    index = np.asarray(index, dtype=np.int64)
+    i = ((np.sqrt(8.0 * index + 1) - 1) // 2).astype(np.int64)
+    # Correct for rounding errors in the square root at large indexes.
+    i += (i + 1) * (i + 2) // 2 <= index
+    i -= i * (i + 1) // 2 > index
+    return i, index - i * (i + 1) // 2
+
+
+def pack_quartet(i: np.ndarray, j: np.ndarray, k: np.ndarray, l: np.ndarray) -> np.ndarray:
+    r"""Return the compact index of the element :math:`\braket{ij}{kl}`.
+
+    All arguments can be integers or (broadcastable) integer arrays. The result
+    is the same for all eight index tuples related by permutational symmetry.
+    See :py:class:`SymmetricFourIndex` for the ordering of the compact indexes.
+    """
+    return pack_pair(pack_pair(i, k), pack_pair(j, l))
+
+
+def unpack_quartet(index: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Return the canonical (physicists') indexes ``(i, j, k, l)`` of compact indexes.
+
+    This is the inverse of :py:func:`pack_quartet`. In chemists' notation, the
+    results correspond to :math:`(ik|jl)` with ``i >= k``, ``j >= l`` and
+    ``ik >= jl``.
+    """
+    pair0, pair1 = unpack_pair(index)
+    i, k = unpack_pair(pair0)
+    j, l = unpack_pair(pair1)
+    return i, j, k, l
+
+
+class SymmetricFourIndex:
+    r"""A real four-index operator of which only the symmetry-unique elements are stored.
+
+    Elements are addressed in physicists' notation, i.e. ``op[i, j, k, l]``
+    corresponds to :math:`\braket{ij}{kl}`. The eight index tuples related by
+    the permutational symmetry of real two-electron integrals all refer to the
+    same stored element, which reduces the memory footprint by roughly a factor
+    eight, compared to a dense ``(nbasis, nbasis, nbasis, nbasis)`` array.
+
+    The unique elements are kept in a flat array, ``data``, in the canonical
+    order of the FCIDUMP format: in chemists' notation, :math:`(ij|kl)` with
+    ``i >= j``, ``k >= l`` and ``ij >= kl``, sorted by increasing compound pair
+    indexes ``ij`` and ``kl``.
+
+    Conversion to a dense array is only done on request, with ``to_dense`` or
+    ``np.asarray``. Indexing with integers (or integer arrays) is done directly
+    on the compact storage. Indexing with four slices returns a dense sub-block.
+    Other forms of indexing fall back to a dense expansion.
+
+    Attributes
+    ----------
+    nbasis
+        The number of basis functions (or orbitals), i.e. the size of each axis.
+    data
+        The symmetry-unique elements, shape=(size,) with
+        ``size = npair*(npair+1)//2`` and ``npair = nbasis*(nbasis+1)//2``.
+
+    """
+
+    def __init__(self, nbasis: int, data: np.ndarray = None):
+        """Initialize a SymmetricFourIndex object.
+
+        Parameters
+        ----------
+        nbasis
+            The size of each axis of the four-index operator.
+        data
+            The symmetry-unique elements, in the order documented above. When
+            not given, an array of zeros is allocated.
+
+        """
+        npair = (nbasis * (nbasis + 1)) // 2
+        size = (npair * (npair + 1)) // 2
+        if data is None:
+            data = np.zeros(size)
+        elif data.shape != (size,):
+            raise TypeError('Expect data with shape ({},), got {}'.format(size, data.shape))
+        self.nbasis = nbasis
+        self.data = data
+
+    @classmethod
+    def from_dense(cls, dense: np.ndarray) -> 'SymmetricFourIndex':
+        """Construct a compact operator from a dense four-index array.
+
+        Only the canonical elements are copied. No check is carried out on the
+        symmetry of the dense array.
+        """
+        nbasis = dense.shape[0]
+        if dense.shape != (nbasis,) * 4:
+            raise TypeError('Expect a four-index array with equal axes, got shape {}'.format(
+                dense.shape))
+        result = cls(nbasis)
+        result.data[:] = dense[result.unpack_indices()]
+        return result
+
+    @classmethod
+    def create_npy(cls, nbasis: int, filename: str) -> 'SymmetricFourIndex':
+        """Create a zero operator whose data is memory-mapped to a new NPY file.
+
+        Parameters
+        ----------
+        nbasis
+            The size of each axis of the four-index operator.
+        filename
+            The NPY file to be created. An existing file is overwritten.
+
+        """
+        npair = (nbasis * (nbasis + 1)) // 2
+        size = (npair * (npair + 1)) // 2
+        data = np.lib.format.open_memmap(filename, mode='w+', dtype=float, shape=(size,))
+        return cls(nbasis, data)
+
+    @classmethod
+    def load_npy(cls, nbasis: int, filename: str, mmap_mode: str = 'r') -> 'SymmetricFourIndex':
+        """Open an operator whose data is memory-mapped to an existing NPY file.
+
+        Parameters
+        ----------
+        nbasis
+            The size of each axis of the four-index operator.
+        filename
+            The NPY file with the symmetry-unique elements.
+        mmap_mode
+            The mode of the memory map, see ``numpy.load``. The default
+            (``'r'``) gives read-only access.
+
+        """
+        return cls(nbasis, np.load(filename, mmap_mode=mmap_mode))
+
+    @property
+    def shape(self) -> Tuple[int, int, int, int]:
+        """Return the shape of the equivalent dense array."""
+        return (self.nbasis,) * 4
+
+    @property
+    def ndim(self) -> int:
+        """Return the number of dimensions of the equivalent dense array."""
+        return 4
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Return the data type of the elements."""
+        return self.data.dtype
+
+    def __len__(self) -> int:
+        return self.nbasis
+
+    def pack_indices(self, i: np.ndarray, j: np.ndarray, k: np.ndarray,
+                     l: np.ndarray) -> np.ndarray:
+        r"""Return the position in ``data`` of the element :math:`\braket{ij}{kl}`.
+
+        All arguments can be integers or (broadcastable) integer arrays.
+        """
+        return pack_quartet(i, j, k, l)
+
+    def unpack_indices(self, index: np.ndarray = None) -> Tuple[np.ndarray, ...]:
+        """Return the canonical (physicists') indexes ``(i, j, k, l)`` of packed elements.
+
+        Parameters
+        ----------
+        index
+            Positions in ``data``. When not given, all positions are unpacked.
+
+        Returns
+        -------
+        i, j, k, l
+            Four integer arrays with the same shape as ``index``, such that
+            ``self.data[index] == self[i, j, k, l]``. See
+            :py:func:`unpack_quartet` for details.
+
+        """
+        if index is None:
+            index = np.arange(len(self.data))
+        return unpack_quartet(index)
+
+    def to_dense(self) -> np.ndarray:
+        """Return a dense copy with shape (nbasis, nbasis, nbasis, nbasis)."""
+        nbasis = self.nbasis
+        result = np.empty(self.shape, dtype=self.dtype)
+        pairs = pack_pair(*np.indices((nbasis, nbasis)))
+        # Fill one slice at a time to limit the size of temporary index arrays.
+        for i in range(nbasis):
+            result[i] = self.data[pack_pair(pairs[i][None, :, None], pairs[:, None, :])]
+        return result
+
+    def __array__(self, dtype=None, copy=None):
+        result = self.to_dense()
+        if dtype is not None:
+            result = result.astype(dtype, copy=False)
+        return result
+
+    def _convert_key(self, key):
+        """Translate a key into broadcastable index arrays, or return None."""
+        if not isinstance(key, tuple) or len(key) != 4:
+            return None
+        has_slice = any(isinstance(item, slice) for item in key)
+        indexes = []
+        for item in key:
+            if isinstance(item, slice):
+                indexes.append(np.arange(self.nbasis)[item])
+                continue
+            if item is Ellipsis or item is None:
+                return None
+            item = np.asarray(item)
+            if item.dtype.kind not in 'iu' or (has_slice and item.ndim > 0):
+                return None
+            if ((item < -self.nbasis) | (item >= self.nbasis)).any():
+                raise IndexError('Index out of range for axis with size {}'.format(self.nbasis))
+            indexes.append(np.where(item < 0, item + self.nbasis, item))
+        if has_slice:
+            # Outer indexing over the slices, integer indexes remove an axis.
+            sliced = [index for index in indexes if index.ndim == 1]
+            grids = iter(np.ix_(*sliced))
+            indexes = [next(grids) if index.ndim == 1 else index for index in indexes]
+        return indexes
+
+    def __getitem__(self, key):
+        indexes = self._convert_key(key)
+        if indexes is None:
+            return self.to_dense()[key]
+        return self.data[self.pack_indices(*indexes)]
+
+    def __setitem__(self, key, value):
+        """Assign elements, implicitly also to all symmetry-related positions."""
+        indexes = self._convert_key(key)
+        if indexes is None:
+            raise IndexError('SymmetricFourIndex only supports assignment with four '
+                             'integers, integer arrays or slices.')
+        self.data[self.pack_indices(*indexes)] = value
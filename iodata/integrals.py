@@ -0,0 +1,131 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Module for computing one-electron integrals of atomic orbital basis functions."""
+
+
+from typing import Dict, List
+
+import numpy as np
+
+from .basis import MolecularBasis, iter_cart_alphabet
+from .overlap import compute_integrals
+
+
+__all__ = ['ONE_INTS_KINDS', 'compute_one_ints']
+
+
+# The supported kinds of integrals and the number of multipole moments.
+ONE_INTS_KINDS = {
+    'olp': None,
+    'kin_ao': None,
+    'na_ao': None,
+    'dipole_ao': 1,
+    'quadrupole_ao': 2,
+}
+
+
+def compute_one_ints(obasis: MolecularBasis, atcoords: np.ndarray,
+                     kinds: List[str] = ('olp', 'kin_ao', 'na_ao'),
+                     atcorenums: np.ndarray = None, origin: np.ndarray = None,
+                     num_threads: int = 1, screening_threshold: float = 0.0) \
+        -> Dict[str, np.ndarray]:
+    r"""Compute one-electron integrals for the given molecular basis set.
+
+    The results can be stored directly in the ``one_ints`` attribute of an
+    ``IOData`` instance. All kinds share the same basis-dependent setup, see
+    :py:func:`iodata.overlap.get_overlap_setup`. Similar to
+    :py:func:`iodata.overlap.compute_overlap`, only L2 normalized primitives
+    are supported and ``obasis.conventions`` is taken into account.
+
+    Parameters
+    ----------
+    obasis
+        The orbital basis set.
+    atcoords
+        The atomic Cartesian coordinates (including those of ghost atoms).
+    kinds
+        The integrals to compute. Supported kinds are:
+
+        - ``olp``: overlap, :math:`\braket{\psi_i}{\psi_j}`.
+        - ``kin_ao``: kinetic energy, :math:`\frac{1}{2}\braket{\nabla\psi_i}{\nabla\psi_j}`.
+        - ``na_ao``: nuclear attraction,
+          :math:`\sum_A Z_A \braket{\psi_i}{|\mathbf{r} - \mathbf{R}_A|^{-1}|\psi_j}`.
+          (The electron charge is not included, as in the ``one_ints['na_ao']``
+          loaded from Gaussian log files. The nuclear attraction energy is minus
+          the trace of the product of this matrix and the density matrix.)
+        - ``dipole_ao``: Cartesian dipole moments,
+          :math:`\braket{\psi_i}{(\mathbf{r} - \mathbf{O})^\alpha|\psi_j}`, with
+          components x, y and z. (The electron charge is not included.)
+        - ``quadrupole_ao``: Cartesian quadrupole moments, with components xx,
+          xy, xz, yy, yz and zz.
+
+    atcorenums
+        The (effective) nuclear charges, needed for ``na_ao``. Ghost atoms
+        have a zero charge.
+    origin
+        The origin :math:`\mathbf{O}` of the multipole moments. The default is
+        the origin of the Cartesian coordinate system.
+    num_threads
+        The number of threads used to compute the integrals, see
+        :py:func:`iodata.overlap.compute_overlap`.
+    screening_threshold
+        The threshold for screening shell pairs, see
+        :py:func:`iodata.overlap.compute_overlap`.
+
+    Returns
+    -------
+    one_ints
+        A dictionary with the requested kinds as keys. The overlap, kinetic
+        energy and nuclear attraction matrices have shape (nbasis, nbasis).
+        Multipole moments have shape (ncomponent, nbasis, nbasis).
+
+    """
+    for kind in kinds:
+        if kind not in ONE_INTS_KINDS:
+            raise ValueError('Unsupported kind of one-electron integrals: {}'.format(kind))
+    if obasis.primitive_normalization != 'L2':
+        raise ValueError('The one-electron integrals are only implemented for L2 '
+                         'normalization.')
+    if origin is None:
+        origin = np.zeros(3)
+    else:
+        origin = np.asarray(origin, dtype=float)
+
+    def compute(operator, **params):
+        return compute_integrals(obasis, atcoords, operator, num_threads,
+                                 screening_threshold, **params)
+
+    result = {}
+    for kind in kinds:
+        if kind == 'olp':
+            result[kind] = compute('olp')[0]
+        elif kind == 'kin_ao':
+            result[kind] = compute('kin')[0]
+        elif kind == 'na_ao':
+            if atcorenums is None:
+                raise TypeError('The argument atcorenums is needed to compute na_ao.')
+            # The operator 'na' includes the electron charge, see the docstring.
+            result[kind] = -compute(
+                'na', charges=np.asarray(atcorenums, dtype=float),
+                charge_centers=np.ascontiguousarray(atcoords, dtype=float))[0]
+        else:
+            order = ONE_INTS_KINDS[kind]
+            mpows = np.array(list(iter_cart_alphabet(order)))
+            result[kind] = compute('multipole', mpows=mpows, origin=origin)
+    return result
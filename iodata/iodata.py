@@ -19,6 +19,8 @@
 """Module for handling input/output from different file formats."""
 
 
+from collections import Counter
+
 import attr
 import numpy as np
 
@@ -30,35 +32,86 @@ from .utils import Cube
 __all__ = ['IOData']
 
 
+#: Number of arrays copied by the converters of IOData attributes, with
+#: (original dtype, new dtype) as keys. Arrays are only copied when their
+#: dtype is not compatible with the attribute, see :py:func:`convert_array_to`.
+#: This is useful to check that (memory-mapped) input arrays are not copied.
+ARRAY_COPY_COUNTER = Counter()
+
+
 def convert_array_to(dtype):
-    """Return a function to convert arrays to the given type."""
+    """Return a function to convert arrays to the given type.
+
+    Arrays whose dtype is compatible with the given type are not converted,
+    to avoid copies. For ``float``, all floating point types of at least 32
+    bits are compatible. For ``int``, all signed integer types of at least
+    32 bits are compatible. Read-only and memory-mapped arrays are never
+    copied when they have a compatible dtype. All copies of arrays are
+    counted in :py:data:`ARRAY_COPY_COUNTER`.
+    """
+    dtype = np.dtype(dtype)
+
     def converter(array):
         if array is None:
             return None
+        if isinstance(array, np.ndarray):
+            if _is_compatible_dtype(array.dtype, dtype):
+                return np.array(array, copy=False)
+            ARRAY_COPY_COUNTER[array.dtype.name, dtype.name] += 1
         return np.array(array, copy=False, dtype=dtype)
     return converter
 
 
+def _is_compatible_dtype(dtype: np.dtype, target: np.dtype) -> bool:
+    """Return True when an array with dtype can be used for target without conversion."""
+    if dtype == target:
+        return True
+    if dtype.kind != target.kind or target.kind not in 'fi':
+        return False
+    return dtype.itemsize >= 4
+
+
 def validate_shape(*shape):
     """Return a function to validate the shape of an array."""
     def validator(obj, attrname, value):
         if value is None:
             return
-        myshape = tuple([obj.natom if size == 'natom' else size for size in shape])
-        if len(myshape) != len(value.shape):
-            raise TypeError('Expect ndim {} for attribute {}, got {}'.format(
-                len(myshape), attrname, len(value.shape)))
-        for axis, size in enumerate(myshape):
-            if size is None:
-                continue
-            if size != value.shape[axis]:
-                raise TypeError(
-                    'Expect size {} for axis {} of attribute {}, got {}'.format(
-                        size, axis, attrname, value.shape[axis]))
+        natom = obj.natom if 'natom' in shape else None
+        check_shape(attrname, value, shape, natom)
+    validator.shape = shape
     return validator
 
 
-@attr.s(auto_attribs=True, slots=True)
+def check_shape(attrname: str, value: np.ndarray, shape: tuple, natom: int):
+    """Raise a TypeError when an array does not have the expected shape.
+
+    Parameters
+    ----------
+    attrname
+        The name of the attribute, used in error messages.
+    value
+        The array to be checked.
+    shape
+        The expected shape, in which ``None`` matches any size and ``'natom'``
+        matches the number of atoms.
+    natom
+        The number of atoms.
+
+    """
+    myshape = tuple([natom if size == 'natom' else size for size in shape])
+    if len(myshape) != len(value.shape):
+        raise TypeError('Expect ndim {} for attribute {}, got {}'.format(
+            len(myshape), attrname, len(value.shape)))
+    for axis, size in enumerate(myshape):
+        if size is None:
+            continue
+        if size != value.shape[axis]:
+            raise TypeError(
+                'Expect size {} for axis {} of attribute {}, got {}'.format(
+                    size, axis, attrname, value.shape[axis]))
+
+
+@attr.s(auto_attribs=True, slots=True, getstate_setstate=False)
 class IOData:
     """A container class for data loaded from (or to be written to) a file.
 
@@ -184,7 +237,9 @@ class IOData:
         (electron repulsion) or ``two`` (general pairswise interaction). When
         relevant, these names must have a suffix ``_ao`` or ``_mo`` to clarify
         in which basis the integrals are computed, see one_ints for more
-        details. Array indexes are in physicist's notation.
+        details. Array indexes are in physicist's notation. Operators with
+        8-fold permutational symmetry may also be stored compactly as instances
+        of :py:class:`iodata.fourindex.SymmetricFourIndex`.
     two_rdms
         Dictionary where keys are names and values are two-particle density
         matrices. Names can be ``post_scf`` or ``post_scf_spin``. These matrices
@@ -246,6 +301,60 @@ class IOData:
     two_ints: dict = {}
     two_rdms: dict = {}
 
+    @classmethod
+    def from_trusted(cls, **kwargs) -> 'IOData':
+        """Create an IOData instance without running converters and validators.
+
+        This is meant for code that constructs many instances from data that is
+        known to have the right types and shapes, e.g. file format loaders.
+        Call :py:meth:`validate` afterwards when in doubt. The keyword
+        arguments are the same as for the constructor.
+        """
+        unknown = kwargs.keys() - _TRUSTED_ARGNAMES
+        if unknown:
+            raise TypeError('Unexpected keyword argument(s): {}'.format(
+                ', '.join(sorted(unknown))))
+        result = cls.__new__(cls)
+        for name, argname, default in _TRUSTED_FIELDS:
+            setattr(result, name, kwargs.get(argname, default))
+        return result
+
+    def validate(self):
+        """Convert and check all array attributes, as done by the constructor.
+
+        In contrast to the validators run by the constructor, the number of
+        atoms is computed only once.
+        """
+        checks = []
+        for name, converter, shape in _ARRAY_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                value = converter(value)
+                setattr(self, name, value)
+                checks.append((name, value, shape))
+        if checks:
+            natom = self.natom
+            for name, value, shape in checks:
+                check_shape(name, value, shape, natom)
+
+    def __getstate__(self) -> dict:
+        """Return the attributes that are set, for pickling.
+
+        Arrays are pickled by NumPy, which supports out-of-band buffers with
+        pickle protocol 5.
+        """
+        state = {}
+        for name, _argname, _default in _TRUSTED_FIELDS:
+            value = getattr(self, name)
+            if not (value is None or (isinstance(value, dict) and not value)):
+                state[name] = value
+        return state
+
+    def __setstate__(self, state: dict):
+        """Restore the attributes from a pickled state."""
+        for name, _argname, default in _TRUSTED_FIELDS:
+            setattr(self, name, state.get(name, default))
+
     # Public interfaces to private attributes
 
     @property
@@ -329,3 +438,13 @@ class IOData:
             self._spinpol = spinpol
         else:
             raise TypeError("spinpol cannot be set when orbitals are present.")
+
+
+# Tables used by IOData.from_trusted and IOData.validate, to avoid looking up
+# the attrs fields for every new instance. All defaults are immutable or
+# shared by all instances, also when using the constructor.
+_TRUSTED_FIELDS = [(field.name, field.name.lstrip('_'), field.default)
+                   for field in attr.fields(IOData)]
+_TRUSTED_ARGNAMES = frozenset(argname for _name, argname, _default in _TRUSTED_FIELDS)
+_ARRAY_FIELDS = [(field.name, field.converter, field.validator.shape)
+                 for field in attr.fields(IOData) if field.converter is not None]
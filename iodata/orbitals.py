@@ -22,12 +22,25 @@
 from typing import NamedTuple
 
 import numpy as np
+from scipy.linalg.blas import get_blas_funcs
 
 
 __all__ = ['MolecularOrbitals']
 
 
-class MolecularOrbitals(NamedTuple):
+class _MolecularOrbitalsFields(NamedTuple):
+    """The fields of MolecularOrbitals, see its docstring."""
+
+    kind: str
+    norba: int
+    norbb: int
+    occs: np.ndarray
+    coeffs: np.ndarray
+    energies: np.ndarray
+    irreps: np.ndarray
+
+
+class MolecularOrbitals(_MolecularOrbitalsFields):
     """Molecular Orbitals base Class.
 
     Attributes
@@ -61,20 +74,40 @@ class MolecularOrbitals(NamedTuple):
     assumed that the alpha orbital is fully occupied and the beta orbital is
     (fractionally) occupied.
 
+    The properties ``nelec``, ``spinpol``, ``occsa`` and ``occsb`` are derived
+    from the occupation numbers when first needed and then stored in the
+    instance. They are not updated when ``occs`` is modified in place: call
+    :py:meth:`clear_cache` after such a modification. A new instance, e.g.
+    created with ``_replace``, always starts with an empty cache.
+
     """
 
-    kind: str
-    norba: int
-    norbb: int
-    occs: np.ndarray
-    coeffs: np.ndarray
-    energies: np.ndarray
-    irreps: np.ndarray
+    def __getstate__(self):
+        """Return no state when pickling, such that the cache is not stored."""
+        return None
+
+    @property
+    def _occupations(self) -> '_Occupations':
+        """Return the cached quantities derived from the occupation numbers."""
+        try:
+            return self._cached_occupations
+        except AttributeError:
+            pass
+        # pylint: disable=attribute-defined-outside-init
+        self._cached_occupations = _compute_occupations(self.kind, self.norba, self.occs)
+        return self._cached_occupations
+
+    def clear_cache(self):
+        """Discard the cached quantities derived from the occupation numbers.
+
+        This must be called after the occupation numbers are modified in place.
+        """
+        self.__dict__.pop('_cached_occupations', None)
 
     @property
     def nelec(self) -> float:
         """Return the total number of electrons."""
-        return self.occs.sum()
+        return self._occupations.nelec
 
     @property
     def nbasis(self):
@@ -91,18 +124,15 @@ class MolecularOrbitals(NamedTuple):
     @property
     def spinpol(self) -> float:
         """Return the spin polarization of the Slater determinant."""
-        if self.kind == 'restricted':
-            nbeta = np.clip(self.occs, 0, 1).sum()
-            return abs(self.nelec - 2 * nbeta)
-        if self.kind == 'unrestricted':
-            return abs(self.occsa.sum() - self.occsb.sum())
+        if self.kind in ('restricted', 'unrestricted'):
+            return self._occupations.spinpol
         raise NotImplementedError
 
     @property
     def occsa(self):
         """Return alpha occupation numbers."""
         if self.kind == 'restricted':
-            return np.clip(self.occs, 0, 1)
+            return self._occupations.occsa.copy()
         if self.kind == 'unrestricted':
             return self.occs[:self.norba]
         raise NotImplementedError
@@ -111,7 +141,7 @@ class MolecularOrbitals(NamedTuple):
     def occsb(self):
         """Return beta occupation numbers."""
         if self.kind == 'restricted':
-            return self.occs - np.clip(self.occs, 0, 1)
+            return self._occupations.occsb.copy()
         if self.kind == 'unrestricted':
             return self.occs[self.norba:]
         raise NotImplementedError
@@ -174,5 +204,125 @@ class MolecularOrbitals(NamedTuple):
             return self.energies[self.norba:]
         raise NotImplementedError
 
+    def compute_dm(self, spin: str = 'total', out: np.ndarray = None) -> np.ndarray:
+        """Compute a one-particle density matrix in the basis of the orbitals.
+
+        Only the occupied orbitals contribute. Their coefficients, scaled by
+        the square root of the occupation numbers, are passed to a symmetric
+        rank-k update (BLAS ``syrk``), after which the missing triangle is
+        filled in.
+
+        Parameters
+        ----------
+        spin
+            Which density matrix to compute: 'total' (alpha plus beta), 'alpha',
+            'beta' or 'spin' (alpha minus beta).
+        out
+            An optional output array with shape (nbasis, nbasis). It must be C-
+            or Fortran-contiguous and have the same dtype as the coefficients.
+
+        Returns
+        -------
+        dm
+            The density matrix, with shape (nbasis, nbasis). This is ``out``
+            when it is given.
+
+        """
+        if self.kind == 'restricted':
+            terms = {
+                'total': [(self.coeffs, self.occs)],
+                'alpha': [(self.coeffs, self.occsa)],
+                'beta': [(self.coeffs, self.occsb)],
+                'spin': [(self.coeffs, self.occsa - self.occsb)],
+            }.get(spin)
+        elif self.kind == 'unrestricted':
+            terms_a = (self.coeffsa, self.occsa)
+            terms_b = (self.coeffsb, self.occsb)
+            terms = {
+                'total': [terms_a, terms_b],
+                'alpha': [terms_a],
+                'beta': [terms_b],
+                'spin': [terms_a, (self.coeffsb, -self.occsb)],
+            }.get(spin)
+        else:
+            raise NotImplementedError
+        if terms is None:
+            raise ValueError("spin must be 'total', 'alpha', 'beta' or 'spin', "
+                             "got {!r}".format(spin))
+        nbasis = self.coeffs.shape[0]
+        syrk = get_blas_funcs('syrk', (self.coeffs,))
+        if out is None:
+            out = np.empty((nbasis, nbasis), syrk.dtype)
+        elif out.shape != (nbasis, nbasis) or out.dtype != syrk.dtype:
+            raise TypeError("out must have shape {} and dtype {}, got {} and {}".format(
+                (nbasis, nbasis), syrk.dtype, out.shape, out.dtype))
+        # syrk works in place on Fortran-ordered arrays. Because the result is
+        # symmetric, the transpose of a C-ordered buffer can be used as well.
+        if out.flags.f_contiguous:
+            work = out
+        elif out.flags.c_contiguous:
+            work = out.T
+        else:
+            raise TypeError("out must be C- or Fortran-contiguous.")
+        beta = 0.0
+        for coeffs, weights in terms:
+            # Positive and negative weights are handled with separate updates.
+            for sign in 1.0, -1.0:
+                mask = sign * weights > 0
+                if not mask.any():
+                    continue
+                scaled = np.multiply(coeffs[:, mask], np.sqrt(sign * weights[mask]), order='F')
+                syrk(sign, scaled, beta, work, overwrite_c=True)
+                beta = 1.0
+        if beta == 0.0:
+            out[:] = 0.0
+        else:
+            # Copy the upper triangle of work into its lower triangle.
+            ilower = np.tril_indices(nbasis, -1)
+            work[ilower] = work.T[ilower]
+        return out
+
 
 MolecularOrbitals.__defaults__ = (None,)
+
+
+class _Occupations(NamedTuple):
+    """Quantities derived from the occupation numbers of MolecularOrbitals."""
+
+    nelec: float
+    spinpol: float
+    occsa: np.ndarray
+    occsb: np.ndarray
+
+
+def _compute_occupations(kind: str, norba: int, occs: np.ndarray) -> _Occupations:
+    """Compute the quantities derived from the occupation numbers.
+
+    Parameters
+    ----------
+    kind
+        The kind of orbitals: 'restricted', 'unrestricted' or 'generalized'.
+    norba
+        Number of alpha orbitals.
+    occs
+        The occupation numbers.
+
+    Returns
+    -------
+    occupations
+        The number of electrons and the spin polarization. For restricted
+        orbitals, also the alpha and beta occupation numbers. Quantities that
+        are not defined for the given kind are None.
+
+    """
+    nelec = occs.sum()
+    spinpol = None
+    occsa = None
+    occsb = None
+    if kind == 'restricted':
+        occsa = np.clip(occs, 0, 1)
+        occsb = occs - occsa
+        spinpol = abs(nelec - 2 * occsa.sum())
+    elif kind == 'unrestricted':
+        spinpol = abs(occs[:norba].sum() - occs[norba:].sum())
+    return _Occupations(nelec, spinpol, occsa, occsb)
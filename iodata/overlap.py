@@ -19,19 +19,27 @@
 """Module for computing overlap of atomic orbital basis functions."""
 
 
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
 import numpy as np
+import scipy.sparse
+from scipy.spatial import cKDTree
 from scipy.special import factorialk
 
-from .overlap_accel import add_overlap
+from .overlap_accel import add_cart_integrals, fac2
 from .overlap_helper import tfs
-from .basis import convert_conventions, iter_cart_alphabet, MolecularBasis
+from .basis import (convert_convention_shell, iter_cart_alphabet, MolecularBasis, PackedBasis,
+                    _compute_offsets)
 from .basis import HORTON2_CONVENTIONS as OVERLAP_CONVENTIONS
 
 
-__all__ = ['OVERLAP_CONVENTIONS', 'compute_overlap', 'gob_cart_normalization']
+__all__ = ['OVERLAP_CONVENTIONS', 'OverlapSetup', 'compute_overlap', 'compute_integrals',
+           'get_overlap_setup', 'gob_cart_normalization']
 
 
-def compute_overlap(obasis: MolecularBasis, atcoords: np.ndarray) -> np.ndarray:
+def compute_overlap(obasis: MolecularBasis, atcoords: np.ndarray,
+                    num_threads: int = 1, screening_threshold: float = 0.0) -> np.ndarray:
     r"""Compute overlap matrix for the given molecular basis set.
 
     .. math::
@@ -47,6 +55,16 @@ def compute_overlap(obasis: MolecularBasis, atcoords: np.ndarray) -> np.ndarray:
         The orbital basis set.
     atcoords
         The atomic Cartesian coordinates (including those of ghost atoms).
+    num_threads
+        The number of threads used to compute the integrals of all shell pairs.
+        This only has an effect when the extension module was compiled with
+        OpenMP support.
+    screening_threshold
+        Shell pairs are skipped when the Gaussian product prefactor of their
+        most diffuse primitives, :math:`\exp(-\alpha_0\alpha_1 R^2/(\alpha_0 +
+        \alpha_1))`, is below this threshold. Their overlap integrals are set to
+        zero. The default, zero, computes all shell pairs. A threshold of
+        ``1e-20`` leaves the integrals practically unchanged.
 
     Returns
     -------
@@ -57,87 +75,335 @@ def compute_overlap(obasis: MolecularBasis, atcoords: np.ndarray) -> np.ndarray:
     if obasis.primitive_normalization != 'L2':
         raise ValueError('The overlap integrals are only implemented for L2 '
                          'normalization.')
+    return compute_integrals(obasis, atcoords, 'olp', num_threads=num_threads,
+                             screening_threshold=screening_threshold)[0]
 
-    # Initialize result
-    overlap = np.zeros((obasis.nbasis, obasis.nbasis))
 
-    # Get a segmented basis, for simplicity
-    obasis = obasis.get_segmented()
+def compute_integrals(obasis: MolecularBasis, atcoords: np.ndarray, operator: str,
+                      num_threads: int = 1, screening_threshold: float = 0.0,
+                      **params) -> np.ndarray:
+    """Compute the matrices of a one-electron operator for the given basis set.
 
-    # Compute the normalization constants of the primitives
-    scales = [_compute_cart_shell_normalizations(shell) for shell in obasis.shells]
+    This is the common driver behind ``compute_overlap`` and
+    ``iodata.integrals.compute_one_ints``. The basis-dependent setup is
+    cached, see ``get_overlap_setup``.
 
-    # Loop over shell0
-    begin0 = 0
-    for i0, shell0 in enumerate(obasis.shells):
-        r0 = atcoords[shell0.icenter]
-        end0 = begin0 + shell0.nbasis
+    Parameters
+    ----------
+    obasis
+        The orbital basis set, with L2-normalized primitives.
+    atcoords
+        The atomic Cartesian coordinates (including those of ghost atoms).
+    operator
+        The operator, see ``iodata.overlap_accel.add_cart_integrals``.
+    num_threads
+        The number of threads used to compute the integrals of all shell pairs.
+    screening_threshold
+        The threshold for the screening of shell pairs, see ``compute_overlap``.
+    params
+        Operator parameters, passed on to ``add_cart_integrals``: ``mpows``
+        and ``origin`` for multipole moments, ``charges`` and
+        ``charge_centers`` for nuclear attraction.
 
-        # Loop over shell1 (lower triangular only, including diagonal)
-        begin1 = 0
-        for i1, shell1 in enumerate(obasis.shells[:i0 + 1]):
-            r1 = atcoords[shell1.icenter]
-            end1 = begin1 + shell1.nbasis
+    Returns
+    -------
+    integrals
+        The integrals, shape=(ncomponent, obasis.nbasis, obasis.nbasis), where
+        ncomponent is the number of multipole moments or one.
 
-            # START of Cartesian coordinates. Shell types are positive
-            result = np.zeros((len(scales[i0][0]), len(scales[i1][0])))
-            # Loop over primitives in shell0 (Cartesian)
-            for iexp0, (a0, cc0) in enumerate(zip(shell0.exponents, shell0.coeffs[:, 0])):
-                s0 = scales[i0][iexp0]
+    """
+    setup = get_overlap_setup(obasis)
+    centers = np.ascontiguousarray(atcoords[setup.icenters], dtype=float)
+    ncomponent = len(params['mpows']) if operator == 'multipole' else 1
+
+    # Compute the lower triangular blocks of the Cartesian matrices.
+    pairs0, pairs1 = _screen_shell_pairs(setup.alpha_mins, centers, screening_threshold)
+    ncart = setup.cart_offsets[-1]
+    cart = np.zeros((ncomponent, ncart, ncart))
+    add_cart_integrals(
+        operator, setup.alphas, setup.coeffs, setup.scales, setup.iterpows,
+        setup.prim_offsets, setup.scale_offsets, setup.cart_offsets, centers, pairs0,
+        pairs1, cart, num_threads=num_threads, **params)
+
+    # Copy the lower triangular blocks to the upper triangular ones, one row of
+    # blocks at a time.
+    cart_offsets = setup.cart_offsets
+    for begin, end in zip(cart_offsets[:-1], cart_offsets[1:]):
+        cart[:, begin:end, end:] = cart[:, end:, begin:end].transpose(0, 2, 1)
+
+    result = np.empty((ncomponent, setup.transform.shape[0], setup.transform.shape[0]))
+    for icomponent, matrix in enumerate(cart):
+        # Transform from Cartesian to pure functions and to the requested
+        # conventions, first rows, then columns.
+        result[icomponent] = setup.transform.dot(setup.transform.dot(matrix).T).T
+    return result
 
-                # Loop over primitives in shell1 (Cartesian)
-                for iexp1, (a1, cc1) in enumerate(zip(shell1.exponents, shell1.coeffs[:, 0])):
-                    s1 = scales[i1][iexp1]
-                    n0 = np.vstack(list(iter_cart_alphabet(shell0.angmoms[0])))
-                    n1 = np.vstack(list(iter_cart_alphabet(shell1.angmoms[0])))
-                    add_overlap(cc0 * cc1, a0, a1, s0, s1, r0, r1, n0, n1, result)
 
-            # END of Cartesian coordinate system (if going to pure coordinates)
+class OverlapSetup(NamedTuple):
+    """Basis-dependent data needed to compute overlap integrals.
 
-            # cart to pure
-            if shell0.kinds[0] == 'p':
-                result = np.dot(tfs[shell0.angmoms[0]], result)
-            if shell1.kinds[0] == 'p':
-                result = np.dot(result, tfs[shell1.angmoms[0]].T)
+    All shells of the segmented basis are packed in flat arrays. The data of
+    shell ``i`` is found in the ranges defined by ``offsets[i]`` and
+    ``offsets[i + 1]`` of the corresponding offsets array. The atomic
+    coordinates are not included, such that the same setup can be reused for
+    different geometries.
 
-            # store lower triangular result
-            overlap[begin0:end0, begin1:end1] = result
-            # store upper triangular result
-            overlap[begin1:end1, begin0:end0] = result.T
+    Attributes
+    ----------
+    alphas
+        The exponents of the primitives of all shells.
+    coeffs
+        The contraction coefficients of the primitives of all shells.
+    scales
+        The normalization constants of all Cartesian functions for each
+        primitive, shape=(nprim, ncart) per shell, flattened and concatenated.
+    iterpows
+        The Cartesian powers of all functions in all shells, shape=(ncart, 3).
+    prim_offsets, scale_offsets, cart_offsets
+        Offsets in alphas (and coeffs), scales and iterpows, shape=(nshell + 1,).
+    icenters
+        The center of each shell, shape=(nshell,).
+    alpha_mins
+        The smallest exponent of each shell, used for screening.
+    transform
+        A sparse matrix, shape=(nbasis, ncart), that transforms Cartesian
+        functions to the pure functions (where needed), with the order and
+        signs of ``obasis.conventions``.
 
-            begin1 = end1
-        begin0 = end0
+    """
 
-    permutation, signs = convert_conventions(obasis, OVERLAP_CONVENTIONS, reverse=True)
-    overlap = overlap[permutation] * signs.reshape(-1, 1)
-    overlap = overlap[:, permutation] * signs
-    return overlap
+    alphas: np.ndarray
+    coeffs: np.ndarray
+    scales: np.ndarray
+    iterpows: np.ndarray
+    prim_offsets: np.ndarray
+    scale_offsets: np.ndarray
+    cart_offsets: np.ndarray
+    icenters: np.ndarray
+    alpha_mins: np.ndarray
+    transform: scipy.sparse.csr_matrix
 
 
-def _compute_cart_shell_normalizations(shell: 'Shell') -> np.ndarray:
-    """Return normalization constants for the primitives in a given shell.
+def get_overlap_setup(obasis: MolecularBasis) -> OverlapSetup:
+    """Return the (cached) basis-dependent data for the overlap integrals.
+
+    The setup is stored in the basis set object, such that later calls with
+    the same object reuse it, see :py:meth:`iodata.basis.MolecularBasis.clear_cache`.
 
     Parameters
     ----------
-    shell
-        The shell for which the normalization constants must be computed.
+    obasis
+        The orbital basis set.
 
     Returns
     -------
-    np.ndarray
-        The normalization constants, always for Cartesian functions, even when
-        shell is pure.
+    OverlapSetup
+        The precomputed data. This should be treated as read-only.
 
     """
-    shell = shell._replace(kinds=['c'] * shell.ncon)
-    result = []
-    for angmom in shell.angmoms:
-        for exponent in shell.exponents:
-            row = []
-            for n in iter_cart_alphabet(angmom):
-                row.append(gob_cart_normalization(exponent, n))
-            result.append(np.array(row))
-    return result
+    # pylint: disable=protected-access
+    try:
+        return obasis._cached_overlap_setup
+    except AttributeError:
+        pass
+    obasis._cached_overlap_setup = _compute_overlap_setup(obasis)
+    return obasis._cached_overlap_setup
+
+
+def _compute_overlap_setup(obasis: MolecularBasis) -> OverlapSetup:
+    """Compute the setup for the given basis set."""
+    # Get a segmented basis, for simplicity. The packed representation allows
+    # all arrays below to be constructed without loops over shells.
+    packed = obasis.to_packed().get_segmented()
+    angmoms = packed.angmoms
+    alphas = packed.exponents
+    iterpow_table, fac2_table = _get_cart_tables(angmoms.max(initial=0))
+
+    # Cartesian powers of all functions, using the shell and the position in
+    # the shell of each Cartesian function.
+    ncarts = ((angmoms + 1) * (angmoms + 2)) // 2
+    cart_offsets = _compute_offsets(ncarts)
+    cart_shells = np.repeat(np.arange(packed.nshell), ncarts)
+    cart_local = np.arange(cart_offsets[-1]) - cart_offsets[cart_shells]
+
+    # Normalization constants of all Cartesian functions, for each primitive.
+    prim_angmoms = np.repeat(angmoms, packed.nprims)
+    prim_ncarts = np.repeat(ncarts, packed.nprims)
+    prim_scale_offsets = _compute_offsets(prim_ncarts)
+    scale_prims = np.repeat(np.arange(len(alphas)), prim_ncarts)
+    scale_local = np.arange(prim_scale_offsets[-1]) - prim_scale_offsets[scale_prims]
+    prim_scales = np.sqrt((4 * alphas)**prim_angmoms * (2 * alphas / np.pi)**1.5)
+    scales = (prim_scales[scale_prims]
+              / np.sqrt(fac2_table[prim_angmoms[scale_prims], scale_local]))
+
+    return OverlapSetup(
+        alphas=alphas,
+        coeffs=packed.coeffs,
+        scales=scales,
+        iterpows=iterpow_table[angmoms[cart_shells], cart_local],
+        prim_offsets=packed.prim_offsets,
+        scale_offsets=prim_scale_offsets[packed.prim_offsets],
+        cart_offsets=cart_offsets,
+        icenters=packed.icenters,
+        alpha_mins=np.minimum.reduceat(alphas, packed.prim_offsets[:-1]),
+        transform=_compute_transform(packed, cart_offsets),
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_iterpow(angmom: int) -> np.ndarray:
+    """Return the Cartesian powers of a shell, shape=(ncart, 3). Do not modify."""
+    return np.array(list(iter_cart_alphabet(angmom)))
+
+
+@lru_cache(maxsize=None)
+def _get_cart_tables(max_angmom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return tables with the Cartesian powers and double factorials per angular momentum.
+
+    Parameters
+    ----------
+    max_angmom
+        The highest angular momentum in the tables.
+
+    Returns
+    -------
+    iterpow_table
+        The Cartesian powers of each function, shape=(max_angmom + 1, ncart, 3),
+        where ncart is the number of functions for max_angmom.
+    fac2_table
+        The product of (2n-1)!! over the three powers of each function,
+        shape=(max_angmom + 1, ncart). Unused elements are set to one.
+
+    """
+    fac2s = np.array([fac2(2 * n - 1) for n in range(max_angmom + 1)], dtype=float)
+    ncart = ((max_angmom + 1) * (max_angmom + 2)) // 2
+    iterpow_table = np.zeros((max_angmom + 1, ncart, 3), dtype=int)
+    fac2_table = np.ones((max_angmom + 1, ncart))
+    for angmom in range(max_angmom + 1):
+        iterpow = _get_iterpow(angmom)
+        iterpow_table[angmom, :len(iterpow)] = iterpow
+        fac2_table[angmom, :len(iterpow)] = fac2s[iterpow].prod(axis=1)
+    return iterpow_table, fac2_table
+
+
+def _compute_transform(packed: PackedBasis, cart_offsets: np.ndarray) \
+        -> scipy.sparse.csr_matrix:
+    """Return the sparse transformation from Cartesian functions to the final basis.
+
+    Parameters
+    ----------
+    packed
+        The segmented orbital basis set.
+    cart_offsets
+        The offsets of the Cartesian functions of each shell.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        The transformation, shape=(nbasis, ncart), including the conversion
+        from pure to Cartesian functions and the permutation and sign changes
+        needed for ``packed.conventions``.
+
+    """
+    basis_offsets = _compute_offsets(packed.get_ncons_basis())
+    rows = []
+    cols = []
+    values = []
+    # All shells with the same angular momentum and kind share the same block.
+    for angmom, kind in set(zip(packed.angmoms.tolist(), packed.kinds.tolist())):
+        ishells = ((packed.angmoms == angmom) & (packed.kinds == kind)).nonzero()[0]
+        block_rows, block_cols, block_values = _get_transform_block(
+            angmom, kind, tuple(packed.conventions[(angmom, kind)]))
+        rows.append((basis_offsets[ishells, np.newaxis] + block_rows).ravel())
+        cols.append((cart_offsets[ishells, np.newaxis] + block_cols).ravel())
+        values.append(np.tile(block_values, len(ishells)))
+    return scipy.sparse.csr_matrix(
+        (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(basis_offsets[-1], cart_offsets[-1]))
+
+
+@lru_cache(maxsize=None)
+def _get_transform_block(angmom: int, kind: str, convention: Tuple[str]) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the nonzero rows, columns and values of the transform of one shell.
+
+    The block transforms Cartesian functions to pure ones (if needed),
+    followed by the permutation and sign changes from the conventions of the
+    overlap integrals to the given convention.
+    """
+    if kind == 'p':
+        block = tfs[angmom]
+    else:
+        block = np.identity((angmom + 1) * (angmom + 2) // 2)
+    permutation, signs = convert_convention_shell(
+        list(convention), OVERLAP_CONVENTIONS[(angmom, kind)], reverse=True)
+    block = block[permutation] * np.array(signs)[:, np.newaxis]
+    rows, cols = block.nonzero()
+    return rows, cols, block[rows, cols]
+
+
+def _screen_shell_pairs(alpha_mins: np.ndarray, centers: np.ndarray,
+                        screening_threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the lower triangular shell pairs with non-negligible overlap.
+
+    Parameters
+    ----------
+    alpha_mins
+        The smallest exponent of each shell.
+    centers
+        The center of each shell, shape=(nshell, 3).
+    screening_threshold
+        Pairs whose largest Gaussian product prefactor is below this threshold
+        are discarded. Zero or a negative value disables the screening.
+
+    Returns
+    -------
+    pairs0, pairs1
+        The shell indexes of the pairs to be computed, with pairs0 >= pairs1.
+
+    """
+    if screening_threshold <= 0 or len(alpha_mins) == 0:
+        return np.tril_indices(len(alpha_mins))
+    # The prefactor exp(-a0*a1/(a0+a1)*R^2) decreases with both exponents, so
+    # the most diffuse primitives of both shells give an upper bound. Shells
+    # are grouped in classes whose smallest exponents differ at most a factor
+    # of two. For each pair of classes, the lower bounds of their exponents
+    # determine a distance beyond which all pairs are negligible. Candidate
+    # pairs within that distance are found with a k-d tree, such that the
+    # memory usage scales with the number of pairs that survive the screening.
+    max_exponent = -np.log(screening_threshold)
+    classes, class_indexes = np.unique(np.floor(np.log2(alpha_mins)), return_inverse=True)
+    alpha_lows = 2.0**classes
+    members = [(class_indexes == iclass).nonzero()[0] for iclass in range(len(classes))]
+    trees = [cKDTree(centers[shells]) for shells in members]
+    all_pairs0 = []
+    all_pairs1 = []
+    for iclass0, (shells0, tree0) in enumerate(zip(members, trees)):
+        for iclass1 in range(iclass0 + 1):
+            shells1 = members[iclass1]
+            alpha_low0 = alpha_lows[iclass0]
+            alpha_low1 = alpha_lows[iclass1]
+            radius = np.sqrt(max_exponent * (alpha_low0 + alpha_low1)
+                             / (alpha_low0 * alpha_low1))
+            if iclass0 == iclass1:
+                near = tree0.query_pairs(radius, output_type='ndarray')
+                all_pairs0.extend([shells0[near[:, 0]], shells0])
+                all_pairs1.extend([shells0[near[:, 1]], shells0])
+            else:
+                near = tree0.sparse_distance_matrix(trees[iclass1], radius,
+                                                    output_type='ndarray')
+                all_pairs0.append(shells0[near['i']])
+                all_pairs1.append(shells1[near['j']])
+    pairs0 = np.concatenate(all_pairs0)
+    pairs1 = np.concatenate(all_pairs1)
+    # Apply the exact screening criterion to the candidates.
+    alpha_mins0 = alpha_mins[pairs0]
+    alpha_mins1 = alpha_mins[pairs1]
+    dist_sq = ((centers[pairs0] - centers[pairs1])**2).sum(axis=1)
+    mask = alpha_mins0 * alpha_mins1 / (alpha_mins0 + alpha_mins1) * dist_sq <= max_exponent
+    pairs0 = pairs0[mask]
+    pairs1 = pairs1[mask]
+    return np.maximum(pairs0, pairs1), np.minimum(pairs0, pairs1)
 
 
 def gob_cart_normalization(alpha: np.ndarray, n: np.ndarray) -> np.ndarray:
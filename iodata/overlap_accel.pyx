@@ -17,67 +17,502 @@
 # along with this program; if not, see <http://www.gnu.org/licenses/>
 # --
 # cython: linetrace=True, embedsignature=True, language_level=3
-"""Cython module to accelerate computation of overlap integrals."""
+"""Cython module to accelerate computation of one-electron integrals."""
 
 
-from libc.math cimport sqrt, pow, exp, abs
+from libc.math cimport sqrt, pow, exp, abs, erf
+from libc.stdlib cimport malloc, free
 cimport cython
-import numpy as np
+from cython.parallel cimport parallel, prange
 
 
-__all__ = ['add_overlap', 'fac2']
+__all__ = ['add_cart_integrals', 'fac2']
 
 
-@cython.boundscheck(False)
-@cython.wraparound(False)
-cpdef void add_overlap(double coeff, double alpha0, double alpha1, double[::1] scales0,
-                  double[::1] scales1, double[::1] r0, double[::1] r1,
-                  long[:, ::1] iterpow0, long[:, ::1] iterpow1, double [:, ::1] result):
-    # This entire function is in Cartesian coordinates
-    cdef double gamma_inv = 1.0 / (alpha0 + alpha1)
-    cdef double pre = coeff * exp(-alpha0 * alpha1 * gamma_inv * _dist_sq(r0, r1))
-    cdef double[::1] gpt_center = _compute_gpt_center(alpha0, r0, alpha1, r1, gamma_inv)
-
-    cdef long s0, s1
-    cdef long[::1] n0, n1
-
-    for s0, n0, in enumerate(iterpow0):
-        for s1, n1, in enumerate(iterpow1):
-            result[s0, s1] += pre * _vec_gb_overlap_int1d(n0, n1, r0, r1, gpt_center,
-                                                         gamma_inv) * scales0[s0] * scales1[s1]
-            # print np.ravel_multi_index((s0, s1), result.shape), "|", result[s0, s1], "|", pre, \
-            #     _vec_gb_overlap_int1d(n0, n1, gpt_center - r0, gpt_center - r1, gamma_inv), \
-            #     scales0[s0], scales1[s1]
+cdef enum:
+    # One more than the highest supported angular momentum, used to dimension tables.
+    MAX_ANGMOM1 = 25
+    # The highest order of multipole moment integrals.
+    MAX_ORDER = 4
+    # Size of the tables with one-dimensional integrals, including the extra
+    # powers needed for kinetic energy and multipole moment integrals.
+    MAX_POW1 = MAX_ANGMOM1 + MAX_ORDER
+    # One more than the highest angular momentum for nuclear attraction integrals.
+    MAX_NA_ANGMOM1 = 8
+    # Size of the tables with Hermite expansion coefficients and Boys functions.
+    MAX_HERMITE = 2 * MAX_NA_ANGMOM1 - 1
 
 
-@cython.boundscheck(False)
-@cython.wraparound(False)
-cdef double _dist_sq(double[::1] r0, double[::1] r1) nogil:
-    return pow((r0[0] - r1[0]), 2) \
-           + pow((r0[1] - r1[1]), 2) \
-           + pow((r0[2] - r1[2]), 2)
+cdef enum:
+    OPERATOR_OVERLAP = 0
+    OPERATOR_KINETIC = 1
+    OPERATOR_MULTIPOLE = 2
+    OPERATOR_NUCLEAR = 3
+
+
+OPERATORS = {
+    'olp': OPERATOR_OVERLAP,
+    'kin': OPERATOR_KINETIC,
+    'multipole': OPERATOR_MULTIPOLE,
+    'na': OPERATOR_NUCLEAR,
+}
+
+
+cdef double PI = 3.14159265358979323846
+
+
+cdef struct Shells:
+    # Pointers to the packed arrays describing all shells, see add_cart_integrals.
+    double* alphas
+    double* coeffs
+    double* scales
+    long* iterpows
+    long* prim_offsets
+    long* scale_offsets
+    long* cart_offsets
+    double* centers
+    long ncart
+
+
+cdef struct Operator:
+    # The kind of operator and its parameters, see add_cart_integrals.
+    int kind
+    long nmoment
+    long maxorder
+    long* mpows
+    double* origin
+    long ncharge
+    double* charges
+    double* charge_centers
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-cdef double[::1] _compute_gpt_center(double alpha0, double[::1] r0, double alpha1, double[::1] r1, double gamma_inv):
-    arr = np.zeros(3, dtype=np.float)
-    cdef double[::1] gpt_center = arr
-    gpt_center[0] = gamma_inv * (alpha0 * r0[0] + alpha1 * r1[0])
-    gpt_center[1] = gamma_inv * (alpha0 * r0[1] + alpha1 * r1[1])
-    gpt_center[2] = gamma_inv * (alpha0 * r0[2] + alpha1 * r1[2])
-    return gpt_center
+def add_cart_integrals(str operator, double[::1] alphas, double[::1] coeffs,
+                       double[::1] scales, long[:, ::1] iterpows, long[::1] prim_offsets,
+                       long[::1] scale_offsets, long[::1] cart_offsets,
+                       double[:, ::1] centers, long[::1] pairs0, long[::1] pairs1,
+                       double[:, :, ::1] result, long[:, ::1] mpows=None,
+                       double[::1] origin=None, double[::1] charges=None,
+                       double[:, ::1] charge_centers=None, int num_threads=1):
+    """Add Cartesian one-electron integrals of a list of pairs of (segmented) shells.
+
+    All shells are described by flat arrays. The data of shell ``i`` is found in
+    the ranges defined by ``offsets[i]`` and ``offsets[i + 1]`` of the
+    corresponding offsets array.
+
+    Parameters
+    ----------
+    operator
+        The one-electron operator: ``'olp'`` (overlap), ``'kin'`` (kinetic
+        energy), ``'multipole'`` (Cartesian multipole moments) or ``'na'``
+        (nuclear attraction).
+    alphas
+        The exponents of the primitives of all shells.
+    coeffs
+        The contraction coefficients of the primitives of all shells.
+    scales
+        Normalization constants of all Cartesian functions for each primitive, with
+        shape (nprim, ncart) per shell, all flattened and concatenated.
+    iterpows
+        The Cartesian powers of all functions in all shells, shape=(ncart, 3).
+    prim_offsets, scale_offsets, cart_offsets
+        Offsets in alphas (and coeffs), scales and iterpows, shape=(nshell + 1,).
+    centers
+        The center of each shell, shape=(nshell, 3).
+    pairs0, pairs1
+        The shell pairs to compute. Each pair writes to its own block of result,
+        rows of the first shell and columns of the second.
+    result
+        The output array to which the integrals are added,
+        shape=(ncomponent, ncart, ncart). The number of components is one,
+        except for multipole moments, where it equals ``len(mpows)``.
+    mpows
+        Only for multipole moments: the Cartesian powers of each moment,
+        shape=(nmoment, 3).
+    origin
+        Only for multipole moments: the origin of the moments, shape=(3,).
+    charges
+        Only for nuclear attraction: the point charges, shape=(ncharge,).
+    charge_centers
+        Only for nuclear attraction: the positions of the charges,
+        shape=(ncharge, 3).
+    num_threads
+        The number of threads among which the shell pairs are distributed.
+        (Only effective when compiled with OpenMP support.)
+
+    """
+    cdef long ipair
+    cdef long nfailed = 0
+    cdef long rtab_size = 0
+    cdef double* rtab = NULL
+    cdef long npair = pairs0.shape[0]
+    cdef long icart, imoment
+    cdef long ncart = iterpows.shape[0]
+    cdef long ncomponent = 1
+    cdef long max_angmom1 = MAX_ANGMOM1
+    # Placeholders for unused operator parameters.
+    cdef long dummy_long[3]
+    cdef double dummy_double[3]
+    cdef Shells shells
+    cdef Operator op
+
+    if operator not in OPERATORS:
+        raise ValueError('Unknown operator: {}'.format(operator))
+    op.kind = OPERATORS[operator]
+    op.nmoment = 0
+    op.maxorder = 0
+    op.mpows = dummy_long
+    op.origin = dummy_double
+    op.ncharge = 0
+    op.charges = dummy_double
+    op.charge_centers = dummy_double
+    if op.kind == OPERATOR_MULTIPOLE:
+        if mpows is None or origin is None:
+            raise TypeError('Multipole moments require the mpows and origin arguments.')
+        if mpows.shape[1] != 3 or origin.shape[0] != 3:
+            raise TypeError('The arguments mpows or origin have the wrong shape.')
+        op.nmoment = mpows.shape[0]
+        for imoment in range(op.nmoment):
+            if min(mpows[imoment, 0], mpows[imoment, 1], mpows[imoment, 2]) < 0:
+                raise ValueError('The powers of the multipole moments must be positive.')
+            op.maxorder = max(op.maxorder, mpows[imoment, 0] + mpows[imoment, 1]
+                              + mpows[imoment, 2])
+        if op.maxorder > MAX_ORDER:
+            raise ValueError('Multipole moments above order {} are not supported.'.format(
+                MAX_ORDER))
+        if op.nmoment > 0:
+            op.mpows = &mpows[0, 0]
+        op.origin = &origin[0]
+        ncomponent = op.nmoment
+    elif op.kind == OPERATOR_NUCLEAR:
+        if charges is None or charge_centers is None:
+            raise TypeError('Nuclear attraction requires the charges and charge_centers '
+                            'arguments.')
+        if charge_centers.shape[0] != charges.shape[0] or charge_centers.shape[1] != 3:
+            raise TypeError('The argument charge_centers has the wrong shape.')
+        op.ncharge = charges.shape[0]
+        if op.ncharge > 0:
+            op.charges = &charges[0]
+            op.charge_centers = &charge_centers[0, 0]
+        max_angmom1 = MAX_NA_ANGMOM1
+        # Scratch space for the Hermite Coulomb integrals, see _add_shell_pair.
+        rtab_size = MAX_HERMITE * MAX_HERMITE * MAX_HERMITE * MAX_HERMITE
+
+    for icart in range(ncart):
+        if iterpows[icart, 0] + iterpows[icart, 1] + iterpows[icart, 2] >= max_angmom1:
+            raise ValueError('Angular momenta above {} are not supported.'.format(
+                max_angmom1 - 1))
+    if result.shape[0] != ncomponent or result.shape[1] != ncart or result.shape[2] != ncart:
+        raise TypeError('The result argument has the wrong shape.')
+    if pairs1.shape[0] != npair:
+        raise TypeError('The arguments pairs0 and pairs1 must have the same length.')
+    if npair == 0 or ncomponent == 0:
+        return
+
+    shells.alphas = &alphas[0]
+    shells.coeffs = &coeffs[0]
+    shells.scales = &scales[0]
+    shells.iterpows = &iterpows[0, 0]
+    shells.prim_offsets = &prim_offsets[0]
+    shells.scale_offsets = &scale_offsets[0]
+    shells.cart_offsets = &cart_offsets[0]
+    shells.centers = &centers[0, 0]
+    shells.ncart = ncart
+    with nogil, parallel(num_threads=num_threads):
+        # Each thread allocates its own scratch space once.
+        if rtab_size > 0:
+            rtab = <double*> malloc(rtab_size * sizeof(double))
+        for ipair in prange(npair, schedule='dynamic'):
+            if rtab_size > 0 and rtab == NULL:
+                nfailed += 1
+            else:
+                _add_shell_pair(pairs0[ipair], pairs1[ipair], shells, op, rtab,
+                                &result[0, 0, 0])
+        free(rtab)
+    if nfailed > 0:
+        raise MemoryError('Could not allocate scratch space for nuclear attraction integrals.')
+
+
+def _compute_boys_function(long nmax, double t, double[::1] out):
+    """Compute the Boys function for orders 0 to nmax. (Only used for testing.)"""
+    if out.shape[0] <= nmax or nmax >= MAX_HERMITE:
+        raise TypeError('The argument out is too short or nmax is too large.')
+    _boys_function(nmax, t, &out[0])
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-cdef double _vec_gb_overlap_int1d(long[::1] n0, long[::1] n1, double[::1] r0, double[::1] r1, double[::1] gptc, double gamma_inv) nogil:
-    return _gb_overlap_int1d(n0[0], n1[0], gptc[0] - r0[0], gptc[0] - r1[0], gamma_inv) * \
-           _gb_overlap_int1d(n0[1], n1[1], gptc[1] - r0[1], gptc[1] - r1[1], gamma_inv) * \
-           _gb_overlap_int1d(n0[2], n1[2], gptc[2] - r0[2], gptc[2] - r1[2], gamma_inv)
+@cython.cdivision(True)
+cdef void _add_shell_pair(long ishell0, long ishell1, Shells shells, Operator op,
+                          double* rtab, double* result) noexcept nogil:
+    """Add the Cartesian integrals of one pair of contracted shells.
+
+    All other temporary data live on the stack, such that this function can
+    run in parallel for different shell pairs. For nuclear attraction
+    integrals, rtab must point to MAX_HERMITE**4 doubles of scratch space,
+    which is private to the calling thread.
+    """
+    # One-dimensional overlap integrals for all combinations of powers, per axis.
+    cdef double olp1d[3][MAX_POW1][MAX_POW1]
+    # Hermite expansion coefficients for nuclear attraction integrals.
+    cdef double herm[3][MAX_NA_ANGMOM1][MAX_NA_ANGMOM1][MAX_HERMITE]
+    cdef long begin0 = shells.cart_offsets[ishell0]
+    cdef long begin1 = shells.cart_offsets[ishell1]
+    cdef long ncart0 = shells.cart_offsets[ishell0 + 1] - begin0
+    cdef long ncart1 = shells.cart_offsets[ishell1 + 1] - begin1
+    cdef long* pows0 = shells.iterpows + 3 * begin0
+    cdef long* pows1 = shells.iterpows + 3 * begin1
+    cdef double* center0 = shells.centers + 3 * ishell0
+    cdef double* center1 = shells.centers + 3 * ishell1
+    cdef long angmom0 = pows0[0] + pows0[1] + pows0[2]
+    cdef long angmom1 = pows1[0] + pows1[1] + pows1[2]
+    cdef long ncart = shells.ncart
+    cdef long nherm = angmom0 + angmom1 + 1
+    cdef long extra = 0
+    cdef double dist_sq = 0.0
+    cdef double alpha0, alpha1, gamma_inv, pre, pre0, pre1, value
+    cdef double gpt_center[3]
+    cdef double pa[3]
+    cdef double pb[3]
+    cdef long ip0, ip1, axis, n0, n1, s0, s1, iscale0, iscale1, icharge, icomp
+    cdef long* p0
+    cdef long* p1
+
+    if op.kind == OPERATOR_KINETIC:
+        extra = 2
+    elif op.kind == OPERATOR_MULTIPOLE:
+        extra = op.maxorder
+    for axis in range(3):
+        dist_sq += (center0[axis] - center1[axis]) ** 2
+
+    for ip0 in range(shells.prim_offsets[ishell0], shells.prim_offsets[ishell0 + 1]):
+        alpha0 = shells.alphas[ip0]
+        iscale0 = (shells.scale_offsets[ishell0]
+                   + (ip0 - shells.prim_offsets[ishell0]) * ncart0)
+        for ip1 in range(shells.prim_offsets[ishell1], shells.prim_offsets[ishell1 + 1]):
+            alpha1 = shells.alphas[ip1]
+            iscale1 = (shells.scale_offsets[ishell1]
+                       + (ip1 - shells.prim_offsets[ishell1]) * ncart1)
+            gamma_inv = 1.0 / (alpha0 + alpha1)
+            pre = (shells.coeffs[ip0] * shells.coeffs[ip1]
+                   * exp(-alpha0 * alpha1 * gamma_inv * dist_sq))
+            for axis in range(3):
+                gpt_center[axis] = gamma_inv * (alpha0 * center0[axis] + alpha1 * center1[axis])
+                pa[axis] = gpt_center[axis] - center0[axis]
+                pb[axis] = gpt_center[axis] - center1[axis]
+
+            if op.kind == OPERATOR_NUCLEAR:
+                _compute_hermite_coeffs(angmom0, angmom1, pa, pb, gamma_inv, herm)
+                for icharge in range(op.ncharge):
+                    _compute_hermite_integrals(
+                        nherm - 1, alpha0 + alpha1, gpt_center,
+                        op.charge_centers + 3 * icharge, rtab)
+                    pre0 = -op.charges[icharge] * 2 * PI * gamma_inv * pre
+                    for s0 in range(ncart0):
+                        p0 = pows0 + 3 * s0
+                        for s1 in range(ncart1):
+                            p1 = pows1 + 3 * s1
+                            value = _contract_hermite(p0, p1, nherm, herm, rtab)
+                            result[(begin0 + s0) * ncart + begin1 + s1] += (
+                                pre0 * shells.scales[iscale0 + s0]
+                                * shells.scales[iscale1 + s1] * value)
+                continue
+
+            for axis in range(3):
+                for n0 in range(angmom0 + 1):
+                    for n1 in range(angmom1 + extra + 1):
+                        olp1d[axis][n0][n1] = _gb_overlap_int1d(
+                            n0, n1, pa[axis], pb[axis], gamma_inv)
+            # Combine the 1D integrals into Cartesian ones.
+            for s0 in range(ncart0):
+                p0 = pows0 + 3 * s0
+                pre0 = pre * shells.scales[iscale0 + s0]
+                for s1 in range(ncart1):
+                    p1 = pows1 + 3 * s1
+                    pre1 = pre0 * shells.scales[iscale1 + s1]
+                    if op.kind == OPERATOR_OVERLAP:
+                        result[(begin0 + s0) * ncart + begin1 + s1] += (
+                            pre1 * olp1d[0][p0[0]][p1[0]] * olp1d[1][p0[1]][p1[1]]
+                            * olp1d[2][p0[2]][p1[2]])
+                    elif op.kind == OPERATOR_KINETIC:
+                        result[(begin0 + s0) * ncart + begin1 + s1] += (
+                            pre1 * _kinetic_3d(p0, p1, alpha1, olp1d))
+                    else:
+                        for icomp in range(op.nmoment):
+                            result[(icomp * ncart + begin0 + s0) * ncart + begin1 + s1] += (
+                                pre1 * _multipole_3d(p0, p1, op.mpows + 3 * icomp,
+                                                     center1, op.origin, olp1d))
+
+
+@cython.cdivision(True)
+cdef double _kinetic_3d(long* p0, long* p1, double alpha1,
+                        double olp1d[3][MAX_POW1][MAX_POW1]) noexcept nogil:
+    """Combine 1D overlap integrals into a kinetic energy integral.
+
+    The Laplacian acts on the ket, whose second derivative along one axis is a
+    linear combination of functions with powers n1 - 2, n1 and n1 + 2.
+    """
+    cdef double kin1d[3]
+    cdef long axis, n0, n1
+    for axis in range(3):
+        n0 = p0[axis]
+        n1 = p1[axis]
+        kin1d[axis] = (2 * alpha1 * (2 * n1 + 1) * olp1d[axis][n0][n1]
+                       - 4 * alpha1 * alpha1 * olp1d[axis][n0][n1 + 2])
+        if n1 >= 2:
+            kin1d[axis] -= n1 * (n1 - 1) * olp1d[axis][n0][n1 - 2]
+        kin1d[axis] *= 0.5
+    return (kin1d[0] * olp1d[1][p0[1]][p1[1]] * olp1d[2][p0[2]][p1[2]]
+            + olp1d[0][p0[0]][p1[0]] * kin1d[1] * olp1d[2][p0[2]][p1[2]]
+            + olp1d[0][p0[0]][p1[0]] * olp1d[1][p0[1]][p1[1]] * kin1d[2])
+
+
+cdef double _multipole_3d(long* p0, long* p1, long* mpow, double* center1, double* origin,
+                          double olp1d[3][MAX_POW1][MAX_POW1]) noexcept nogil:
+    """Combine 1D overlap integrals into a Cartesian multipole moment integral.
+
+    The factor (x - origin)^k is expanded in powers of (x - center1) and
+    absorbed in the ket.
+    """
+    cdef double result = 1.0
+    cdef double mp1d
+    cdef long axis, j, k
+    for axis in range(3):
+        k = mpow[axis]
+        mp1d = 0.0
+        for j in range(k + 1):
+            mp1d += (_binom(k, j) * pow(center1[axis] - origin[axis], k - j)
+                     * olp1d[axis][p0[axis]][p1[axis] + j])
+        result *= mp1d
+    return result
+
+
+@cython.cdivision(True)
+cdef void _compute_hermite_coeffs(
+        long angmom0, long angmom1, double* pa, double* pb, double gamma_inv,
+        double herm[3][MAX_NA_ANGMOM1][MAX_NA_ANGMOM1][MAX_HERMITE]) noexcept nogil:
+    """Compute the coefficients of the Hermite Gaussian expansion of primitive pairs.
+
+    The McMurchie-Davidson recurrence relations are used for each axis, with
+    the Gaussian product prefactor left out. Coefficients with t > n0 + n1
+    are zero.
+    """
+    cdef long axis, n0, n1, t
+    cdef double half_gamma_inv = 0.5 * gamma_inv
+    for axis in range(3):
+        herm[axis][0][0][0] = 1.0
+        for n0 in range(angmom0 + 1):
+            if n0 > 0:
+                for t in range(n0 + 1):
+                    herm[axis][n0][0][t] = _hermite_step(
+                        herm[axis][n0 - 1][0], n0 - 1, t, pa[axis], half_gamma_inv)
+            for n1 in range(1, angmom1 + 1):
+                for t in range(n0 + n1 + 1):
+                    herm[axis][n0][n1][t] = _hermite_step(
+                        herm[axis][n0][n1 - 1], n0 + n1 - 1, t, pb[axis], half_gamma_inv)
+
+
+cdef inline double _hermite_step(double* prev, long tmax, long t, double dist,
+                                 double half_gamma_inv) noexcept nogil:
+    """Apply one step of the recurrence, given coefficients prev up to tmax."""
+    cdef double result = 0.0
+    if t > 0:
+        result += half_gamma_inv * prev[t - 1]
+    if t <= tmax:
+        result += dist * prev[t]
+    if t + 1 <= tmax:
+        result += (t + 1) * prev[t + 1]
+    return result
+
+
+cdef void _compute_hermite_integrals(long nmax, double gamma, double* gpt_center,
+                                     double* charge_center, double* rtab) noexcept nogil:
+    """Compute the auxiliary Hermite Coulomb integrals R_{tuv}^n.
+
+    Only the elements with n + t + u + v <= nmax are computed. The element
+    (n, t, u, v) is stored at index ((n * nh + t) * nh + u) * nh + v of rtab,
+    with nh = nmax + 1.
+    """
+    cdef double boys[MAX_HERMITE]
+    cdef double pc[3]
+    cdef long nh = nmax + 1
+    cdef long n, t, u, v, axis
+    cdef double value
+    cdef double dist_sq = 0.0
+    for axis in range(3):
+        pc[axis] = gpt_center[axis] - charge_center[axis]
+        dist_sq += pc[axis] * pc[axis]
+    _boys_function(nmax, gamma * dist_sq, boys)
+    for n in range(nmax, -1, -1):
+        rtab[((n * nh) * nh) * nh] = pow(-2 * gamma, n) * boys[n]
+        for t in range(nmax - n + 1):
+            for u in range(nmax - n - t + 1):
+                for v in range(nmax - n - t - u + 1):
+                    if t > 0:
+                        value = pc[0] * rtab[(((n + 1) * nh + t - 1) * nh + u) * nh + v]
+                        if t > 1:
+                            value += (t - 1) * rtab[(((n + 1) * nh + t - 2) * nh + u) * nh + v]
+                    elif u > 0:
+                        value = pc[1] * rtab[(((n + 1) * nh + t) * nh + u - 1) * nh + v]
+                        if u > 1:
+                            value += (u - 1) * rtab[(((n + 1) * nh + t) * nh + u - 2) * nh + v]
+                    elif v > 0:
+                        value = pc[2] * rtab[(((n + 1) * nh + t) * nh + u) * nh + v - 1]
+                        if v > 1:
+                            value += (v - 1) * rtab[(((n + 1) * nh + t) * nh + u) * nh + v - 2]
+                    else:
+                        continue
+                    rtab[((n * nh + t) * nh + u) * nh + v] = value
+
+
+cdef double _contract_hermite(
+        long* p0, long* p1, long nh,
+        double herm[3][MAX_NA_ANGMOM1][MAX_NA_ANGMOM1][MAX_HERMITE],
+        double* rtab) noexcept nogil:
+    """Contract the Hermite expansion coefficients with the integrals R_{tuv}^0."""
+    cdef double result = 0.0
+    cdef double ex, exy
+    cdef long t, u, v
+    for t in range(p0[0] + p1[0] + 1):
+        ex = herm[0][p0[0]][p1[0]][t]
+        for u in range(p0[1] + p1[1] + 1):
+            exy = ex * herm[1][p0[1]][p1[1]][u]
+            for v in range(p0[2] + p1[2] + 1):
+                result += exy * herm[2][p0[2]][p1[2]][v] * rtab[(t * nh + u) * nh + v]
+    return result
+
+
+@cython.cdivision(True)
+cdef void _boys_function(long nmax, double t, double* out) noexcept nogil:
+    """Compute the Boys function F_n(t) for n = 0 ... nmax.
+
+    For small arguments, the highest order is computed with a series expansion,
+    followed by downward recursion. For large arguments, the zeroth order is
+    computed with the error function, followed by (stable) upward recursion.
+    """
+    cdef double expt = exp(-t)
+    cdef double term, total
+    cdef long m, i
+    if t < 30.0 + nmax:
+        term = 1.0 / (2 * nmax + 1)
+        total = term
+        i = 1
+        while term > 1e-17 * total:
+            term *= 2 * t / (2 * nmax + 2 * i + 1)
+            total += term
+            i += 1
+        out[nmax] = expt * total
+        for m in range(nmax - 1, -1, -1):
+            out[m] = (2 * t * out[m + 1] + expt) / (2 * m + 1)
+    else:
+        out[0] = 0.5 * sqrt(PI / t) * erf(sqrt(t))
+        for m in range(nmax):
+            out[m + 1] = ((2 * m + 1) * out[m] - expt) / (2 * t)
 
 
-cdef double _gb_overlap_int1d(long n0, long n1, double pa, double pb, double gamma_inv) nogil:
+cdef double _gb_overlap_int1d(long n0, long n1, double pa, double pb,
+                              double gamma_inv) noexcept nogil:
     """The overlap integral in one dimension."""
     cdef long k, kmax
     cdef double result = 0.0
@@ -89,7 +524,7 @@ cdef double _gb_overlap_int1d(long n0, long n1, double pa, double pb, double gam
     return sqrt(3.14159265358979323846 * gamma_inv) * result
 
 
-cdef double _gpt_coeff(long k, long n0, long n1, double pa, double pb) nogil:
+cdef double _gpt_coeff(long k, long n0, long n1, double pa, double pb) noexcept nogil:
     cdef double result = 0.0
     cdef long i0, i1
     i0 = k - n1
@@ -106,7 +541,7 @@ cdef double _gpt_coeff(long k, long n0, long n1, double pa, double pb) nogil:
     return result
 
 
-cpdef long _binom(long n, long m) nogil:
+cpdef long _binom(long n, long m) noexcept nogil:
     cdef long numer = 1
     cdef long denom = 1
     while n > m:
@@ -116,7 +551,7 @@ cpdef long _binom(long n, long m) nogil:
     return numer // denom
 
 
-cpdef long fac2(long n) nogil:
+cpdef long fac2(long n) noexcept nogil:
     r"""
     Factorial of every other number starting from n.
 
@@ -0,0 +1,247 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Zero-copy transfer of arrays in IOData instances between processes.
+
+Large arrays can be copied into shared memory blocks with a
+:py:class:`SharedArrayPool`. The resulting :py:class:`SharedArray` instances
+are pickled as a reference to their block, instead of as a copy of their data.
+This makes it cheap to send IOData instances to the workers of a
+:py:class:`multiprocessing.pool.Pool`, which then access the same memory:
+
+.. code-block:: python
+
+    with SharedArrayPool() as shared_pool:
+        shared = shared_pool.share_iodata(iodata)
+        with multiprocessing.Pool() as pool:
+            results = pool.map(analyze, [shared] * 100)
+
+The shared memory blocks are unlinked when the SharedArrayPool is closed, but
+they remain mapped in each process as long as arrays use them.
+
+This module requires Python 3.8 or newer. On older versions, it can be
+imported, but creating a SharedArrayPool raises an ImportError.
+"""
+
+
+import os
+import sys
+import weakref
+try:
+    from multiprocessing import resource_tracker
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:
+    # Python < 3.8
+    SharedMemory = None
+
+import attr
+import numpy as np
+
+from .fourindex import SymmetricFourIndex
+from .iodata import IOData
+
+
+__all__ = ['SharedArray', 'SharedArrayPool']
+
+
+# Before Python 3.13, every process that creates or attaches to a block
+# registers it with a resource tracker, which unlinks the block when that
+# process ends. The blocks are therefore unregistered here and unlinked
+# explicitly by SharedArrayPool.close.
+_UNTRACK = sys.version_info < (3, 13) and os.name == 'posix'
+
+
+# Blocks mapped in the current process, such that unpickling a SharedArray
+# reuses the existing mapping instead of attaching to the block again.
+_MAPPED_BLOCKS = weakref.WeakValueDictionary()
+
+
+class _SharedBlock:
+    """A mapped shared memory block, closed when the last array using it is deleted.
+
+    The arrays refer to the block through their ``base`` attribute, using the
+    ``__array_interface__`` below, and not through an export of the block's
+    buffer. Hence, the block can always be closed when it is deleted.
+    """
+
+    def __init__(self, shm: 'SharedMemory'):
+        """Initialize a _SharedBlock.
+
+        Parameters
+        ----------
+        shm
+            The shared memory block, which is closed when this object is deleted.
+
+        """
+        self.shm = shm
+        self.address = np.frombuffer(shm.buf, np.uint8).__array_interface__['data'][0]
+        self.__array_interface__ = {
+            'shape': (shm.size,),
+            'typestr': '|u1',
+            'data': (self.address, False),
+            'version': 3,
+        }
+        _MAPPED_BLOCKS[shm.name] = self
+
+    def __del__(self):
+        self.shm.close()
+
+
+def _open_shared_memory(name: str = None, size: int = 0) -> 'SharedMemory':
+    """Create (when name is None) or attach to a block, without tracking it."""
+    create = name is None
+    if sys.version_info >= (3, 13):
+        # pylint: disable=unexpected-keyword-arg
+        return SharedMemory(name, create, size, track=False)
+    shm = SharedMemory(name, create, size)
+    if _UNTRACK:
+        resource_tracker.unregister('/' + shm.name, 'shared_memory')
+    return shm
+
+
+class SharedArray(np.ndarray):
+    """A NumPy array in a shared memory block, pickled by reference instead of by value.
+
+    Instances are created with :py:meth:`SharedArrayPool.share_array`. Views of
+    a SharedArray are pickled by reference too. Other arrays derived from
+    it, e.g. results of arithmetic, are pickled by value.
+    """
+
+    def __array_finalize__(self, obj):
+        # pylint: disable=attribute-defined-outside-init
+        self._shm = getattr(obj, '_shm', None)
+
+    def __reduce_ex__(self, protocol):
+        block = self._shm
+        if block is not None:
+            low, high = np.byte_bounds(self)
+            if block.address <= low and high <= block.address + block.shm.size:
+                offset = self.__array_interface__['data'][0] - block.address
+                return _attach_shared_array, (block.shm.name, self.shape, self.dtype, offset,
+                                              self.strides)
+        return np.asarray(self).__reduce_ex__(protocol)
+
+
+def _view_shared_memory(block: _SharedBlock, shape: tuple, dtype: np.dtype,
+                        offset: int = 0, strides: tuple = None) -> SharedArray:
+    """Return a SharedArray using the memory of a shared memory block."""
+    array = np.ndarray(shape, dtype, buffer=np.asarray(block), offset=offset, strides=strides)
+    result = array.view(SharedArray)
+    # pylint: disable=protected-access
+    result._shm = block
+    return result
+
+
+def _attach_shared_array(name: str, shape: tuple, dtype: np.dtype, offset: int,
+                         strides: tuple) -> SharedArray:
+    """Unpickle a SharedArray by attaching to its shared memory block."""
+    block = _MAPPED_BLOCKS.get(name)
+    if block is None:
+        block = _SharedBlock(_open_shared_memory(name))
+    return _view_shared_memory(block, shape, dtype, offset, strides)
+
+
+class SharedArrayPool:
+    """Create SharedArray copies of arrays and unlink their memory when no longer needed.
+
+    The pool should be closed, preferably by using it as a context manager.
+    Otherwise, its shared memory blocks are not removed when the program ends.
+    """
+
+    def __init__(self, min_nbytes: int = 65536):
+        """Initialize a SharedArrayPool.
+
+        Parameters
+        ----------
+        min_nbytes
+            Only arrays with at least this number of bytes are put in shared memory
+            by :py:meth:`share_iodata`. Smaller arrays are cheaper to pickle.
+
+        """
+        if SharedMemory is None:
+            raise ImportError('SharedArrayPool requires Python 3.8 or newer.')
+        self.min_nbytes = min_nbytes
+        self._blocks = []
+
+    def __enter__(self) -> 'SharedArrayPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Unlink all shared memory blocks created by this pool.
+
+        Existing SharedArray instances remain usable, but new processes can
+        no longer attach to the blocks, i.e. they can no longer be unpickled.
+        A block is closed, i.e. unmapped, in each process when the last array
+        using it is deleted.
+        """
+        for shm in self._blocks:
+            if _UNTRACK:
+                # SharedMemory.unlink also unregisters the block.
+                resource_tracker.register('/' + shm.name, 'shared_memory')
+            shm.unlink()
+        self._blocks = []
+
+    def share_array(self, array: np.ndarray) -> SharedArray:
+        """Return a copy of an array in a new shared memory block."""
+        array = np.asarray(array)
+        if array.dtype.hasobject:
+            raise TypeError('Arrays of Python objects cannot be shared.')
+        shm = _open_shared_memory(size=max(array.nbytes, 1))
+        self._blocks.append(shm)
+        result = _view_shared_memory(_SharedBlock(shm), array.shape, array.dtype)
+        result[...] = array
+        return result
+
+    def share_iodata(self, iodata: IOData) -> IOData:
+        """Return a shallow copy of an IOData instance with large arrays in shared memory.
+
+        This includes arrays in dictionaries (e.g. ``one_rdms``), in ``mo``,
+        in ``cube`` and in four-index objects. The arrays of the original
+        instance are not modified.
+        """
+        kwargs = {field.name.lstrip('_'): self._share_value(getattr(iodata, field.name))
+                  for field in attr.fields(IOData)}
+        return IOData.from_trusted(**kwargs)
+
+    def _share_value(self, value):
+        """Return value with all large arrays in it replaced by SharedArray copies.
+
+        Containers without large arrays are returned as they are.
+        """
+        if isinstance(value, np.ndarray):
+            if (not isinstance(value, SharedArray) and not value.dtype.hasobject
+                    and value.nbytes >= self.min_nbytes):
+                return self.share_array(value)
+            return value
+        if isinstance(value, dict):
+            items = {key: self._share_value(item) for key, item in value.items()}
+            if all(item is value[key] for key, item in items.items()):
+                return value
+            return items
+        if isinstance(value, SymmetricFourIndex):
+            return SymmetricFourIndex(value.nbasis, self._share_value(value.data))
+        if isinstance(value, tuple) and hasattr(value, '_fields'):
+            # NamedTuples with arrays, e.g. MolecularOrbitals and Cube.
+            items = [self._share_value(item) for item in value]
+            if all(item is old_item for item, old_item in zip(items, value)):
+                return value
+            return type(value)(*items)
+        return value
@@ -44,15 +44,9 @@ def compute_mulliken_charges(iodata):
     ov = compute_overlap(iodata.obasis, iodata.atcoords)
     # compute basis function population matrix
     bp = np.sum(np.multiply(dm, ov), axis=1)
-    # find basis functions center
-    basis_center = []
-    for shell in iodata.obasis.shells:
-        basis_center.extend([shell.icenter] * shell.nbasis)
-    basis_center = np.array(basis_center)
     # compute atomic populations
-    populations = np.array([np.sum(bp[basis_center == index])
-                            for index in range(iodata.natom)])
-    return iodata.atcorenums - np.array(populations)
+    populations = np.bincount(iodata.obasis.basis_centers, bp, iodata.natom)
+    return iodata.atcorenums - populations
 
 
 @contextmanager
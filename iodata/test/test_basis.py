@@ -19,6 +19,8 @@
 """Unit tests for iodata.obasis."""
 
 
+import pickle
+
 import numpy as np
 from numpy.testing import assert_equal
 from pytest import raises
@@ -165,6 +167,108 @@ def test_get_segmented():
     assert_equal(shell3.coeffs, obasis0.shells[1].coeffs[:, 1:])
 
 
+def test_basis_layout():
+    obasis = MolecularBasis([
+        Shell(0, [0, 1], ['c', 'c'], np.random.uniform(0, 1, 5),
+              np.random.uniform(-1, 1, (5, 2))),
+        Shell(2, [2], ['p'], np.random.uniform(0, 1, 3),
+              np.random.uniform(-1, 1, (3, 1))),
+        Shell(1, [2, 3], ['c', 'p'], np.random.uniform(0, 1, 7),
+              np.random.uniform(-1, 1, (7, 2))),
+    ], CP2K_CONVENTIONS, 'L2')
+    assert obasis.nbasis == 22
+    assert_equal(obasis.shell_offsets, [0, 4, 9, 22])
+    assert_equal(obasis.basis_centers, [0] * 4 + [2] * 5 + [1] * 13)
+    assert_equal(obasis.basis_angmoms, [0] + [1] * 3 + [2] * 5 + [2] * 6 + [3] * 7)
+    # The arrays are cached and protected against accidental modification.
+    assert obasis.basis_centers is obasis.basis_centers
+    with raises(ValueError):
+        obasis.basis_centers[0] = 1
+    # In-place modifications of the shells are only taken into account after
+    # clearing the cache.
+    obasis.shells.append(Shell(3, [1], ['c'], np.ones(1), np.ones((1, 1))))
+    assert obasis.nbasis == 22
+    obasis.clear_cache()
+    assert obasis.nbasis == 25
+    assert_equal(obasis.basis_centers[-4:], [1, 3, 3, 3])
+    obasis.shells[0] = obasis.shells[0]._replace(icenter=4)
+    obasis.shells[1].kinds[0] = 'c'
+    obasis.clear_cache()
+    assert obasis.nbasis == 26
+    assert_equal(obasis.basis_centers[:5], [4, 4, 4, 4, 2])
+    # A new instance has its own cache.
+    assert obasis._replace(shells=obasis.shells[:1]).nbasis == 4
+    # The cache is not pickled.
+    obasis_pickled = pickle.loads(pickle.dumps(obasis))
+    assert '_cached_layout' not in obasis_pickled.__dict__
+    assert obasis_pickled.nbasis == 26
+    # Segmented shells are reused, but in a new list each time.
+    obasis_seg0 = obasis.get_segmented()
+    obasis_seg1 = obasis.get_segmented()
+    assert obasis_seg0.shells is not obasis_seg1.shells
+    assert obasis_seg0.shells == obasis_seg1.shells
+    check_same_basis(obasis_seg0, obasis_seg1)
+    assert_equal(obasis_seg0.basis_centers, obasis.basis_centers)
+    assert_equal(MolecularBasis([], CP2K_CONVENTIONS, 'L2').shell_offsets, [0])
+
+
+def check_same_basis(obasis0, obasis1):
+    """Check that two MolecularBasis instances are identical."""
+    assert obasis0.conventions == obasis1.conventions
+    assert obasis0.primitive_normalization == obasis1.primitive_normalization
+    assert len(obasis0.shells) == len(obasis1.shells)
+    for shell0, shell1 in zip(obasis0.shells, obasis1.shells):
+        assert shell0.icenter == shell1.icenter
+        assert_equal(shell0.angmoms, shell1.angmoms)
+        assert shell0.kinds == shell1.kinds
+        assert_equal(shell0.exponents, shell1.exponents)
+        assert_equal(shell0.coeffs, shell1.coeffs)
+
+
+def test_packed_basis():
+    obasis0 = MolecularBasis([
+        Shell(0, [0, 1], ['c', 'c'], np.random.uniform(0, 1, 5),
+              np.random.uniform(-1, 1, (5, 2))),
+        Shell(1, [2], ['p'], np.random.uniform(0, 1, 3),
+              np.random.uniform(-1, 1, (3, 1))),
+        Shell(1, [2, 3], ['c', 'p'], np.random.uniform(0, 1, 7),
+              np.random.uniform(-1, 1, (7, 2))),
+    ], CP2K_CONVENTIONS, 'L2')
+    packed = obasis0.to_packed()
+    assert packed.nshell == 3
+    assert packed.nbasis == obasis0.nbasis
+    assert_equal(packed.icenters, [0, 1, 1])
+    assert_equal(packed.prim_offsets, [0, 5, 8, 15])
+    assert_equal(packed.con_offsets, [0, 2, 3, 5])
+    assert_equal(packed.angmoms, [0, 1, 2, 2, 3])
+    assert_equal(packed.kinds, ['c', 'c', 'p', 'c', 'p'])
+    assert_equal(packed.get_ncons_basis(), [1, 3, 5, 6, 7])
+    assert_equal(packed.coeff_offsets, [0, 5, 10, 13, 20, 27])
+    assert_equal(packed.coeffs[5:10], obasis0.shells[0].coeffs[:, 1])
+    check_same_basis(packed.to_basis(), obasis0)
+    # Segmentation must give the same result in both representations.
+    packed_segmented = packed.get_segmented()
+    assert packed_segmented.nshell == 5
+    assert_equal(packed_segmented.coeffs, packed.coeffs)
+    check_same_basis(packed_segmented.to_basis(), obasis0.get_segmented())
+
+
+def test_packed_basis_empty():
+    obasis0 = MolecularBasis([], CP2K_CONVENTIONS, 'L2')
+    packed = obasis0.to_packed()
+    assert packed.nshell == 0
+    assert packed.nbasis == 0
+    check_same_basis(packed.to_basis(), obasis0)
+
+
+def test_packed_basis_exceptions():
+    obasis = MolecularBasis([
+        Shell(0, [1], ['p'], np.ones(1), np.ones((1, 1))),
+    ], CP2K_CONVENTIONS, 'L2')
+    with raises(TypeError):
+        _ = obasis.to_packed().nbasis
+
+
 def test_convert_convention_shell():
     assert convert_convention_shell('abc', 'cba') == ([2, 1, 0], [1, 1, 1])
     assert convert_convention_shell(['a', 'b', 'c'], ['c', 'b', 'a']) == ([2, 1, 0], [1, 1, 1])
@@ -227,6 +331,34 @@ def test_convert_convention_obasis():
     assert_equal(vec1, vec3)
 
 
+def test_convert_conventions_repeated_shells():
+    # Many shells share the same cached permutation, which must not be
+    # corrupted by the offsets added for later shells.
+    shells = [Shell(iatom, [0, 1, 2, 3], ['c', 'c', 'p', 'p'], None, None)
+              for iatom in range(5)]
+    obasis = MolecularBasis(shells, HORTON2_CONVENTIONS, 'L2')
+    for reverse in False, True:
+        permutation, signs = convert_conventions(obasis, PSI4_CONVENTIONS, reverse)
+        expected_permutation = []
+        expected_signs = []
+        for shell in obasis.shells:
+            for key in zip(shell.angmoms, shell.kinds):
+                shell_permutation, shell_signs = convert_convention_shell(
+                    HORTON2_CONVENTIONS[key], PSI4_CONVENTIONS[key], reverse)
+                expected_permutation.extend(np.array(shell_permutation)
+                                            + len(expected_permutation))
+                expected_signs.extend(shell_signs)
+        assert_equal(permutation, expected_permutation)
+        assert_equal(signs, expected_signs)
+        # The result must be a fresh array, safe to modify by the caller.
+        permutation[:] = 0
+        assert convert_conventions(obasis, PSI4_CONVENTIONS, reverse)[0].max() > 0
+    permutation, signs = convert_conventions(MolecularBasis([], HORTON2_CONVENTIONS, 'L2'),
+                                             PSI4_CONVENTIONS)
+    assert permutation.shape == (0,)
+    assert signs.shape == (0,)
+
+
 def test_convert_exceptions():
     with raises(TypeError):
         convert_convention_shell('abc', 'cb')
@@ -0,0 +1,120 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Test iodata.batch module."""
+
+import os
+
+import numpy as np
+from numpy.testing import assert_equal
+import pytest
+
+from ..api import load_many, dump_many
+from ..batch import IODataBatch
+from ..iodata import IOData
+try:
+    from importlib_resources import path
+except ImportError:
+    from importlib.resources import path
+
+
+def check_same_iodata(mol0, mol1):
+    """Check that the attributes of two IOData instances are the same."""
+    for name in ['atcoords', 'atnums', 'atcorenums', 'atmasses', 'bonds']:
+        assert_equal(getattr(mol0, name), getattr(mol1, name))
+    # The charge property raises an error when atnums is set and nelec is not,
+    # so the stored values are compared instead.
+    for name in ['title', 'energy', '_charge', '_nelec', 'lot']:
+        assert getattr(mol0, name) == getattr(mol1, name)
+    assert mol0.atcharges.keys() == mol1.atcharges.keys()
+    for key, value in mol0.atcharges.items():
+        assert_equal(value, mol1.atcharges[key])
+    assert mol0.atffparams == mol1.atffparams
+    assert mol0.extra == mol1.extra
+
+
+@pytest.mark.parametrize('fn', ['caffeine.mol2', 'example.sdf', 'water_trajectory.xyz'])
+def test_batch_load_many(fn, tmpdir):
+    with path('iodata.test.data', fn) as fn_data:
+        mols = list(load_many(str(fn_data)))
+        batch = IODataBatch.from_iodatas(load_many(str(fn_data)))
+    assert len(batch) == len(mols)
+    assert_equal(batch.natoms, [mol.natom for mol in mols])
+    assert_equal(batch.atoms['atcoords'], np.concatenate([mol.atcoords for mol in mols]))
+    assert_equal(batch.frames['title'], [mol.title for mol in mols])
+    for mol, mol_batch in zip(mols, batch):
+        check_same_iodata(mol, mol_batch)
+    check_same_iodata(mols[-1], batch[-1])
+    # A batch can be written directly.
+    fn_tmp = os.path.join(tmpdir, 'batch' + os.path.splitext(fn)[1])
+    dump_many(batch, fn_tmp)
+    for mol, mol_dumped in zip(mols, load_many(fn_tmp)):
+        assert_equal(mol.atnums, mol_dumped.atnums)
+
+
+def test_batch_missing_attributes():
+    mols = [
+        IOData(atnums=[1, 1], atcoords=np.zeros((2, 3)), energy=-1.0, title='h2',
+               atcharges={'mulliken': np.array([0.1, -0.1])}),
+        IOData(atnums=[8], energy=None, lot='hf', extra={'foo': 1},
+               atcharges={'esp': np.array([0.0])}),
+        IOData(atnums=[1, 8, 1], atcoords=np.ones((3, 3)), charge=1.0, bonds=[[0, 1, 1]]),
+    ]
+    batch = IODataBatch.from_iodatas(mols)
+    assert len(batch) == 3
+    assert_equal(batch.atom_offsets, [0, 2, 3, 6])
+    assert list(batch.atoms) == ['atcorenums', 'atnums']
+    assert_equal(batch.atoms['atcorenums'], [1.0, 1.0, 8.0, 1.0, 8.0, 1.0])
+    assert batch.atcharges == {}
+    assert batch.bonds is None
+    assert [sorted(other) for other in batch.others] == [
+        ['atcharges', 'atcoords'], ['atcharges', 'extra'], ['atcoords', 'bonds']]
+    assert_equal(batch.frames['energy'], [-1.0, np.nan, np.nan])
+    assert_equal(batch.frames['charge'], [np.nan, np.nan, 1.0])
+    assert_equal(batch.frames['lot'], [None, 'hf', None])
+    for mol, mol_batch in zip(mols, batch):
+        check_same_iodata(mol, mol_batch)
+    # Per-atom arrays are views of the arrays in the batch.
+    mol = batch[2]
+    mol.atnums[1] = 7
+    assert batch.atoms['atnums'][4] == 7
+    with pytest.raises(IndexError):
+        _ = batch[3]
+    with pytest.raises(IndexError):
+        _ = batch[-4]
+
+
+def test_batch_atcorenums():
+    # The stored columns must not depend on whether the atcorenums property
+    # of the frames was accessed before.
+    mols = [IOData(atnums=[1, 8]), IOData(atnums=[6])]
+    batch0 = IODataBatch.from_iodatas(mols)
+    assert mols[0].atcorenums is not None
+    batch1 = IODataBatch.from_iodatas(mols)
+    assert batch0.atoms.keys() == batch1.atoms.keys()
+    assert_equal(batch0.atoms['atcorenums'], batch1.atoms['atcorenums'])
+    # Nothing is left for the per-frame dictionaries.
+    assert batch0.others is None
+
+
+def test_batch_empty():
+    batch = IODataBatch.from_iodatas([])
+    assert len(batch) == 0
+    assert list(batch) == []
+    assert batch.atoms == {}
+    assert batch.frames == {}
@@ -0,0 +1,120 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Unit tests for iodata.fourindex."""
+
+
+import os
+
+import numpy as np
+from numpy.testing import assert_equal, assert_allclose
+import pytest
+
+from ..fourindex import SymmetricFourIndex, pack_pair, unpack_pair
+from ..utils import set_four_index_element
+
+
+def get_random_dense(nbasis, seed=1):
+    """Return a random dense four-index array with 8-fold symmetry."""
+    rng = np.random.RandomState(seed)
+    dense = np.zeros((nbasis,) * 4)
+    for i, j, k, l in np.ndindex(*dense.shape):
+        if dense[i, j, k, l] == 0.0:
+            set_four_index_element(dense, i, j, k, l, rng.uniform(-1, 1))
+    return dense
+
+
+def test_pack_unpack_pair():
+    i, j = np.tril_indices(100)
+    index = pack_pair(i, j)
+    assert_equal(index, np.arange(len(i)))
+    assert_equal(pack_pair(j, i), index)
+    i2, j2 = unpack_pair(index)
+    assert_equal(i2, i)
+    assert_equal(j2, j)
+    # large indexes, where the square root may suffer from rounding errors
+    big = np.array([2**30 - 1, 2**30, 2**31 + 5])
+    i3, j3 = unpack_pair(pack_pair(big, big - 3))
+    assert_equal(i3, big)
+    assert_equal(j3, big - 3)
+
+
+def test_size():
+    op = SymmetricFourIndex(10)
+    assert op.shape == (10, 10, 10, 10)
+    assert op.ndim == 4
+    assert len(op) == 10
+    assert op.data.shape == (55 * 56 // 2,)
+    with pytest.raises(TypeError):
+        SymmetricFourIndex(10, np.zeros(10))
+
+
+def test_dense_round_trip():
+    dense = get_random_dense(5)
+    op = SymmetricFourIndex.from_dense(dense)
+    assert_equal(op.to_dense(), dense)
+    assert_equal(np.asarray(op), dense)
+    assert_allclose(op, dense)
+
+
+def test_setitem_symmetry():
+    op = SymmetricFourIndex(4)
+    op[3, 1, 2, 0] = 0.5
+    dense = np.zeros((4, 4, 4, 4))
+    set_four_index_element(dense, 3, 1, 2, 0, 0.5)
+    assert_equal(op.to_dense(), dense)
+    assert (op.data != 0).sum() == 1
+
+
+def test_getitem():
+    dense = get_random_dense(5)
+    op = SymmetricFourIndex.from_dense(dense)
+    assert op[1, 2, 3, 4] == dense[1, 2, 3, 4]
+    assert op[-1, 0, -2, 3] == dense[-1, 0, -2, 3]
+    index = ([0, 1, 4], [2, 2, 3], 1, [[4], [0]])
+    assert_equal(op[index], dense[index])
+    assert_equal(op[1:4, 2, :, ::2], dense[1:4, 2, :, ::2])
+    assert_equal(op[:, 0, 1, 2], dense[:, 0, 1, 2])
+    assert_equal(op[2], dense[2])
+    assert_equal(op[..., 3], dense[..., 3])
+    with pytest.raises(IndexError):
+        op[5, 0, 0, 0]  # pylint: disable=pointless-statement
+
+
+def test_unpack_indices():
+    op = SymmetricFourIndex(6)
+    op.data[:] = np.arange(len(op.data))
+    i, j, k, l = op.unpack_indices()
+    assert_equal(op[i, j, k, l], op.data)
+    # canonical order in chemists' notation (ik|jl)
+    assert (i >= k).all()
+    assert (j >= l).all()
+    assert (pack_pair(i, k) >= pack_pair(j, l)).all()
+
+
+def test_npy(tmpdir):
+    fn = os.path.join(tmpdir, 'op.npy')
+    op0 = SymmetricFourIndex.create_npy(4, fn)
+    assert isinstance(op0.data, np.memmap)
+    op0[3, 1, 2, 0] = 0.5
+    op0.data.flush()
+    op1 = SymmetricFourIndex.load_npy(4, fn)
+    assert op1[1, 3, 0, 2] == 0.5
+    assert_equal(op1.data, op0.data)
+    with pytest.raises(ValueError):
+        op1[0, 0, 0, 0] = 1.0
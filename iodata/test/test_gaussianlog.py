@@ -18,9 +18,16 @@
 # --
 """Test iodata.formats.log module."""
 
+import os
+
+import numpy as np
 from numpy.testing import assert_equal, assert_allclose
+import pytest
 
-from ..api import load_one
+from .common import truncated_file
+from ..api import load_one, load_many
+from ..formats import gaussianlog
+from ..utils import angstrom, wavenumber, FileFormatError, FileFormatWarning
 
 try:
     from importlib_resources import path
@@ -103,3 +110,131 @@ def test_load_operators_water_ccpvdz_pure_hf_g03():
     assert_allclose(er_ao[23, 23, 23, 23], 0.785718708997, atol=eps)
     assert_allclose(er_ao[23, 8, 23, 2], -0.0400337571969, atol=eps)
     assert_allclose(er_ao[15, 2, 12, 0], -0.0000308196281033, atol=eps)
+
+
+def test_load_operators_scratch(tmpdir):
+    mol0 = load_log_helper('water_sto3g_hf_g03.log')
+    with path('iodata.test.data', 'water_sto3g_hf_g03.log') as fn:
+        mol1 = load_one(str(fn), scratch=str(tmpdir))
+        assert len(os.listdir(tmpdir)) == 1
+        # The second time, the two-electron integrals come from the cache.
+        mol2 = load_one(str(fn), scratch=str(tmpdir))
+    for mol in mol1, mol2:
+        assert isinstance(mol.two_ints['er_ao'].data, np.memmap)
+        assert_equal(mol.two_ints['er_ao'].data, mol0.two_ints['er_ao'].data)
+        for key in 'olp', 'kin_ao', 'na_ao':
+            assert_equal(mol.one_ints[key], mol0.one_ints[key])
+
+
+def test_load_operators_scratch_two_dumps(tmpdir):
+    # Each two-electron integral dump in a log file has its own cache file.
+    fn = os.path.join(tmpdir, 'two_dumps.log')
+    with open(fn, 'w') as f:
+        for fn_log in 'water_ccpvdz_pure_hf_g03.log', 'water_sto3g_hf_g03.log':
+            with path('iodata.test.data', fn_log) as fn_data:
+                with open(str(fn_data)) as f_data:
+                    f.write(f_data.read())
+    mol0 = load_log_helper('water_sto3g_hf_g03.log')
+    scratch = os.path.join(tmpdir, 'scratch')
+    os.mkdir(scratch)
+    for _ in range(2):
+        mol1 = load_one(fn, scratch=scratch)
+        assert len(os.listdir(scratch)) == 2
+        assert_equal(mol1.two_ints['er_ao'].data, mol0.two_ints['er_ao'].data)
+
+
+def test_load_operators_chunks(monkeypatch):
+    mol0 = load_log_helper('water_ccpvdz_pure_hf_g03.log')
+    monkeypatch.setattr(gaussianlog, 'CHUNK_SIZE', 1000)
+    mol1 = load_log_helper('water_ccpvdz_pure_hf_g03.log')
+    assert_equal(mol1.two_ints['er_ao'].data, mol0.two_ints['er_ao'].data)
+
+
+def test_parse_fourindex_lines():
+    lines = [
+        ' I=  6 J=  2 K=  5 L=  1 Int=  0.708496640384D-02\n',
+        ' I=  7 J=  5 K=  2 L=  1 Int= -0.675166544355D-01\n',
+    ]
+    for chunk in lines, lines[:1], [lines[0].strip('\n')] + lines[1:]:
+        indexes, values = gaussianlog._parse_fourindex_lines(chunk)
+        assert_equal(indexes, [[5, 1, 4, 0], [6, 4, 1, 0]][:len(chunk)])
+        assert_equal(values, [0.708496640384E-02, -0.675166544355E-01][:len(chunk)])
+
+
+def test_load_opt_freq():
+    mol = load_log_helper('water_opt_freq_hf_g09.log')
+    assert_equal(mol.atnums, [8, 1, 1])
+    assert_allclose(mol.atcoords[1] / angstrom, [0.0, 0.751542, -0.509470])
+    assert_allclose(mol.energy, -74.9659011170)
+    # No forces are printed for the last geometry, from the frequency job.
+    assert mol.atgradient is None
+    # The frequency job comes after the normal termination of the optimization.
+    assert_allclose(mol.extra['frequencies'] / wavenumber, [2169.8256, 4139.8020, 4390.3581])
+    assert mol.one_ints == {}
+    assert mol.two_ints == {}
+
+
+def test_load_many_opt_freq():
+    with path('iodata.test.data', 'water_opt_freq_hf_g09.log') as fn:
+        mols = list(load_many(str(fn)))
+    assert len(mols) == 3
+    assert_allclose([mol.energy for mol in mols],
+                    [-74.9629282496, -74.9659011170, -74.9659011170])
+    # Frames with forces use the input orientation, like the forces.
+    assert_allclose(mols[0].atcoords[2] / angstrom, [0.929097, 0.0, -0.241656])
+    assert_allclose(mols[0].atgradient[2], [-0.011190884, 0.0, -0.003504254])
+    assert_allclose(mols[1].atcoords[0] / angstrom, [0.034419, 0.0, 0.024335])
+    assert_allclose(mols[1].atgradient[0], [0.000025914, 0.0, 0.000018324])
+    # Other frames use the standard orientation.
+    assert_allclose(mols[2].atcoords[0] / angstrom, [0.0, 0.0, 0.127368])
+    assert mols[2].atgradient is None
+    assert 'frequencies' not in mols[0].extra
+    assert len(mols[2].extra['frequencies']) == 3
+
+
+def test_load_truncated(tmpdir):
+    # A file without the normal termination of the last job step is truncated.
+    with path('iodata.test.data', 'water_opt_freq_hf_g09.log') as fn_log:
+        with truncated_file(str(fn_log), 110, 0, tmpdir) as fn:
+            with pytest.raises(FileFormatError):
+                load_one(fn)
+            with pytest.raises(FileFormatError):
+                list(load_many(fn))
+    with path('iodata.test.data', 'water_sto3g_hf_g03.log') as fn_log:
+        with truncated_file(str(fn_log), 200, 0, tmpdir) as fn:
+            with pytest.raises(FileFormatError):
+                load_one(fn)
+
+
+def test_load_last_geometry_only(tmpdir):
+    # Results of earlier geometries must not be used when they are missing for
+    # the last geometry. The energy and frequencies of the last one are removed.
+    with path('iodata.test.data', 'water_opt_freq_hf_g09.log') as fn_log:
+        with open(str(fn_log)) as f:
+            lines = f.readlines()
+    assert lines[101].startswith(' SCF Done:')
+    assert lines[111].startswith(' Frequencies --')
+    fn = os.path.join(tmpdir, 'no_last_energy.log')
+    with open(fn, 'w') as f:
+        f.writelines(lines[:101] + lines[102:111] + lines[112:])
+    mol = load_one(fn)
+    assert_allclose(mol.atcoords[0] / angstrom, [0.0, 0.0, 0.127368])
+    assert mol.energy is None
+    assert mol.atgradient is None
+    assert mol.extra == {}
+
+
+def test_load_forces_without_input_orientation(tmpdir):
+    # Forces cannot be used without the coordinates in the same orientation.
+    with path('iodata.test.data', 'water_opt_freq_hf_g09.log') as fn_log:
+        with open(str(fn_log)) as f:
+            lines = f.readlines()
+    fn = os.path.join(tmpdir, 'no_input_orientation.log')
+    with open(fn, 'w') as f:
+        f.writelines(lines[:7] + lines[16:])
+    with pytest.warns(FileFormatWarning):
+        mols = list(load_many(fn))
+    assert len(mols) == 3
+    assert mols[0].atgradient is None
+    assert_allclose(mols[0].atcoords[0] / angstrom, [0.0, 0.0, 0.119634])
+    assert mols[1].atgradient is not None
@@ -0,0 +1,143 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Test iodata.integrals module."""
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+from scipy.special import gamma, gammainc
+
+from ..api import load_one
+from ..basis import MolecularBasis, Shell, iter_cart_alphabet
+from ..integrals import compute_one_ints
+from ..overlap import compute_overlap, OVERLAP_CONVENTIONS
+from ..overlap_accel import _compute_boys_function
+
+try:
+    from importlib_resources import path
+except ImportError:
+    from importlib.resources import path
+
+
+def load_fchk_log_pair(name):
+    """Load a formatted checkpoint file and the corresponding log file."""
+    with path('iodata.test.data', name + '.fchk') as fn_fchk:
+        mol = load_one(str(fn_fchk))
+    with path('iodata.test.data', name + '.log') as fn_log:
+        log = load_one(str(fn_log))
+    return mol, log
+
+
+def test_compute_one_ints_water_ccpvdz():
+    mol, log = load_fchk_log_pair('water_ccpvdz_pure_hf_g03')
+    one_ints = compute_one_ints(mol.obasis, mol.atcoords, atcorenums=mol.atcorenums)
+    assert sorted(one_ints) == ['kin_ao', 'na_ao', 'olp']
+    assert_allclose(one_ints['olp'], compute_overlap(mol.obasis, mol.atcoords))
+    # Gaussian prints the integrals with six significant digits.
+    assert_allclose(one_ints['olp'], log.one_ints['olp'], atol=1e-6)
+    assert_allclose(one_ints['kin_ao'], log.one_ints['kin_ao'], atol=1e-4)
+    assert_allclose(one_ints['na_ao'], log.one_ints['na_ao'], atol=1e-4)
+
+
+def test_compute_one_ints_dipole():
+    with path('iodata.test.data', 'water_ccpvdz_pure_hf_g03.fchk') as fn_fchk:
+        mol = load_one(str(fn_fchk))
+    origin = np.array([0.1, -0.2, 0.3])
+    one_ints = compute_one_ints(mol.obasis, mol.atcoords, ['dipole_ao'], origin=origin)
+    assert one_ints['dipole_ao'].shape == (3, mol.obasis.nbasis, mol.obasis.nbasis)
+    dm = mol.one_rdms['scf']
+    dipole = (np.dot(mol.atcorenums, mol.atcoords - origin)
+              - np.einsum('ij,kji->k', dm, one_ints['dipole_ao']))
+    # The net charge is zero, so the dipole does not depend on the origin.
+    assert_allclose(dipole, mol.moments[(1, 'c')], atol=1e-7)
+
+
+def test_compute_one_ints_quadrupole():
+    with path('iodata.test.data', 'h2o_sto3g.fchk') as fn_fchk:
+        mol = load_one(str(fn_fchk))
+    one_ints = compute_one_ints(mol.obasis, mol.atcoords, ['quadrupole_ao'])
+    dm = mol.one_rdms['scf']
+    quadrupole = -np.einsum('ij,kji->k', dm, one_ints['quadrupole_ao'])
+    for icomp, pows in enumerate(iter_cart_alphabet(2)):
+        quadrupole[icomp] += np.dot(mol.atcorenums, np.prod(mol.atcoords**pows, axis=1))
+    # Gaussian reports the traceless part, without a factor 3/2.
+    quadrupole[[0, 3, 5]] -= quadrupole[[0, 3, 5]].sum() / 3
+    assert_allclose(quadrupole, mol.moments[(2, 'c')], atol=1e-7)
+
+
+def test_compute_one_ints_num_threads():
+    with path('iodata.test.data', 'o2_cc_pvtz_pure.fchk') as fn_fchk:
+        mol = load_one(str(fn_fchk))
+    kinds = ['kin_ao', 'na_ao', 'dipole_ao']
+    one_ints1 = compute_one_ints(mol.obasis, mol.atcoords, kinds, mol.atcorenums)
+    one_ints4 = compute_one_ints(mol.obasis, mol.atcoords, kinds, mol.atcorenums,
+                                 num_threads=4)
+    for kind in kinds:
+        assert_allclose(one_ints1[kind], one_ints4[kind], rtol=0.0, atol=1e-13)
+        assert_allclose(one_ints1[kind], np.swapaxes(one_ints1[kind], -1, -2),
+                        rtol=0.0, atol=1e-13)
+
+
+def test_compute_one_ints_kinetic_s():
+    # Analytic result for two normalized s-type primitives.
+    alpha0, alpha1, dist = 0.8, 1.7, 1.3
+    obasis = MolecularBasis([
+        Shell(0, [0], ['c'], np.array([alpha0]), np.array([[1.0]])),
+        Shell(1, [0], ['c'], np.array([alpha1]), np.array([[1.0]])),
+    ], OVERLAP_CONVENTIONS, 'L2')
+    atcoords = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, dist]])
+    one_ints = compute_one_ints(obasis, atcoords, ['olp', 'kin_ao'])
+    mu = alpha0 * alpha1 / (alpha0 + alpha1)
+    olp = (4 * alpha0 * alpha1 / (alpha0 + alpha1)**2)**0.75 * np.exp(-mu * dist**2)
+    assert_allclose(one_ints['olp'][0, 1], olp)
+    assert_allclose(one_ints['kin_ao'][0, 1], mu * (3 - 2 * mu * dist**2) * olp)
+
+
+def test_compute_one_ints_nuclear_s():
+    # Analytic result for a normalized s-type primitive centered on a charge.
+    # The electron charge is not included, so the result is positive.
+    alpha = 0.8
+    obasis = MolecularBasis([Shell(0, [0], ['c'], np.array([alpha]), np.array([[1.0]]))],
+                            OVERLAP_CONVENTIONS, 'L2')
+    one_ints = compute_one_ints(obasis, np.zeros((1, 3)), ['na_ao'], np.array([3.0]))
+    assert_allclose(one_ints['na_ao'], [[3.0 * 2 * np.sqrt(2 * alpha / np.pi)]])
+
+
+def test_boys_function():
+    out = np.zeros(15)
+    for t in [0.0, 1e-8, 0.3, 5.0, 29.0, 35.0, 50.0, 120.0]:
+        _compute_boys_function(14, t, out)
+        for n in range(15):
+            if t == 0.0:
+                expected = 1.0 / (2 * n + 1)
+            else:
+                expected = gamma(n + 0.5) * gammainc(n + 0.5, t) / (2 * t**(n + 0.5))
+            assert_allclose(out[n], expected, rtol=1e-12, atol=1e-300)
+
+
+def test_compute_one_ints_errors():
+    with path('iodata.test.data', 'h2o_sto3g.fchk') as fn_fchk:
+        mol = load_one(str(fn_fchk))
+    with pytest.raises(ValueError):
+        compute_one_ints(mol.obasis, mol.atcoords, ['foo'])
+    with pytest.raises(TypeError):
+        compute_one_ints(mol.obasis, mol.atcoords, ['na_ao'])
+    obasis = mol.obasis._replace(primitive_normalization='L1')
+    with pytest.raises(ValueError):
+        compute_one_ints(obasis, mol.atcoords, ['olp'])
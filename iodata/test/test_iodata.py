@@ -20,12 +20,15 @@
 """Test iodata.iodata module."""
 
 
+import pickle
+
 import numpy as np
 from numpy.testing import assert_allclose
 import pytest
 
 from .common import compute_1rdm
-from ..api import load_one, IOData
+from ..api import load_one, load_many, IOData
+from ..iodata import ARRAY_COPY_COUNTER
 from ..overlap import compute_overlap
 try:
     from importlib_resources import path
@@ -58,6 +61,33 @@ def test_typecheck_raises():
     pytest.raises(TypeError, IOData, atnums=atnums, atcoords=atcoords)
 
 
+def test_typecheck_keep_dtype(tmpdir):
+    ARRAY_COPY_COUNTER.clear()
+    atcoords = np.zeros((2, 3), dtype=np.float32)
+    atnums = np.array([1, 8], dtype=np.int32)
+    m = IOData(atcoords=atcoords, atnums=atnums, atfrozen=[True, False])
+    assert m.atcoords is atcoords
+    assert m.atnums is atnums
+    assert m.atfrozen.dtype == bool
+    assert sum(ARRAY_COPY_COUNTER.values()) == 0
+    # Incompatible dtypes are converted and counted.
+    m = IOData(atcoords=atcoords.astype(np.float16), atnums=np.array([1, 8], dtype=np.uint8))
+    assert m.atcoords.dtype == float
+    assert np.issubdtype(m.atnums.dtype, np.integer)
+    assert m.atnums.dtype.itemsize >= 4
+    assert ARRAY_COPY_COUNTER['float16', 'float64'] == 1
+    assert ARRAY_COPY_COUNTER['uint8', np.dtype(int).name] == 1
+    # Read-only memory-mapped arrays are not copied.
+    fn = str(tmpdir.join('atcoords.npy'))
+    np.save(fn, np.random.uniform(-1, 1, (5, 3)).astype(np.float32))
+    atcoords = np.load(fn, mmap_mode='r')
+    m = IOData(atcoords=atcoords)
+    assert np.shares_memory(m.atcoords, atcoords)
+    assert not m.atcoords.flags.writeable
+    assert m.natom == 5
+    assert sum(ARRAY_COPY_COUNTER.values()) == 2
+
+
 def test_unknown_format():
     pytest.raises(ValueError, load_one, 'foo.unknown_file_extension')
 
@@ -147,3 +177,70 @@ def test_natom():
     assert IOData(atfrozen=[False, True, False, True]).natom == 4
     assert IOData(atmasses=[0, 0, 0, 0]).natom == 4
     assert IOData(atnums=[1, 1, 1, 1]).natom == 4
+
+
+def test_from_trusted():
+    atcoords = np.zeros((2, 3))
+    mol = IOData.from_trusted(atcoords=atcoords, atnums=[1, 8], title='test')
+    assert mol.atcoords is atcoords
+    # No conversion or validation takes place.
+    assert mol.atnums == [1, 8]
+    assert mol.atcharges == {}
+    assert mol.mo is None
+    mol.validate()
+    assert mol.atcoords is atcoords
+    assert np.issubdtype(mol.atnums.dtype, np.integer)
+    assert_allclose(mol.atcorenums, [1.0, 8.0])
+    # Inconsistent shapes are only detected by validate.
+    mol = IOData.from_trusted(atcoords=atcoords, atnums=np.array([1, 8, 1]))
+    with pytest.raises(TypeError):
+        mol.validate()
+    with pytest.raises(TypeError):
+        IOData.from_trusted(atcoords=atcoords, foo=1)
+    mol = IOData.from_trusted()
+    mol.validate()
+    assert mol.natom is None
+
+
+@pytest.mark.parametrize('fn, many', [('water_ccpvdz_pure_hf_g03.fchk', False),
+                                      ('water_orca.out', False),
+                                      ('h2o.molden.input', False),
+                                      ('caffeine.mol2', True), ('water.xyz', True)])
+def test_load_trusted(fn, many):
+    # Loaders construct IOData instances without conversion and validation,
+    # so they must return arrays that would not be changed by validate.
+    with path('iodata.test.data', fn) as fn_data:
+        mols = list(load_many(str(fn_data))) if many else [load_one(str(fn_data))]
+    for mol in mols:
+        arrays = [mol.atcoords, mol.atcorenums, mol.atnums, mol.bonds]
+        mol.validate()
+        for array0, array1 in zip(arrays, [mol.atcoords, mol.atcorenums,
+                                           mol.atnums, mol.bonds]):
+            assert array0 is array1
+
+
+def test_pickle():
+    with path('iodata.test.data', 'water_ccpvdz_pure_hf_g03.fchk') as fn_fchk:
+        mol0 = load_one(str(fn_fchk))
+    # Only attributes that are set are included in the pickle.
+    assert 'extra' not in mol0.__getstate__()
+    assert '_atcorenums' in mol0.__getstate__()
+    mol1 = pickle.loads(pickle.dumps(mol0))
+    assert mol1.title == mol0.title
+    assert mol1.extra == {}
+    assert_allclose(mol1.atcorenums, mol0.atcorenums)
+    assert_allclose(mol1.mo.coeffs, mol0.mo.coeffs)
+    assert_allclose(mol1.one_rdms['scf'], mol0.one_rdms['scf'])
+
+
+@pytest.mark.skipif(pickle.HIGHEST_PROTOCOL < 5, reason='Requires pickle protocol 5.')
+def test_pickle_out_of_band():
+    with path('iodata.test.data', 'water_ccpvdz_pure_hf_g03.fchk') as fn_fchk:
+        mol0 = load_one(str(fn_fchk))
+    buffers = []
+    data = pickle.dumps(mol0, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) > 0
+    mol1 = pickle.loads(data, buffers=buffers)
+    assert_allclose(mol1.mo.coeffs, mol0.mo.coeffs)
+    # Out-of-band buffers are not copied.
+    assert np.shares_memory(mol1.mo.coeffs, mol0.mo.coeffs)
@@ -117,3 +117,30 @@ def test_load_dump_many_consistency(tmpdir):
         assert mol0.title == mol1.title
         assert_equal(mol0.atnums, mol1.atnums)
         assert_allclose(mol0.atcoords, mol1.atcoords, atol=1.e-5)
+
+
+def test_load_dtypes():
+    with path('iodata.test.data', 'caffeine.mol2') as fn_mol2:
+        mol = load_one(str(fn_mol2))
+    assert mol.atnums.dtype == int
+    assert mol.bonds.dtype == int
+    assert mol.bonds.shape == (25, 3)
+    assert_equal(mol.bonds[13], [6, 8, 4])
+
+
+def test_load_many_truncated(tmpdir):
+    # A file that ends in the middle of the second molecule must raise an
+    # error instead of silently returning only the first molecule.
+    with path('iodata.test.data', 'caffeine.mol2') as fn_test:
+        with truncated_file(fn_test, 70, 0, tmpdir) as fn:
+            with pytest.raises(IOError):
+                list(load_many(str(fn)))
+
+
+def test_load_many_truncated_before_bonds(tmpdir):
+    # The second molecule is complete up to its ATOM block, but its bonds are
+    # missing. This must raise an error too.
+    with path('iodata.test.data', 'caffeine.mol2') as fn_test:
+        with truncated_file(fn_test, 88, 0, tmpdir) as fn:
+            with pytest.raises(IOError):
+                list(load_many(str(fn)))
@@ -28,7 +28,9 @@ import pytest
 from .common import compute_mulliken_charges, compare_mols, check_orthonormal
 from ..api import load_one, dump_one
 from ..basis import convert_conventions
-from ..formats.molden import _load_low
+from ..formats.molden import (_load_low, _compute_primitive_overlap,
+                              _compute_contraction_matrix, _fix_obasis_orca,
+                              _select_orbitals)
 from ..overlap import compute_overlap, OVERLAP_CONVENTIONS
 from ..utils import LineIterator, angstrom, FileFormatWarning
 
@@ -422,3 +424,40 @@ def test_dump_molden_from_fchk_rohf(tmpdir):
         fn_tmp = os.path.join(tmpdir, 'ch3_rohf_sto3g_g03.molden')
         dump_one(mol, fn_tmp)
         assert os.path.isfile(fn_tmp)
+
+
+def test_primitive_overlap():
+    # The overlap matrix of the contractions, derived from the primitive
+    # overlap matrix, must be consistent with the direct computation, also
+    # when the conventions differ (sign changes in the ORCA case).
+    with path('iodata.test.data', 'nh3_molden_pure.molden') as fn_molden:
+        mol = load_one(str(fn_molden))
+    olp_prim = _compute_primitive_overlap(mol.obasis, mol.atcoords)
+    for obasis in mol.obasis, _fix_obasis_orca(mol.obasis):
+        contraction = _compute_contraction_matrix(obasis, mol.obasis.conventions)
+        assert_allclose(contraction.T.dot(contraction.T.dot(olp_prim).T),
+                        compute_overlap(obasis, mol.atcoords), atol=1e-12)
+
+
+def test_load_molden_nh3_orca_norm_nvirtual():
+    with path('iodata.test.data', 'nh3_orca.molden') as fn_molden:
+        with pytest.warns(FileFormatWarning) as record:
+            mol1 = load_one(str(fn_molden), norm_nvirtual=2)
+        mol2 = load_one(str(fn_molden))
+    assert len(record) == 1
+    assert 'ORCA' in record[0].message.args[0]
+    compare_mols(mol1, mol2)
+
+
+def test_load_molden_norm_threshold():
+    with path('iodata.test.data', 'nh3_molden_pure.molden') as fn_molden:
+        with pytest.raises(IOError):
+            load_one(str(fn_molden), norm_threshold=0.0, norm_nvirtual=0)
+
+
+def test_select_orbitals():
+    occs = np.array([2.0, 2.0, 0.0, 1.0, 0.0, 0.0])
+    energies = np.array([-2.0, -1.0, 0.5, -0.5, 0.3, 0.1])
+    assert_equal(_select_orbitals(occs, energies), np.arange(6))
+    assert_equal(_select_orbitals(occs, energies, 0), [0, 1, 3])
+    assert_equal(_select_orbitals(occs, energies, 2), [0, 1, 3, 4, 5])
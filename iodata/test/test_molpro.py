@@ -21,9 +21,12 @@
 import os
 
 import numpy as np
+import pytest
 from numpy.testing import assert_equal, assert_allclose
 
 from ..api import load_one, dump_one
+from ..formats import molpro
+from ..fourindex import SymmetricFourIndex
 
 try:
     from importlib_resources import path
@@ -106,3 +109,124 @@ def test_dump_load_fcidimp_consistency_ao(tmpdir):
     assert_equal(mol0.spinpol, mol1.spinpol)
     assert_allclose(mol0.one_ints['core_mo'], mol1.one_ints['core_mo'])
     assert_allclose(mol0.two_ints['two_mo'], mol1.two_ints['two_mo'])
+
+
+def test_dump_load_fcidump_symmetric(tmpdir):
+    with path('iodata.test.data', 'FCIDUMP.molpro.h2') as fn:
+        mol0 = load_one(str(fn))
+    assert isinstance(mol0.two_ints['two_mo'], SymmetricFourIndex)
+    fn_tmp = os.path.join(tmpdir, 'FCIDUMP')
+    dump_one(mol0, fn_tmp)
+    mol1 = load_one(fn_tmp)
+    assert_allclose(mol0.core_energy, mol1.core_energy)
+    assert_allclose(mol0.one_ints['core_mo'], mol1.one_ints['core_mo'])
+    assert_equal(mol0.two_ints['two_mo'].data, mol1.two_ints['two_mo'].data)
+
+
+def test_load_fcidump_chunks(monkeypatch):
+    with path('iodata.test.data', 'FCIDUMP.molpro.h2') as fn:
+        mol0 = load_one(str(fn))
+        # Parse the integrals in many small chunks, including a partial one.
+        monkeypatch.setattr(molpro, 'CHUNK_SIZE', 7)
+        mol1 = load_one(str(fn))
+    assert_equal(mol0.core_energy, mol1.core_energy)
+    assert_equal(mol0.one_ints['core_mo'], mol1.one_ints['core_mo'])
+    assert_equal(mol0.two_ints['two_mo'].data, mol1.two_ints['two_mo'].data)
+
+
+def test_load_fcidump_wrong_fields(tmpdir):
+    with path('iodata.test.data', 'FCIDUMP.molpro.h2') as fn:
+        with open(str(fn)) as f:
+            lines = f.readlines()
+    fn_tmp = os.path.join(tmpdir, 'FCIDUMP')
+    with open(fn_tmp, 'w') as f:
+        f.writelines(lines[:10])
+        f.write('  0.1E+00   1   1   1\n')
+        f.writelines(lines[10:])
+    with pytest.raises(IOError):
+        load_one(fn_tmp)
+
+
+def test_dump_fcidump_threshold(tmpdir):
+    with path('iodata.test.data', 'FCIDUMP.molpro.h2') as fn:
+        mol0 = load_one(str(fn))
+    fn_tmp = os.path.join(tmpdir, 'FCIDUMP')
+    dump_one(mol0, fn_tmp, threshold=0.1)
+    mol1 = load_one(fn_tmp)
+    two_mo0 = mol0.two_ints['two_mo'].data
+    assert_equal(mol1.two_ints['two_mo'].data, np.where(abs(two_mo0) > 0.1, two_mo0, 0.0))
+    core_mo0 = mol0.one_ints['core_mo']
+    assert_equal(mol1.one_ints['core_mo'], np.where(abs(core_mo0) > 0.1, core_mo0, 0.0))
+
+
+def test_dump_fcidump_chunks(tmpdir, monkeypatch):
+    with path('iodata.test.data', 'FCIDUMP.molpro.h2') as fn:
+        mol0 = load_one(str(fn))
+    fn_tmp0 = os.path.join(tmpdir, 'FCIDUMP0')
+    dump_one(mol0, fn_tmp0)
+    # Format the lines in many small chunks, including a partial one.
+    monkeypatch.setattr(molpro, 'DUMP_CHUNK_SIZE', 7)
+    fn_tmp1 = os.path.join(tmpdir, 'FCIDUMP1')
+    dump_one(mol0, fn_tmp1)
+    with open(fn_tmp0) as f0, open(fn_tmp1) as f1:
+        assert f0.read() == f1.read()
+
+
+def test_dump_fcidump_nan(tmpdir):
+    # Non-finite integrals must not be dropped by the threshold.
+    with path('iodata.test.data', 'FCIDUMP.molpro.h2') as fn:
+        mol0 = load_one(str(fn))
+    mol0.two_ints['two_mo'].data[3] = np.nan
+    mol0.one_ints['core_mo'][1, 0] = np.inf
+    mol0.one_ints['core_mo'][0, 1] = np.inf
+    fn_tmp = os.path.join(tmpdir, 'FCIDUMP')
+    dump_one(mol0, fn_tmp, threshold=0.1)
+    mol1 = load_one(fn_tmp)
+    assert np.isnan(mol1.two_ints['two_mo'].data[3])
+    assert mol1.one_ints['core_mo'][1, 0] == np.inf
+
+
+def test_load_fcidump_scratch(tmpdir):
+    with path('iodata.test.data', 'FCIDUMP.psi4.h2') as fn:
+        mol0 = load_one(str(fn))
+        mol1 = load_one(str(fn), scratch=str(tmpdir))
+        assert len(os.listdir(tmpdir)) == 2
+        # The second time, all integrals come from the cache.
+        mol2 = load_one(str(fn), scratch=str(tmpdir))
+    for mol in mol1, mol2:
+        assert isinstance(mol.two_ints['two_mo'].data, np.memmap)
+        assert_equal(mol.two_ints['two_mo'].data, mol0.two_ints['two_mo'].data)
+        assert_equal(mol.one_ints['core_mo'], mol0.one_ints['core_mo'])
+        assert_equal(mol.core_energy, mol0.core_energy)
+        assert_equal(mol.nelec, mol0.nelec)
+
+
+def check_fcidump_h2(mol0, mol1):
+    """Check that the integrals of two FCIDUMP files are the same."""
+    assert_equal(mol1.two_ints['two_mo'].data, mol0.two_ints['two_mo'].data)
+    assert_equal(mol1.one_ints['core_mo'], mol0.one_ints['core_mo'])
+    assert_equal(mol1.core_energy, mol0.core_energy)
+
+
+def test_load_fcidump_scratch_invalid(tmpdir):
+    # An incomplete or inconsistent cache must be regenerated.
+    with path('iodata.test.data', 'FCIDUMP.psi4.h2') as fn:
+        mol0 = load_one(str(fn))
+        load_one(str(fn), scratch=str(tmpdir))
+        fn_one, fn_two = sorted(os.path.join(tmpdir, name) for name in os.listdir(tmpdir))
+        assert fn_one.endswith('.npz') and fn_two.endswith('.npy')
+        # Missing NPZ file.
+        os.remove(fn_one)
+        check_fcidump_h2(mol0, load_one(str(fn), scratch=str(tmpdir)))
+        assert os.path.isfile(fn_one)
+        # NPY file replaced by one that does not belong to the NPZ file.
+        os.remove(fn_two)
+        np.save(fn_two, np.zeros(mol0.two_ints['two_mo'].data.shape))
+        check_fcidump_h2(mol0, load_one(str(fn), scratch=str(tmpdir)))
+        # Unreadable NPZ file.
+        with open(fn_one, 'w') as f:
+            f.write('garbage')
+        check_fcidump_h2(mol0, load_one(str(fn), scratch=str(tmpdir)))
+        # The regenerated cache is valid.
+        check_fcidump_h2(mol0, load_one(str(fn), scratch=str(tmpdir)))
+    assert sorted(os.listdir(tmpdir)) == [os.path.basename(fn_one), os.path.basename(fn_two)]
@@ -0,0 +1,159 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Test iodata.formats.npz module."""
+
+import os
+
+import attr
+import numpy as np
+from numpy.testing import assert_equal
+import pytest
+
+from ..api import load_one, load_many, dump_one, dump_many
+from ..basis import MolecularBasis
+from ..fourindex import SymmetricFourIndex
+from ..iodata import IOData
+from ..utils import FileFormatError
+try:
+    from importlib_resources import path
+except ImportError:
+    from importlib.resources import path
+
+
+def check_same_value(value0, value1):
+    """Check that two (nested) attribute values are identical, including types."""
+    if isinstance(value0, np.ndarray):
+        assert isinstance(value1, np.ndarray)
+        assert value0.dtype == value1.dtype
+        assert_equal(value0, value1)
+    elif isinstance(value0, MolecularBasis):
+        assert value0.conventions == value1.conventions
+        assert value0.primitive_normalization == value1.primitive_normalization
+        assert len(value0.shells) == len(value1.shells)
+        for shell0, shell1 in zip(value0.shells, value1.shells):
+            assert shell0.icenter == shell1.icenter
+            assert_equal(shell0.angmoms, shell1.angmoms)
+            assert shell0.kinds == shell1.kinds
+            assert_equal(shell0.exponents, shell1.exponents)
+            assert_equal(shell0.coeffs, shell1.coeffs)
+    elif isinstance(value0, SymmetricFourIndex):
+        assert value0.nbasis == value1.nbasis
+        assert_equal(value0.data, value1.data)
+    elif isinstance(value0, dict):
+        assert value0.keys() == value1.keys()
+        for key, item in value0.items():
+            check_same_value(item, value1[key])
+    elif isinstance(value0, (list, tuple)):
+        assert type(value0) is type(value1)
+        assert len(value0) == len(value1)
+        for item0, item1 in zip(value0, value1):
+            check_same_value(item0, item1)
+    else:
+        assert value0 == value1
+
+
+def check_same_iodata(mol0, mol1):
+    """Check that all attributes of two IOData instances are identical."""
+    for field in attr.fields(IOData):
+        check_same_value(getattr(mol0, field.name), getattr(mol1, field.name))
+
+
+@pytest.mark.parametrize('fn', ['water_ccpvdz_pure_hf_g03.fchk', 'h2o.molden.input',
+                                'aelta.cube', 'FCIDUMP.molpro.h2', 'water_orca.out',
+                                'caffeine.mol2'])
+def test_dump_load_consistency(fn, tmpdir):
+    with path('iodata.test.data', fn) as fn_data:
+        mol0 = load_one(str(fn_data))
+    fn_tmp = os.path.join(tmpdir, 'test.iodata.npz')
+    dump_one(mol0, fn_tmp)
+    mol1 = load_one(fn_tmp)
+    check_same_iodata(mol0, mol1)
+    dump_one(mol0, fn_tmp, compress=True)
+    check_same_iodata(mol0, load_one(fn_tmp, fmt='npz'))
+
+
+def test_dump_load_many_consistency(tmpdir):
+    with path('iodata.test.data', 'caffeine.mol2') as fn_data:
+        mols0 = list(load_many(str(fn_data)))
+    mols0.append(IOData(energy=-1.5, extra={(1, 'c'): [1, (2.0, 'a'), None], 'b': True}))
+    fn_tmp = os.path.join(tmpdir, 'test.iodata.npz')
+    dump_many(mols0, fn_tmp)
+    mols1 = list(load_many(fn_tmp))
+    assert len(mols1) == 3
+    for mol0, mol1 in zip(mols0, mols1):
+        check_same_iodata(mol0, mol1)
+    # The first frame is loaded by load_one.
+    check_same_iodata(mols0[0], load_one(fn_tmp))
+
+
+def test_load_attrs(tmpdir):
+    with path('iodata.test.data', 'water_ccpvdz_pure_hf_g03.fchk') as fn_data:
+        mol0 = load_one(str(fn_data))
+    fn_tmp = os.path.join(tmpdir, 'test.iodata.npz')
+    dump_many([mol0, mol0], fn_tmp)
+    mol1 = load_one(fn_tmp, attrs=['atcoords', 'energy', 'title', 'cube'])
+    check_same_value(mol0.atcoords, mol1.atcoords)
+    assert mol1.energy == mol0.energy
+    assert mol1.title == mol0.title
+    assert mol1.mo is None
+    assert mol1.obasis is None
+    assert mol1.atnums is None
+    for mol1 in load_many(fn_tmp, attrs=['obasis']):
+        check_same_value(mol0.obasis, mol1.obasis)
+        assert mol1.atcoords is None
+    with pytest.raises(ValueError):
+        load_one(fn_tmp, attrs=['foo'])
+
+
+def test_dump_errors(tmpdir):
+    fn_tmp = os.path.join(tmpdir, 'test.iodata.npz')
+    with pytest.raises(TypeError):
+        dump_one(IOData(extra={'foo': np.array([None, 1])}), fn_tmp)
+    with pytest.raises(TypeError):
+        dump_one(IOData(extra={'foo': {1, 2}}), fn_tmp)
+
+
+def test_load_errors(tmpdir):
+    fn_tmp = os.path.join(tmpdir, 'test.iodata.npz')
+    with open(fn_tmp, 'w') as f:
+        f.write('This is not an NPZ file.\n')
+    with pytest.raises(FileFormatError):
+        load_one(fn_tmp)
+    np.savez(fn_tmp, foo=np.zeros(3))
+    with pytest.raises(FileFormatError):
+        load_one(fn_tmp)
+    assert list(load_many(fn_tmp)) == []
+
+
+def test_patterns(tmpdir):
+    # Plain NumPy NPZ files are not recognized as IOData NPZ files.
+    fn_tmp = os.path.join(tmpdir, 'test.npz')
+    dump_one(IOData(energy=-1.0), fn_tmp, fmt='npz')
+    with pytest.raises(ValueError):
+        load_one(fn_tmp)
+    assert load_one(fn_tmp, fmt='npz').energy == -1.0
+
+
+def test_load_many_frames(tmpdir):
+    fn_tmp = os.path.join(tmpdir, 'test.iodata.npz')
+    mols0 = [IOData(atnums=[iframe], energy=-iframe) for iframe in range(100)]
+    dump_many(mols0, fn_tmp)
+    mols1 = list(load_many(fn_tmp, attrs=['energy']))
+    assert [mol.energy for mol in mols1] == [mol.energy for mol in mols0]
+    assert all(mol.atnums is None for mol in mols1)
@@ -0,0 +1,164 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Unit tests for iodata.orbitals."""
+
+import pickle
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+import pytest
+
+from .common import compute_1rdm
+from ..api import load_one
+from ..orbitals import MolecularOrbitals
+try:
+    from importlib_resources import path
+except ImportError:
+    from importlib.resources import path
+
+
+def test_restricted_occupations():
+    occs = np.array([2.0, 2.0, 1.0, 0.5, 0.0])
+    mo = MolecularOrbitals('restricted', 5, 5, occs, np.identity(5), None, None)
+    assert_allclose(mo.nelec, 5.5)
+    assert_allclose(mo.spinpol, 1.5)
+    assert_allclose(mo.occsa, [1.0, 1.0, 1.0, 0.5, 0.0])
+    assert_allclose(mo.occsb, [1.0, 1.0, 0.0, 0.0, 0.0])
+    # Derived arrays are writable copies, which do not affect the cache.
+    mo.occsa[0] = 0.0
+    assert_allclose(mo.occsa, [1.0, 1.0, 1.0, 0.5, 0.0])
+    # In-place changes of occs require an explicit invalidation of the cache.
+    mo.occs[3] = 1.0
+    assert_allclose(mo.nelec, 5.5)
+    mo.clear_cache()
+    assert_allclose(mo.nelec, 6.0)
+    assert_allclose(mo.spinpol, 2.0)
+    assert_allclose(mo.occsa, [1.0, 1.0, 1.0, 1.0, 0.0])
+    # A new instance has its own cache.
+    mo = mo._replace(occs=np.array([2.0, 2.0, 2.0, 0.0, 0.0]))
+    assert_allclose(mo.nelec, 6.0)
+    assert_allclose(mo.spinpol, 0.0)
+    assert_allclose(mo.occsb, [1.0, 1.0, 1.0, 0.0, 0.0])
+
+
+def test_unrestricted_occupations():
+    occs = np.array([1.0, 1.0, 0.0, 1.0, 0.0, 0.0])
+    mo = MolecularOrbitals('unrestricted', 3, 3, occs, np.identity(6)[:3], None, None)
+    assert_allclose(mo.nelec, 3.0)
+    assert_allclose(mo.spinpol, 1.0)
+    assert_equal(mo.occsa, [1.0, 1.0, 0.0])
+    assert_equal(mo.occsb, [1.0, 0.0, 0.0])
+    mo.occs[4] = 1.0
+    mo.clear_cache()
+    assert_allclose(mo.nelec, 4.0)
+    assert_allclose(mo.spinpol, 0.0)
+
+
+def test_pickle_occupations():
+    occs = np.array([2.0, 1.0, 0.0])
+    mo = MolecularOrbitals('restricted', 3, 3, occs, np.identity(3), None, None)
+    assert_allclose(mo.spinpol, 1.0)
+    mo2 = pickle.loads(pickle.dumps(mo))
+    assert isinstance(mo2, MolecularOrbitals)
+    assert '_cached_occupations' not in mo2.__dict__
+    assert_equal(mo2.occs, occs)
+    assert_allclose(mo2.spinpol, 1.0)
+
+
+def test_generalized_occupations():
+    occs = np.array([1.0, 1.0, 1.0, 0.0])
+    mo = MolecularOrbitals('generalized', None, None, occs, np.identity(4), None, None)
+    assert_allclose(mo.nelec, 3.0)
+    with pytest.raises(NotImplementedError):
+        mo.spinpol  # pylint: disable=pointless-statement
+    with pytest.raises(NotImplementedError):
+        mo.occsa  # pylint: disable=pointless-statement
+
+
+def _compute_dm_ref(coeffs, occs):
+    return np.einsum('ik,k,jk->ij', coeffs, occs, coeffs)
+
+
+def test_compute_dm_restricted():
+    coeffs = np.random.uniform(-1, 1, (7, 5))
+    occs = np.array([2.0, 2.0, 1.0, 0.5, 0.0])
+    mo = MolecularOrbitals('restricted', 5, 5, occs, coeffs, None, None)
+    occsa = np.array([1.0, 1.0, 1.0, 0.5, 0.0])
+    occsb = np.array([1.0, 1.0, 0.0, 0.0, 0.0])
+    assert_allclose(mo.compute_dm(), _compute_dm_ref(coeffs, occs))
+    assert_allclose(mo.compute_dm('alpha'), _compute_dm_ref(coeffs, occsa))
+    assert_allclose(mo.compute_dm('beta'), _compute_dm_ref(coeffs, occsb))
+    assert_allclose(mo.compute_dm('spin'), _compute_dm_ref(coeffs, occsa - occsb))
+
+
+def test_compute_dm_unrestricted():
+    coeffs = np.random.uniform(-1, 1, (6, 8))
+    occs = np.array([1.0, 1.0, 0.5, 0.0, 1.0, 0.0, 0.0, 0.0])
+    mo = MolecularOrbitals('unrestricted', 4, 4, occs, coeffs, None, None)
+    dma = _compute_dm_ref(coeffs[:, :4], occs[:4])
+    dmb = _compute_dm_ref(coeffs[:, 4:], occs[4:])
+    assert_allclose(mo.compute_dm(), dma + dmb)
+    assert_allclose(mo.compute_dm('alpha'), dma)
+    assert_allclose(mo.compute_dm('beta'), dmb)
+    assert_allclose(mo.compute_dm('spin'), dma - dmb)
+
+
+def test_compute_dm_out():
+    coeffs = np.random.uniform(-1, 1, (6, 8))
+    occs = np.array([1.0, 1.0, 0.5, 0.0, 1.0, 0.0, 0.0, 0.0])
+    mo = MolecularOrbitals('unrestricted', 4, 4, occs, coeffs, None, None)
+    expected = mo.compute_dm('spin')
+    for order in 'CF':
+        out = np.full((6, 6), np.nan, order=order)
+        assert mo.compute_dm('spin', out=out) is out
+        assert_allclose(out, expected)
+    # Without occupied orbitals, the result is zero.
+    mo = mo._replace(occs=np.zeros(8))
+    out = np.full((6, 6), np.nan)
+    assert_equal(mo.compute_dm(out=out), 0.0)
+
+
+def test_compute_dm_errors():
+    mo = MolecularOrbitals('restricted', 2, 2, np.array([2.0, 0.0]), np.identity(2), None, None)
+    with pytest.raises(ValueError):
+        mo.compute_dm('foo')
+    with pytest.raises(TypeError):
+        mo.compute_dm(out=np.zeros((3, 3)))
+    with pytest.raises(TypeError):
+        mo.compute_dm(out=np.zeros((2, 2), dtype=np.float32))
+    with pytest.raises(TypeError):
+        mo.compute_dm(out=np.zeros((4, 4))[::2, ::2])
+    mo = MolecularOrbitals('generalized', None, None, np.array([1.0, 0.0]), np.identity(2),
+                           None, None)
+    with pytest.raises(NotImplementedError):
+        mo.compute_dm()
+
+
+@pytest.mark.parametrize('fn', ['water_sto3g_hf_g03.fchk', 'li_h_3-21G_hf_g09.fchk',
+                                'ch3_rohf_sto3g_g03.fchk'])
+def test_compute_dm_fchk(fn):
+    with path('iodata.test.data', fn) as fn_fchk:
+        mol = load_one(str(fn_fchk))
+    dm = mol.mo.compute_dm()
+    assert_allclose(dm, compute_1rdm(mol), atol=1.e-12)
+    # Compare with the density matrices written by Gaussian, if present.
+    if 'scf' in mol.one_rdms:
+        assert_allclose(dm, mol.one_rdms['scf'], atol=1.e-7)
+    if 'scf_spin' in mol.one_rdms:
+        assert_allclose(mol.mo.compute_dm('spin'), mol.one_rdms['scf_spin'], atol=1.e-7)
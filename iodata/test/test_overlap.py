@@ -24,7 +24,8 @@ from pytest import raises
 
 from ..api import load_one
 from ..basis import MolecularBasis, Shell
-from ..overlap import compute_overlap, OVERLAP_CONVENTIONS
+from ..overlap import (compute_overlap, get_overlap_setup, OVERLAP_CONVENTIONS,
+                       _screen_shell_pairs)
 from ..overlap_accel import fac2, _binom
 
 try:
@@ -107,3 +108,73 @@ def test_overlap_l1():
     atcoords = np.zeros((3, 1))
     with raises(ValueError):
         _ = compute_overlap(dbasis, atcoords)
+
+
+def test_overlap_num_threads():
+    with path('iodata.test.data', 'o2_cc_pvtz_pure.fchk') as fn_fchk:
+        data = load_one(fn_fchk)
+    olp1 = compute_overlap(data.obasis, data.atcoords)
+    olp4 = compute_overlap(data.obasis, data.atcoords, num_threads=4)
+    assert_allclose(olp1, olp4, rtol=0.0, atol=1.e-14)
+    assert_allclose(olp1, olp1.T, rtol=0.0, atol=1.e-14)
+
+
+def test_overlap_screening():
+    with path('iodata.test.data', 'water_dimer_ghost.fchk') as fn_fchk:
+        data = load_one(fn_fchk)
+    olp_ref = compute_overlap(data.obasis, data.atcoords, screening_threshold=0.0)
+    # By default, no shell pairs are screened.
+    assert_equal(compute_overlap(data.obasis, data.atcoords), olp_ref)
+    olp = compute_overlap(data.obasis, data.atcoords, screening_threshold=1e-20)
+    assert_allclose(olp, olp_ref, rtol=0.0, atol=1.e-15)
+    # Move the second molecule far away, such that all overlap integrals
+    # between the two molecules are screened.
+    atcoords = data.atcoords.copy()
+    atcoords[3:] += 100.0
+    olp = compute_overlap(data.obasis, atcoords, screening_threshold=1e-10)
+    nbasis0 = sum(shell.nbasis for shell in data.obasis.shells if shell.icenter < 3)
+    assert (olp[:nbasis0, nbasis0:] == 0.0).all()
+    assert (olp[nbasis0:, :nbasis0] == 0.0).all()
+    olp_ref = compute_overlap(data.obasis, atcoords, screening_threshold=0.0)
+    assert_allclose(olp, olp_ref, rtol=0.0, atol=1.e-15)
+
+
+def test_screen_shell_pairs():
+    # Compare with a direct evaluation of the screening criterion for all pairs.
+    rng = np.random.RandomState(1)
+    nshell = 300
+    alpha_mins = 10**rng.uniform(-2, 3, nshell)
+    centers = rng.uniform(-10, 10, (nshell, 3))
+    centers[:10] = centers[10:20]
+    threshold = 1e-8
+    pairs0, pairs1 = _screen_shell_pairs(alpha_mins, centers, threshold)
+    assert (pairs0 >= pairs1).all()
+    ref0, ref1 = np.tril_indices(nshell)
+    dist_sq = ((centers[ref0] - centers[ref1])**2).sum(axis=1)
+    alpha_red = alpha_mins[ref0] * alpha_mins[ref1] / (alpha_mins[ref0] + alpha_mins[ref1])
+    mask = np.exp(-alpha_red * dist_sq) >= threshold
+    assert 0 < mask.sum() < len(mask)
+    assert_equal(sorted(zip(pairs0, pairs1)), sorted(zip(ref0[mask], ref1[mask])))
+    # Without screening, all pairs are returned.
+    assert_equal(_screen_shell_pairs(alpha_mins, centers, 0.0), np.tril_indices(nshell))
+    assert_equal(_screen_shell_pairs(alpha_mins[:0], centers[:0], threshold), [[], []])
+
+
+def test_overlap_setup_cache():
+    with path('iodata.test.data', 'water_dimer_ghost.fchk') as fn_fchk:
+        data = load_one(fn_fchk)
+    setup = get_overlap_setup(data.obasis)
+    # The setup is stored in the basis set object.
+    assert get_overlap_setup(data.obasis) is setup
+    # An equal basis set, but a different object, has its own setup.
+    obasis = data.obasis._replace(shells=[shell._replace(exponents=shell.exponents.copy())
+                                          for shell in data.obasis.shells])
+    assert get_overlap_setup(obasis) is not setup
+    assert_equal(get_overlap_setup(obasis).scales, setup.scales)
+    # After an in-place modification, the cache must be cleared.
+    shell0 = data.obasis.shells[0]
+    data.obasis.shells[0] = shell0._replace(coeffs=shell0.coeffs * 2)
+    data.obasis.clear_cache()
+    setup2 = get_overlap_setup(data.obasis)
+    assert setup2 is not setup
+    assert_allclose(setup2.coeffs[:shell0.nprim], setup.coeffs[:shell0.nprim] * 2)
@@ -0,0 +1,109 @@
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Test iodata.sharedmem module."""
+
+import multiprocessing
+import pickle
+import sys
+
+import numpy as np
+from numpy.testing import assert_equal
+import pytest
+
+from ..api import load_one
+from ..fourindex import SymmetricFourIndex
+from ..iodata import IOData
+from ..sharedmem import SharedArray, SharedArrayPool
+try:
+    from importlib_resources import path
+except ImportError:
+    from importlib.resources import path
+
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 8),
+                                reason='Shared memory requires Python 3.8 or newer.')
+
+
+def test_share_array():
+    with SharedArrayPool() as pool:
+        array0 = pool.share_array(np.arange(60.0).reshape(6, 10))
+        assert isinstance(array0, SharedArray)
+        array1 = pickle.loads(pickle.dumps(array0))
+        assert isinstance(array1, SharedArray)
+        assert_equal(array0, array1)
+        # Both arrays use the same memory.
+        array1[1, 2] = -1.0
+        assert array0[1, 2] == -1.0
+        # Views are pickled by reference, also with negative strides.
+        for view0 in array0[2:4, 1::3], array0[::-2], array0.T:
+            data = pickle.dumps(view0)
+            assert len(data) < 300
+            view1 = pickle.loads(data)
+            assert_equal(view0, view1)
+            view1[0, 0] = 7.0
+            assert view0[0, 0] == 7.0
+        # Other derived arrays are pickled by value.
+        double = array0 * 2
+        assert not np.shares_memory(double, pickle.loads(pickle.dumps(double)))
+        assert_equal(pickle.loads(pickle.dumps(double)), double)
+        with pytest.raises(TypeError):
+            pool.share_array(np.array([None, 1]))
+    # After closing the pool, the existing arrays remain usable.
+    assert array1[1, 2] == -1.0
+
+
+def test_share_iodata():
+    with path('iodata.test.data', 'water_ccpvdz_pure_hf_g03.fchk') as fn_fchk:
+        mol0 = load_one(str(fn_fchk))
+    mol0.two_ints = {'er_ao': SymmetricFourIndex(24, np.ones(45150))}
+    with SharedArrayPool(min_nbytes=1000) as pool:
+        mol1 = pool.share_iodata(mol0)
+        for array0, array1 in [(mol0.mo.coeffs, mol1.mo.coeffs),
+                               (mol0.one_rdms['scf'], mol1.one_rdms['scf']),
+                               (mol0.two_ints['er_ao'].data, mol1.two_ints['er_ao'].data)]:
+            assert isinstance(array1, SharedArray)
+            assert_equal(array0, array1)
+            assert not np.shares_memory(array0, array1)
+        # Small arrays are not shared.
+        assert not isinstance(mol1.atcoords, SharedArray)
+        assert mol1.obasis is mol0.obasis
+        assert mol1.title == mol0.title
+        assert len(pickle.dumps(mol1)) < len(pickle.dumps(mol0)) / 10
+        mol2 = pickle.loads(pickle.dumps(mol1))
+        assert isinstance(mol2.mo.coeffs, SharedArray)
+        assert_equal(mol2.mo.coeffs, mol0.mo.coeffs)
+        mol2.mo.coeffs[3, 4] = 10.0
+        assert mol1.mo.coeffs[3, 4] == 10.0
+
+
+def _compute_trace(mol: IOData) -> float:
+    """Compute a result in a worker process."""
+    assert isinstance(mol.one_rdms['scf'], SharedArray)
+    return np.trace(mol.one_rdms['scf'].dot(mol.one_ints['olp']))
+
+
+def test_share_iodata_pool():
+    with path('iodata.test.data', 'water_ccpvdz_pure_hf_g03.fchk') as fn_fchk:
+        mol = load_one(str(fn_fchk))
+    mol.one_ints = {'olp': np.identity(mol.obasis.nbasis)}
+    with SharedArrayPool(min_nbytes=0) as shared_pool:
+        shared = shared_pool.share_iodata(mol)
+        with multiprocessing.Pool(2) as pool:
+            traces = pool.map(_compute_trace, [shared] * 4)
+    assert_equal(traces, [np.trace(mol.one_rdms['scf'])] * 4)
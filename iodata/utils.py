@@ -19,6 +19,8 @@
 """Utility functions module."""
 
 
+import hashlib
+import os
 from typing import Tuple, NamedTuple
 import warnings
 
@@ -28,7 +30,7 @@ from scipy.linalg import eigh
 
 
 __all__ = ['LineIterator', 'Cube', 'set_four_index_element', 'volume',
-           'derive_naturals', 'check_dm']
+           'derive_naturals', 'check_dm', 'get_cache_filename']
 
 
 # The unit conversion factors below can be used as follows:
@@ -38,6 +40,7 @@ angstrom: float = spc.angstrom / spc.value(u'atomic unit of length')
 electronvolt: float = 1 / spc.value(u'hartree-electron volt relationship')
 # atomic mass unit (not atomic unit of mass!)
 amu: float = 1e-3 / (spc.value(u'electron mass') * spc.value(u'Avogadro constant'))
+wavenumber: float = spc.value(u'inverse meter-hartree relationship') * 100
 
 
 class FileFormatError(IOError):
@@ -248,3 +251,32 @@ def check_dm(dm: np.ndarray, overlap: np.ndarray, eps: float = 1e-4, occ_max: fl
     if occupations.max() > occ_max + eps:
         raise ValueError('The density matrix has eigenvalues considerably larger than '
                          'max. error=%e' % (occupations.max() - 1))
+
+
+def get_cache_filename(filename: str, scratch: str, suffix: str) -> str:
+    """Return the name of a cache file for data derived from a given input file.
+
+    The cache filename contains a hash of the absolute path, the size and the
+    modification time of the input file, such that a cache file is no longer
+    found after the input file has changed.
+
+    Parameters
+    ----------
+    filename
+        The input file from which the cached data is derived.
+    scratch
+        The directory in which cache files are stored.
+    suffix
+        A suffix to distinguish different cache files derived from the same
+        input file, e.g. ``er_ao.npy``.
+
+    Returns
+    -------
+    cache_filename
+        The path of the cache file. It is not checked if this file exists.
+
+    """
+    stat = os.stat(filename)
+    key = '{}:{}:{}'.format(os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(scratch, '{}.{}.{}'.format(os.path.basename(filename), digest, suffix))
@@ -26,6 +26,7 @@ Developers are recommended to use Roberto.
 
 
 import os
+import sys
 
 import Cython.Build
 import numpy as np
@@ -43,6 +44,15 @@ def get_version():
         return "0.0.0.post0"
 
 
+def get_openmp_args():
+    """Return compiler and linker arguments to enable OpenMP, if known to work."""
+    # The shell pairs in the overlap integrals are distributed over threads with
+    # OpenMP. Without these flags, the same code just runs serially.
+    if sys.platform.startswith('linux'):
+        return ['-fopenmp']
+    return []
+
+
 def get_readme():
     """Load README.rst for display on PyPI."""
     with open('README.rst') as fhandle:
@@ -62,7 +72,9 @@ setup(
     cmdclass={'build_ext': Cython.Build.build_ext},
     ext_modules=[Extension("iodata.overlap_accel",
                            sources=['iodata/overlap_accel.pyx'],
-                           include_dirs=[np.get_include()])],
+                           include_dirs=[np.get_include()],
+                           extra_compile_args=get_openmp_args(),
+                           extra_link_args=get_openmp_args())],
     include_package_data=True,
     entry_points={
         'console_scripts': ['iodata-convert = iodata.__main__:main']
@@ -76,7 +88,7 @@ setup(
         'Topic :: Scientific/Engineering :: Chemistry',
         'Intended Audience :: Science/Research',
     ],
-    setup_requires=['numpy>=1.0', 'cython>=0.24.1'],
-    install_requires=['numpy>=1.0', 'cython>=0.24.1', 'scipy', 'attrs>=19.1.0',
+    setup_requires=['numpy>=1.0', 'cython>=0.29.31'],
+    install_requires=['numpy>=1.0', 'cython>=0.29.31', 'scipy', 'attrs>=20.1.0',
                       'importlib_resources; python_version < "3.7"'],
 )
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# IODATA is an input and output module for quantum chemistry.
+# Copyright (C) 2011-2019 The IODATA Development Team
+#
+# This file is part of IODATA.
+#
+# IODATA is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# IODATA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+# --
+"""Benchmark the overlap integrals for a series of cubic water clusters.
+
+The water molecule (cc-pVDZ) from the unit tests is replicated on a cubic grid.
+For each cluster size, the wall time of ``compute_overlap`` is printed with and
+without shell-pair screening, excluding the time needed for the basis-dependent
+setup. Run this script from the root of the source tree
+after building the extension in place.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from iodata import load_one
+from iodata.overlap import compute_overlap, get_overlap_setup
+from iodata.utils import angstrom
+
+try:
+    from importlib_resources import path
+except ImportError:
+    from importlib.resources import path
+
+
+def make_cluster(mol, ncube: int, spacing: float):
+    """Return the basis and atomic coordinates of a cubic cluster of copies of mol."""
+    shells = []
+    atcoords = []
+    for icopy, shift in enumerate(np.ndindex(ncube, ncube, ncube)):
+        atcoords.append(mol.atcoords + np.array(shift) * spacing)
+        for shell in mol.obasis.shells:
+            shells.append(shell._replace(icenter=shell.icenter + icopy * mol.natom))
+    obasis = mol.obasis._replace(shells=shells)
+    return obasis, np.concatenate(atcoords)
+
+
+def main():
+    """Print a table with timings for increasing cluster sizes."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--max-cube', type=int, default=4,
+                        help='Largest number of molecules along one cube edge.')
+    parser.add_argument('--spacing', type=float, default=3.0,
+                        help='Distance between neighboring molecules in angstrom.')
+    parser.add_argument('--num-threads', type=int, default=1)
+    args = parser.parse_args()
+
+    with path('iodata.test.data', 'water_ccpvdz_pure_hf_g03.fchk') as fn_fchk:
+        mol = load_one(str(fn_fchk))
+    print('{:>8s} {:>8s} {:>12s} {:>12s}'.format(
+        'nmol', 'nbasis', 'full [s]', 'screened [s]'))
+    for ncube in range(1, args.max_cube + 1):
+        obasis, atcoords = make_cluster(mol, ncube, args.spacing * angstrom)
+        # Fill the setup cache first, such that both runs are timed alike.
+        get_overlap_setup(obasis)
+        timings = []
+        for threshold in 0.0, 1e-20:
+            start = time.perf_counter()
+            compute_overlap(obasis, atcoords, args.num_threads, threshold)
+            timings.append(time.perf_counter() - start)
+        print('{:8d} {:8d} {:12.4f} {:12.4f}'.format(
+            ncube**3, obasis.nbasis, *timings))
+
+
+if __name__ == '__main__':
+    main()